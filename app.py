@@ -1,9 +1,12 @@
-from flask import Flask, render_template, request, send_file, jsonify, flash, redirect, url_for
+from flask import Flask, render_template, request, send_file, jsonify, flash, redirect, url_for, Response
 import os
 import uuid
 from werkzeug.utils import secure_filename
 from invoice_parser import InvoiceParser
-import pandas as pd
+from extraction_cache import ExtractionCache, DEFAULT_CACHE_DIR
+from parse_metrics import ParseMetrics
+from job_queue import JobQueue, JobStore, DEFAULT_JOBS_DIR, DONE, FAILED
+from result_cache import ResultCache
 from datetime import datetime
 import logging
 
@@ -15,14 +18,33 @@ app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-here')  # Use environment variable in production
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs'
 ALLOWED_EXTENSIONS = {'pdf'}
+JOBS_FOLDER = os.environ.get('INVOICE_JOBS_DIR', DEFAULT_JOBS_DIR)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))  # Background parsing threads per gunicorn worker
+CACHE_FOLDER = os.environ.get('INVOICE_CACHE_DIR', DEFAULT_CACHE_DIR)  # Set to '' to disable caching
+TESSERACT_CMD = os.environ.get('TESSERACT_CMD')  # Path to tesseract if it is not on PATH
 
 # Create directories if they don't exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
+# Shared cache of parse results so re-uploaded invoices are not parsed again
+extraction_cache = ExtractionCache(CACHE_FOLDER) if CACHE_FOLDER else None
+
+# Stage timings and counters for every parse in this worker process, served on /metrics
+parse_metrics = ParseMetrics()
+
+# One parser per worker process, shared by every request and job thread; gunicorn_config.py warms it up
+shared_parser = InvoiceParser(tesseract_path=TESSERACT_CMD, cache=extraction_cache, metrics=parse_metrics)
+
+# Uploads are parsed in the background; job state lives in JOBS_FOLDER so any worker can report it
+job_queue = JobQueue(JobStore(JOBS_FOLDER), max_workers=JOB_WORKERS)
+
+# Parsed records of each upload; CSV and Excel files are rendered from them on first download
+result_cache = ResultCache(OUTPUT_FOLDER)
+
+EXPORT_FORMATS = {'csv': 'save_to_csv', 'xlsx': 'save_to_excel'}
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -34,6 +56,41 @@ def index():
 def upload_redirect():
     return redirect(url_for('index'))
 
+def process_upload(pdf_bytes, base_name, result_id, use_cache=True):
+    """
+    Parse an uploaded PDF and keep its records in the result cache.
+
+    Runs on the job queue; the returned dict is the job result rendered by
+    results.html. The CSV and Excel files it names are only written when
+    first downloaded.
+
+    Args:
+        pdf_bytes (bytes): Contents of the uploaded PDF
+        base_name (str): Original file name without extension, used to name outputs
+        result_id (str): Key of the records in the result cache
+        use_cache (bool): Whether to look up and store results in the cache
+
+    Returns:
+        dict: success, records_extracted, result_id, csv_filename, excel_filename and preview_data
+    """
+    with parse_metrics.time('upload_parse'):
+        extracted_data = shared_parser.parse_pdf(pdf_bytes, use_cache=use_cache, source=f"{base_name}.pdf")
+
+    if not extracted_data:
+        raise ValueError('No data could be extracted from the PDF. Please ensure it contains invoice information.')
+
+    result_cache.put(result_id, extracted_data)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return {
+        'success': True,
+        'records_extracted': len(extracted_data),
+        'result_id': result_id,
+        'csv_filename': f"{base_name}_{timestamp}.csv",
+        'excel_filename': f"{base_name}_{timestamp}.xlsx",
+        'preview_data': extracted_data[:5]  # First 5 records for preview
+    }
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
@@ -47,51 +104,19 @@ def upload_file():
     
     if file and allowed_file(file.filename):
         try:
-            # Generate unique filename
-            unique_id = str(uuid.uuid4())
             filename = secure_filename(file.filename)
             base_name = os.path.splitext(filename)[0]
-            pdf_path = os.path.join(UPLOAD_FOLDER, f"{unique_id}_{filename}")
-            
-            # Save uploaded file
-            file.save(pdf_path)
-            
-            # Initialize parser and extract data
-            parser = InvoiceParser()
-            extracted_data = parser.parse_pdf(pdf_path)
-            
-            if not extracted_data:
-                flash('No data could be extracted from the PDF. Please ensure it contains invoice information.', 'error')
-                return redirect(url_for('index'))
-            
-            # Create output files
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            csv_filename = f"{base_name}_{timestamp}.csv"
-            excel_filename = f"{base_name}_{timestamp}.xlsx"
-            
-            csv_path = os.path.join(OUTPUT_FOLDER, csv_filename)
-            excel_path = os.path.join(OUTPUT_FOLDER, excel_filename)
             
-            # Save as CSV
-            parser.save_to_csv(extracted_data, csv_path)
-            
-            # Save as Excel
-            parser.save_to_excel(extracted_data, excel_path)
-            
-            # Clean up uploaded file
-            os.remove(pdf_path)
-            
-            # Prepare response data
-            result = {
-                'success': True,
-                'records_extracted': len(extracted_data),
-                'csv_filename': csv_filename,
-                'excel_filename': excel_filename,
-                'preview_data': extracted_data[:5]  # First 5 records for preview
-            }
-            
-            flash(f'Successfully extracted {len(extracted_data)} records from the invoice!', 'success')
-            return render_template('results.html', result=result)
+            # Parse in the background, straight from memory (pass refresh=1 to bypass the cache)
+            job_id = job_queue.submit(process_upload, file.read(), base_name, uuid.uuid4().hex,
+                                      request.form.get('refresh') != '1', filename=filename)
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({
+                    'job_id': job_id,
+                    'status_url': url_for('job_status', job_id=job_id),
+                    'result_url': url_for('job_result', job_id=job_id)
+                }), 202
+            return redirect(url_for('job_result', job_id=job_id))
             
         except Exception as e:
             logger.error(f"Error processing file: {str(e)}")
@@ -101,38 +126,76 @@ def upload_file():
     flash('Invalid file type. Please upload a PDF file.', 'error')
     return redirect(url_for('index'))
 
-@app.route('/download/<filename>')
-def download_file(filename):
+@app.route('/jobs/<job_id>')
+def job_result(job_id):
+    job = job_queue.store.get(job_id)
+    if job is None:
+        flash('Job not found', 'error')
+        return redirect(url_for('index'))
+    if job['status'] == DONE:
+        result = job['result']
+        flash(f'Successfully extracted {result["records_extracted"]} records from the invoice!', 'success')
+        return render_template('results.html', result=result)
+    if job['status'] == FAILED:
+        flash(f'Error processing file: {job.get("error")}', 'error')
+        return redirect(url_for('index'))
+    return render_template('processing.html', job=job)
+
+@app.route('/jobs/<job_id>/status')
+def job_status(job_id):
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    status = {'id': job['id'], 'status': job['status'], 'filename': job.get('filename')}
+    if job['status'] == DONE:
+        result = job['result']
+        status['result'] = {key: value for key, value in result.items() if key != 'preview_data'}
+        status['result']['csv_url'] = url_for('download_result', result_id=result['result_id'],
+                                              filename=result['csv_filename'])
+        status['result']['excel_url'] = url_for('download_result', result_id=result['result_id'],
+                                                filename=result['excel_filename'])
+    elif job['status'] == FAILED:
+        status['error'] = job.get('error')
+    return jsonify(status)
+
+@app.route('/metrics')
+def metrics():
+    # Each gunicorn worker only sees its own totals, so every sample carries the
+    # worker pid; scrapes then add series per worker instead of flapping between
+    # them, and dashboards aggregate with sum without (worker) (...)
+    labels = {'worker': str(os.getpid())}
+    return Response(parse_metrics.to_prometheus(labels=labels), mimetype='text/plain; version=0.0.4')
+
+@app.route('/download/<result_id>/<filename>')
+def download_result(result_id, filename):
+    extension = filename.rsplit('.', 1)[-1].lower()
+    if extension not in EXPORT_FORMATS or secure_filename(filename) != filename:
+        flash('File not found', 'error')
+        return redirect(url_for('index'))
     try:
-        file_path = os.path.join(OUTPUT_FOLDER, filename)
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True)
-        else:
-            flash('File not found', 'error')
+        file_path = result_cache.export(result_id, filename, getattr(shared_parser, EXPORT_FORMATS[extension]))
+        if file_path is None:
+            flash('File not found. Results are kept for 24 hours, please upload the invoice again.', 'error')
             return redirect(url_for('index'))
+        return send_file(os.path.abspath(file_path), as_attachment=True, download_name=filename)
     except Exception as e:
         flash(f'Error downloading file: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+@app.route('/results/<result_id>/cleanup')
+def cleanup_result(result_id):
+    if result_cache.delete(result_id):
+        flash('File cleaned up successfully', 'success')
+    return redirect(url_for('index'))
+
 @app.route('/open-google-sheets/<filename>')
 def open_google_sheets(filename):
     # Instead of trying to upload automatically, redirect to Google Sheets and show instructions
     flash('In Google Sheets, go to File > Import and upload your downloaded CSV file.', 'info')
     return redirect('https://sheets.new')
 
-@app.route('/cleanup/<filename>')
-def cleanup_file(filename):
-    try:
-        file_path = os.path.join(OUTPUT_FOLDER, filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            flash('File cleaned up successfully', 'success')
-        return redirect(url_for('index'))
-    except Exception as e:
-        flash(f'Error cleaning up file: {str(e)}', 'error')
-        return redirect(url_for('index'))
-
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
+    shared_parser.warm_up()
     app.run(debug=debug, host='0.0.0.0', port=port) 
\ No newline at end of file
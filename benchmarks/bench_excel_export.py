@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark for Excel export: pandas DataFrame.to_excel vs XlsxRecordWriter.
+
+The previous save_to_excel built a DataFrame and let pandas write it with
+openpyxl, which holds the whole workbook in memory. XlsxRecordWriter streams
+rows with openpyxl's write-only mode. Both are timed on the same synthetic
+records, and their peak Python memory is measured with tracemalloc in a
+separate run (tracing slows everything down, so it does not affect the
+timings). The pandas path needs every record in a list up front; the
+streaming writer is fed from a generator, as main.py --merge does.
+
+Usage:
+    python benchmarks/bench_excel_export.py [--rows 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.generate_corpus import PLANS, PRICES, SUFFIXES, WORDS  # noqa: E402
+from record_writers import XlsxRecordWriter  # noqa: E402
+
+CUSTOMERS = ['Acme Holdings', 'Northwind Traders', 'Globex Corporation', 'Initech', 'Umbrella Dental']
+
+
+def iter_records(count: int, seed: int = 0) -> Iterator[Dict]:
+    """Yield count synthetic records shaped like InvoiceParser output."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        plan = rng.choice(PLANS)
+        qty = rng.randint(1, 40)
+        price = PRICES[plan]
+        yield {
+            'Billed To': rng.choice(CUSTOMERS),
+            'Invoice Period': '04/01/2025-04/30/2025',
+            'Invoice Issue Date': 'APR 30, 2025',
+            'Company Name': f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(SUFFIXES)}",
+            'Plan': plan,
+            'Qty': str(qty),
+            'Unit Price': f"${price:.2f}",
+            'Amount': f"${qty * price:.2f}",
+        }
+
+
+def pandas_export(rows: int, path: str) -> None:
+    pd.DataFrame(list(iter_records(rows))).to_excel(path, index=False, engine='openpyxl')
+
+
+def streaming_export(rows: int, path: str, sheet_per_billed_to: bool = False) -> None:
+    with XlsxRecordWriter(path, sheet_per_billed_to=sheet_per_billed_to) as writer:
+        writer.write_many(iter_records(rows))
+
+
+def measure(func: Callable[[], None]) -> Dict:
+    """Return wall time of one run and tracemalloc peak of a second run."""
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': seconds, 'peak_mb': peak / (1024 * 1024)}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--rows', type=int, default=100000, help='Records to export (default: 100000)')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'out.xlsx')
+        results = [
+            ('pandas to_excel', measure(lambda: pandas_export(args.rows, path))),
+            ('XlsxRecordWriter', measure(lambda: streaming_export(args.rows, path))),
+            ('XlsxRecordWriter, sheets', measure(lambda: streaming_export(args.rows, path, True))),
+        ]
+
+    print(f"{args.rows:,} rows")
+    print(f"{'export':<26} {'seconds':>10} {'rows/sec':>12} {'peak MB':>10}")
+    for name, result in results:
+        print(f"{name:<26} {result['seconds']:>10.2f} {args.rows / result['seconds']:>12,.0f} "
+              f"{result['peak_mb']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
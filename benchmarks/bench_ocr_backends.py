@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the OCR backends: per-page overhead of tesseract runs.
+
+The pytesseract backend starts one tesseract process per page, writing
+the image to a temporary file and loading the language models each time.
+The batch backend reads a batch of pages with one process. Both read the
+same images: tiny blank ones, where the time is almost all start-up
+overhead, and the pages of a synthetic scanned invoice. Needs the
+tesseract binary.
+
+Usage:
+    python benchmarks/bench_ocr_backends.py [--pages 16] [--batch 8] [--repeat 3]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fitz  # noqa: E402
+import numpy as np  # noqa: E402
+
+from benchmarks.bench_ocr_preprocess import current_preprocess  # noqa: E402
+from benchmarks.generate_corpus import build_invoice_pdf  # noqa: E402
+from invoice_parser import InvoiceParser, PytesseractBackend, TesseractBatchBackend, _load_pytesseract  # noqa: E402
+
+
+def read_all(backend, images: List[np.ndarray], batch: int) -> List[str]:
+    """OCR images with backend, batch images per call."""
+    texts = []
+    for start in range(0, len(images), batch):
+        texts.extend(backend.image_to_string(images[start:start + batch], '--psm 6'))
+    return texts
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--pages', type=int, default=16, help='Pages of each kind (default: 16)')
+    arg_parser.add_argument('--batch', type=int, default=8, help='Pages per batch run (default: 8)')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions (default: 3)')
+    args = arg_parser.parse_args()
+
+    if shutil.which(_load_pytesseract().pytesseract.tesseract_cmd) is None:
+        sys.exit('tesseract not found')
+
+    parser = InvoiceParser()
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'scanned.pdf')
+        build_invoice_pdf(path, pages=args.pages, rows_per_page=25, scanned=True)
+        with fitz.open(path) as doc:
+            scanned = [current_preprocess(parser, page) for page in doc]
+    blank = [np.full((64, 64), 255, dtype=np.uint8)] * args.pages
+
+    single, batched = PytesseractBackend(), TesseractBatchBackend()
+    # pytesseract's text keeps tesseract's page separator; the batch backend splits on it
+    if [text.strip() for text in read_all(single, scanned, 1)] != \
+            [text.strip() for text in read_all(batched, scanned, args.batch)]:
+        print('note: batch output differs from pytesseract output', file=sys.stderr)
+
+    print(f"{args.pages} pages per kind, batches of {args.batch}")
+    print(f"{'images':<10} {'pytesseract ms/page':>20} {'batch ms/page':>15} {'speedup':>9}")
+    for name, images in (('blank', blank), ('scanned', scanned)):
+        before = min(timeit.repeat(lambda: read_all(single, images, 1), number=1, repeat=args.repeat))
+        after = min(timeit.repeat(lambda: read_all(batched, images, args.batch), number=1, repeat=args.repeat))
+        print(f"{name:<10} {before * 1000 / len(images):>20.1f} {after * 1000 / len(images):>15.1f} "
+              f"{before / after:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
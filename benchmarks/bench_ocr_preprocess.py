@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark for OCR page rendering and preprocessing, before tesseract runs.
+
+The previous path rendered each page to an RGB pixmap, encoded it to PNG,
+decoded it with PIL, copied it into a NumPy array, converted it to BGR and
+then to grayscale, and ran a (1, 1) closing and blur that changed nothing.
+The current path renders straight to a grayscale pixmap, wraps its samples
+as a NumPy view and only thresholds it. Both run over the pages of a
+synthetic scanned invoice; the time per page and how many binarized pixels
+agree are reported.
+
+Usage:
+    python benchmarks/bench_ocr_preprocess.py [--pages 10] [--repeat 3]
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import cv2  # noqa: E402
+import fitz  # noqa: E402
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from benchmarks.generate_corpus import build_invoice_pdf  # noqa: E402
+from invoice_parser import InvoiceParser, _pixmap_array  # noqa: E402
+
+
+def legacy_preprocess(page) -> np.ndarray:
+    """The previous render, PNG round trip and preprocessing, kept as the baseline."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+    img = Image.open(io.BytesIO(pix.tobytes("png")))
+    img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, np.ones((1, 1), np.uint8))
+    return cv2.GaussianBlur(binary, (1, 1), 0)
+
+
+def current_preprocess(parser: InvoiceParser, page) -> np.ndarray:
+    pix = parser._render_page_for_ocr(page)
+    # Copied only so the result outlives pix, for the comparison below
+    return parser._preprocess_image_for_ocr(_pixmap_array(pix)).copy()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--pages', type=int, default=10, help='Scanned pages (default: 10)')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions (default: 3)')
+    args = arg_parser.parse_args()
+
+    parser = InvoiceParser()
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'scanned.pdf')
+        build_invoice_pdf(path, pages=args.pages, rows_per_page=25, scanned=True)
+        with fitz.open(path) as doc:
+            pages = list(doc)
+            agreement = np.mean([np.mean(legacy_preprocess(page) == current_preprocess(parser, page))
+                                 for page in pages])
+            legacy = min(timeit.repeat(lambda: [legacy_preprocess(page) for page in pages],
+                                       number=1, repeat=args.repeat))
+            current = min(timeit.repeat(lambda: [current_preprocess(parser, page) for page in pages],
+                                        number=1, repeat=args.repeat))
+
+    print(f"{args.pages} scanned pages, {agreement:.2%} of binarized pixels identical")
+    print(f"legacy:  {legacy * 1000 / args.pages:8.1f} ms/page")
+    print(f"current: {current * 1000 / args.pages:8.1f} ms/page")
+    print(f"speedup: {legacy / current:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
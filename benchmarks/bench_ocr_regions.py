@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark for region-of-interest OCR (ocr_layout.crop_to_text).
+
+Tesseract's time grows with the pixels it reads. Over the pages of a
+synthetic scanned invoice this reports how many pixels the full binarized
+pages and their text-band crops hold, how much of the text ink the crops
+keep, and what the layout pass costs per page. Tesseract itself is not
+needed.
+
+Usage:
+    python benchmarks/bench_ocr_regions.py [--pages 10] [--rows 25] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fitz  # noqa: E402
+import numpy as np  # noqa: E402
+
+from benchmarks.bench_ocr_preprocess import current_preprocess  # noqa: E402
+from benchmarks.generate_corpus import build_invoice_pdf  # noqa: E402
+from invoice_parser import InvoiceParser  # noqa: E402
+from ocr_layout import crop_to_text  # noqa: E402
+
+
+def region_volume(images: List[np.ndarray]) -> Dict:
+    """Pixels and dark (ink) pixels of full pages and of their crops; pages that aren't cropped count in full."""
+    full_pixels = crop_pixels = full_ink = crop_ink = 0
+    for image in images:
+        cropped = crop_to_text(image)
+        if cropped is None:
+            cropped = image
+        full_pixels += image.size
+        crop_pixels += cropped.size
+        full_ink += int((image < 128).sum())
+        crop_ink += int((cropped < 128).sum())
+    return {'full_pixels': full_pixels, 'crop_pixels': crop_pixels,
+            'ink_kept': crop_ink / full_ink if full_ink else 1.0}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--pages', type=int, default=10, help='Scanned pages (default: 10)')
+    arg_parser.add_argument('--rows', type=int, default=25, help='Line items per page (default: 25)')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions (default: 3)')
+    args = arg_parser.parse_args()
+
+    parser = InvoiceParser()
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'scanned.pdf')
+        build_invoice_pdf(path, pages=args.pages, rows_per_page=args.rows, scanned=True)
+        with fitz.open(path) as doc:
+            images = [current_preprocess(parser, page) for page in doc]
+    volume = region_volume(images)
+    layout = min(timeit.repeat(lambda: [crop_to_text(image) for image in images], number=1, repeat=args.repeat))
+
+    print(f"{args.pages} scanned pages, {args.rows} rows each, {volume['ink_kept']:.2%} of text ink kept")
+    print(f"full pages:  {volume['full_pixels'] / args.pages / 1e6:8.2f} Mpx/page")
+    print(f"text crops:  {volume['crop_pixels'] / args.pages / 1e6:8.2f} Mpx/page")
+    print(f"reduction:   {volume['full_pixels'] / volume['crop_pixels']:8.2f}x")
+    print(f"layout pass: {layout * 1000 / args.pages:8.1f} ms/page")
+
+
+if __name__ == '__main__':
+    main()
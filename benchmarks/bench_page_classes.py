@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the page classification pre-pass (InvoiceParser(classify_pages=True)).
+
+Builds an invoice packet: the synthetic invoice pages plus a cover letter,
+terms and conditions pages, a remittance slip and blank separator pages,
+as scanned-and-assembled packets often have. Reports how the classifier
+routes the pages, how many reach pdfplumber and OCR with and without it,
+and the parse time of the packet without its blank pages (which would
+need tesseract without the classifier). Tesseract itself is not needed.
+
+Usage:
+    python benchmarks/bench_page_classes.py [--pages 4] [--extra 4] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import timeit
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fitz  # noqa: E402
+
+from benchmarks.generate_corpus import build_invoice_pdf  # noqa: E402
+from invoice_parser import InvoiceParser  # noqa: E402
+
+COVER_LINES = ['Acme Billing Services', 'Billed to', 'Acme Holdings, 100 King St W, Toronto',
+               'Please find enclosed your invoice for the period below.',
+               'Invoice Period: 04/01/2025-04/30/2025']
+TERMS_LINES = ['Terms and conditions'] + [
+    f"{n}. Payment is due within thirty days of receipt. Late payments accrue interest at 1.5% per month "
+    f"on the outstanding balance, and services may be suspended." for n in range(1, 40)]
+REMITTANCE_LINES = ['Remittance slip', 'Please return this portion with your payment',
+                    'Account number: 000123456', 'Amount enclosed: ____________']
+
+
+def _text_page(doc, lines):
+    page = doc.new_page(width=612, height=792)
+    y = 60
+    for line in lines:
+        page.insert_text((50, y), line, fontsize=8)
+        y += 12
+
+
+def build_packet(path: str, pages: int, extra: int, blank: bool = True) -> None:
+    """Write an invoice packet: a cover letter, invoice pages, extra terms pages and a remittance slip."""
+    invoice_path = path + '.invoice.pdf'
+    build_invoice_pdf(invoice_path, pages=pages, rows_per_page=25)
+    doc = fitz.open()
+    _text_page(doc, COVER_LINES)
+    with fitz.open(invoice_path) as invoice:
+        for page_num in range(len(invoice)):
+            doc.insert_pdf(invoice, from_page=page_num, to_page=page_num)
+            if blank:
+                doc.new_page(width=612, height=792)
+    os.remove(invoice_path)
+    for _ in range(extra):
+        _text_page(doc, TERMS_LINES)
+    _text_page(doc, REMITTANCE_LINES)
+    doc.save(path)
+    doc.close()
+
+
+def page_routes(path: str) -> Counter:
+    """Page classes of a PDF, and the pages the parser would OCR without the classifier."""
+    parser = InvoiceParser(classify_pages=True)
+    routes = Counter()
+    with fitz.open(path) as doc:
+        for page in doc:
+            page_class, text = parser._classify_page(page)
+            routes[page_class] += 1
+            if not parser._has_text_layer(text):
+                routes['no_text_layer'] += 1
+    return routes
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--pages', type=int, default=4, help='Invoice pages (default: 4)')
+    arg_parser.add_argument('--extra', type=int, default=4, help='Terms and conditions pages (default: 4)')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions (default: 3)')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        packet = os.path.join(work_dir, 'packet.pdf')
+        build_packet(packet, args.pages, args.extra)
+        routes = page_routes(packet)
+        text_packet = os.path.join(work_dir, 'text_packet.pdf')
+        build_packet(text_packet, args.pages, args.extra, blank=False)
+
+        timings = {}
+        for classify in (False, True):
+            parser = InvoiceParser(classify_pages=classify)
+            with contextlib.redirect_stdout(io.StringIO()):
+                records = parser.parse_pdf(text_packet, use_cache=False)
+                seconds = min(timeit.repeat(lambda: parser.parse_pdf(text_packet, use_cache=False),
+                                            number=1, repeat=args.repeat))
+            timings[classify] = (seconds, len(records))
+
+    total = sum(routes[name] for name in ('line_items', 'header', 'ocr', 'skip'))
+    print(f"{total} pages: " + ', '.join(f"{routes[name]} {name}" for name in ('line_items', 'header', 'ocr', 'skip')))
+    print(f"pdfplumber pages: {total - routes['no_text_layer']:4d} without classifier, "
+          f"{routes['line_items']:4d} with")
+    print(f"OCR pages:        {routes['no_text_layer']:4d} without classifier, {routes['ocr']:4d} with")
+    for classify, (seconds, rows) in timings.items():
+        print(f"parse_pdf, text pages only, classify_pages={classify!s:<5}: {seconds * 1000:8.1f} ms, {rows} rows")
+    print(f"speedup: {timings[False][0] / timings[True][0]:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the compact record model (invoice_records).
+
+Field extraction used to build one dict per line item, repeating the Billed
+To, Invoice Period and Issue date on every one, and post-processing copied
+every dict again. It now builds slotted LineItems that share one
+InvoiceHeader per page, fills and cleans them in place, and flattens them to
+dicts only on output. Both pipelines run over the same synthetic pages
+(the previous one is kept below as the baseline); the tracemalloc peak
+during the run and the size of the result kept afterwards are reported.
+
+Usage:
+    python benchmarks/bench_record_memory.py [--pages 500] [--rows 40]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.bench_extract_fields import build_page  # noqa: E402
+from invoice_parser import InvoiceParser  # noqa: E402
+
+HEADER_FIELDS = ('Billed To', 'Invoice Period', 'Invoice Issue Date')
+
+
+def legacy_post_process_data(data: List[Dict]) -> List[Dict]:
+    """The previous dict-copying post-processing, kept as the baseline."""
+    first_values = {}
+    for record in data:
+        for field in HEADER_FIELDS:
+            if field not in first_values and record.get(field):
+                first_values[field] = record[field]
+    processed_data = []
+    for record in data:
+        processed_record = record.copy()
+        for field in HEADER_FIELDS:
+            if not processed_record.get(field) and field in first_values:
+                processed_record[field] = first_values[field]
+        if processed_record.get('Company Name'):
+            company = processed_record['Company Name'].strip()
+            company = re.sub(r'\s+', ' ', company)
+            company = re.sub(r'[^\w\s&.,()-]', '', company)
+            processed_record['Company Name'] = company
+        if (processed_record.get('Company Name') and processed_record.get('Plan') and
+                processed_record['Company Name'].strip() and processed_record['Plan'].strip()):
+            processed_data.append(processed_record)
+    return processed_data
+
+
+def legacy_parse(parser: InvoiceParser, pages: List[str]) -> List[Dict]:
+    data = [record for page in pages for record in parser._extract_fields_from_text(page)]
+    return legacy_post_process_data(data)
+
+
+def measure(func: Callable[[], object]) -> Dict:
+    """Return wall time of one run, and tracemalloc peak and retained size of a second run."""
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': seconds, 'peak_mb': peak / (1024 * 1024), 'retained_mb': retained / (1024 * 1024),
+            'rows': len(result)}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--pages', type=int, default=500, help='Number of pages (default: 500)')
+    arg_parser.add_argument('--rows', type=int, default=40, help='Line items per page (default: 40)')
+    args = arg_parser.parse_args()
+
+    rng = random.Random(42)
+    pages = [build_page(rng, page_num, args.rows) for page_num in range(args.pages)]
+    page_texts = [(page_num, 'pdfplumber', text) for page_num, text in enumerate(pages)]
+    parser = InvoiceParser()
+
+    # parse_page_items prints every page, like parse_pdf
+    with contextlib.redirect_stdout(io.StringIO()):
+        if parser.parse_page_texts(page_texts) != legacy_parse(parser, pages):
+            sys.exit('Compact records differ from the legacy pipeline')
+        results = [
+            ('legacy dicts', measure(lambda: legacy_parse(parser, pages))),
+            ('parse_page_texts', measure(lambda: parser.parse_page_texts(page_texts))),
+            ('parse_page_items', measure(lambda: parser.parse_page_items(page_texts))),
+        ]
+
+    print(f"{args.pages} pages, {results[0][1]['rows']:,} rows, identical output")
+    print(f"{'pipeline':<18} {'seconds':>10} {'peak MB':>10} {'kept MB':>10}")
+    for name, result in results:
+        print(f"{name:<18} {result['seconds']:>10.3f} {result['peak_mb']:>10.1f} {result['retained_mb']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
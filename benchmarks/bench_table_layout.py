@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark for positional table reconstruction (table_layout.layout_text).
+
+Over the pages of a synthetic invoice this compares the line-item pass on
+pdfplumber's flattened text, where every row goes through the plan lookup
+and regex cascade, with the same pass on the text layout_text rebuilds
+from the page's word boxes, where rows are split on tabs. The cost of
+layout_text itself is reported separately, and both passes must extract
+the same items.
+
+Usage:
+    python benchmarks/bench_table_layout.py [--pages 10] [--rows 25] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pdfplumber  # noqa: E402
+
+from benchmarks.generate_corpus import build_invoice_pdf  # noqa: E402
+from invoice_parser import InvoiceParser  # noqa: E402
+from invoice_records import to_records  # noqa: E402
+from table_layout import Word, layout_text, words_from_pdfplumber  # noqa: E402
+
+
+def page_texts(path: str) -> Tuple[List[str], List[List[Word]]]:
+    """pdfplumber's flattened text and word boxes of each page of a PDF."""
+    with pdfplumber.open(path) as pdf:
+        return [page.extract_text() for page in pdf.pages], [words_from_pdfplumber(page) for page in pdf.pages]
+
+
+def same_items(parser: InvoiceParser, texts: List[str], other_texts: List[str]) -> bool:
+    """Whether two versions of the same pages yield the same records."""
+    return [to_records(parser._extract_items_from_text(text)) for text in texts] == \
+        [to_records(parser._extract_items_from_text(text)) for text in other_texts]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--pages', type=int, default=10, help='Invoice pages (default: 10)')
+    arg_parser.add_argument('--rows', type=int, default=25, help='Line items per page (default: 25)')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (default: 5)')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'invoice.pdf')
+        build_invoice_pdf(path, pages=args.pages, rows_per_page=args.rows)
+        flat, words = page_texts(path)
+    positional = [layout_text(page_words) for page_words in words]
+
+    parser = InvoiceParser()
+    if not same_items(parser, flat, positional):
+        sys.exit('positional and text tables extract different items')
+
+    def best(func):
+        return min(timeit.repeat(func, number=1, repeat=args.repeat)) * 1000 / args.pages
+
+    text_pass = best(lambda: [parser._extract_items_from_text(text) for text in flat])
+    tab_pass = best(lambda: [parser._extract_items_from_text(text) for text in positional])
+    layout = best(lambda: [layout_text(page_words) for page_words in words])
+
+    print(f"{args.pages} pages, {args.rows} rows each")
+    print(f"items from flattened text:  {text_pass:8.3f} ms/page")
+    print(f"items from positional text: {tab_pass:8.3f} ms/page")
+    print(f"layout_text:                {layout:8.3f} ms/page")
+    print(f"line-item pass speedup:     {text_pass / tab_pass:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
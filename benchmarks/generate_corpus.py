@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Synthetic invoice corpus generator.
+
+Builds PDFs in the layout InvoiceParser._extract_fields_from_text expects:
+a Billed To / Invoice Period / Issue date header, a Company/Plan/Qty/Unit
+Price/Amount table with optional wrapped company names and discount lines,
+and a Subtotal/Total footer on every page. A scanned variant rasterizes each
+page into an image-only PDF so it has no text layer and goes through OCR.
+
+Usage:
+    python benchmarks/generate_corpus.py ./corpus --count 50 --pages 4 --rows 25
+    python benchmarks/generate_corpus.py ./corpus --count 10 --scanned
+"""
+
+import argparse
+import os
+import random
+import sys
+from typing import List, Optional
+
+import fitz  # PyMuPDF
+
+PLANS = ['Base Plan', 'Ultimate Plan', '$0 Per Usage Fee Plan', 'Premium Plan', 'Standard Plan']
+PRICES = {'Base Plan': 20, 'Ultimate Plan': 50, '$0 Per Usage Fee Plan': 0, 'Premium Plan': 35, 'Standard Plan': 10}
+WORDS = ['Northern', 'Maple', 'Summit', 'Harbour', 'Pioneer', 'Cedar', 'Atlas', 'Beacon', 'Granite', 'Willow']
+SUFFIXES = ['Ltd', 'Inc', 'Holdings', 'Trading Company', 'Logistics Corp', 'Dental Clinic']
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+MARGIN = 50
+LINE_HEIGHT = 13
+FONT_SIZE = 9
+# Column x positions for Company, Plan, Qty, Unit Price, Amount
+COLUMNS = (MARGIN, 250, 390, 440, 510)
+
+
+def _company_name(rng: random.Random, wrap: bool) -> List[str]:
+    """Return a company name as one line, or two lines when it wraps."""
+    name = [rng.choice(WORDS), rng.choice(WORDS), rng.choice(SUFFIXES)]
+    if wrap:
+        return [' '.join(name[:2]), name[2]]
+    return [' '.join(name)]
+
+
+def _format_money(cents: int) -> str:
+    sign = '-' if cents < 0 else ''
+    return f"{sign}${abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+
+def build_page_rows(rng: random.Random, rows: int, wrap_ratio: float,
+                    discount_ratio: float) -> List[List[str]]:
+    """
+    Build the table rows of one page.
+
+    Returns:
+        List[List[str]]: One list of cell texts per printed line; wrapped
+        company names take a line of their own holding only the first part
+    """
+    lines = []
+    for _ in range(rows):
+        company = _company_name(rng, rng.random() < wrap_ratio)
+        if len(company) == 2:
+            lines.append([company[0]])
+        plan = rng.choice(PLANS)
+        qty = rng.randint(1, 40)
+        price = PRICES[plan] * 100
+        lines.append([company[-1], plan, str(qty), _format_money(price), _format_money(qty * price)])
+        if rng.random() < discount_ratio:
+            lines.append(['', '20% off', '', '', _format_money(-qty * price // 5)])
+    return lines
+
+
+def build_invoice_pdf(path: str, pages: int = 1, rows_per_page: int = 20, wrap_ratio: float = 0.15,
+                      discount_ratio: float = 0.05, scanned: bool = False, dpi: int = 150,
+                      seed: Optional[int] = 0) -> int:
+    """
+    Write a synthetic invoice PDF.
+
+    Args:
+        path (str): Output PDF path
+        pages (int): Number of pages
+        rows_per_page (int): Plan line items per page
+        wrap_ratio (float): Share of company names wrapped onto two lines
+        discount_ratio (float): Share of line items followed by a 20% off line
+        scanned (bool): Rasterize every page so the PDF has no text layer
+        dpi (int): Resolution of the rasterized pages
+        seed (int): Random seed, for reproducible corpora
+
+    Returns:
+        int: Number of records the parser should extract (line items plus discounts)
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    expected = 0
+    for page_num in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        y = MARGIN + LINE_HEIGHT
+
+        def write(text, x=MARGIN, size=FONT_SIZE):
+            page.insert_text((x, y), text, fontsize=size)
+
+        write('INVOICE', size=16)
+        y += LINE_HEIGHT * 2
+        for line in ['Billed to', 'Acme Holdings, 100 King St W, Toronto',
+                     'Invoice Period: 04/01/2025-04/30/2025', 'Issue date: APR 30, 2025',
+                     'Payment terms: Net 30']:
+            write(line)
+            y += LINE_HEIGHT
+        y += LINE_HEIGHT
+
+        for x, header in zip(COLUMNS, ['Company', 'Plan', 'Qty', 'Unit Price', 'Amount']):
+            write(header, x)
+        y += LINE_HEIGHT
+
+        for cells in build_page_rows(rng, rows_per_page, wrap_ratio, discount_ratio):
+            if len(cells) == 5:
+                expected += 1
+            for x, cell in zip(COLUMNS, cells):
+                if cell:
+                    write(cell, x)
+            y += LINE_HEIGHT
+            if y > PAGE_HEIGHT - MARGIN * 2:
+                break
+
+        y += LINE_HEIGHT
+        write('Subtotal', COLUMNS[3])
+        y += LINE_HEIGHT
+        write('Total', COLUMNS[3])
+        write(f"Page {page_num + 1} of {pages}", MARGIN, 7)
+
+    if scanned:
+        doc = _rasterize(doc, dpi)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return expected
+
+
+def _rasterize(doc, dpi: int):
+    """Replace every page by an image of itself, dropping the text layer."""
+    scanned = fitz.open()
+    for page in doc:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        new_page = scanned.new_page(width=page.rect.width, height=page.rect.height)
+        new_page.insert_image(new_page.rect, pixmap=pix)
+    doc.close()
+    return scanned
+
+
+def generate_corpus(output_dir: str, count: int, pages: int = 1, rows_per_page: int = 20,
+                    wrap_ratio: float = 0.15, scanned: bool = False, seed: int = 0) -> List[str]:
+    """
+    Write count invoices named invoice_0000.pdf, invoice_0001.pdf, ... to output_dir.
+
+    Returns:
+        List[str]: Paths of the generated PDFs
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for index in range(count):
+        suffix = '_scanned' if scanned else ''
+        path = os.path.join(output_dir, f"invoice_{index:04d}{suffix}.pdf")
+        build_invoice_pdf(path, pages=pages, rows_per_page=rows_per_page, wrap_ratio=wrap_ratio,
+                          scanned=scanned, seed=seed + index)
+        paths.append(path)
+    return paths
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('output_dir', help='Directory to write PDFs to')
+    arg_parser.add_argument('--count', type=int, default=10, help='Number of invoices (default: 10)')
+    arg_parser.add_argument('--pages', type=int, default=1, help='Pages per invoice (default: 1)')
+    arg_parser.add_argument('--rows', type=int, default=20, help='Line items per page (default: 20)')
+    arg_parser.add_argument('--wrap-ratio', type=float, default=0.15,
+                            help='Share of wrapped company names (default: 0.15)')
+    arg_parser.add_argument('--scanned', action='store_true', help='Generate image-only (scanned) PDFs')
+    arg_parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = arg_parser.parse_args()
+
+    paths = generate_corpus(args.output_dir, args.count, args.pages, args.rows,
+                            args.wrap_ratio, args.scanned, args.seed)
+    print(f"Wrote {len(paths)} invoices to {args.output_dir}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
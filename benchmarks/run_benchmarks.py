@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmarks for the invoice parser.
+
+Generates a reproducible synthetic corpus (see generate_corpus.py) and
+reports pages/sec and rows/sec for each extraction engine (pdfplumber,
+PyMuPDF, OCR), for field extraction alone, for end-to-end parse_pdf on
+digital and scanned invoices, and for save_to_csv / save_to_excel.
+
+OCR benchmarks are skipped when the tesseract binary is not available.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --docs 20 --pages 5 --rows 40 --scanned-docs 2 --json results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fitz  # noqa: E402
+import pdfplumber  # noqa: E402
+import pytesseract  # noqa: E402
+
+from benchmarks.generate_corpus import generate_corpus  # noqa: E402
+from invoice_parser import InvoiceParser  # noqa: E402
+
+
+def _timed(func: Callable, repeat: int):
+    """Run func repeat times and return (best seconds, last result), with stdout silenced."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _row(name: str, seconds: float, pages: int = None, rows: int = None) -> Dict:
+    return {
+        'benchmark': name,
+        'seconds': round(seconds, 4),
+        'pages_per_sec': round(pages / seconds, 2) if pages else None,
+        'rows_per_sec': round(rows / seconds, 2) if rows else None,
+    }
+
+
+def tesseract_available() -> bool:
+    return shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+
+def run(docs: int, pages: int, rows: int, scanned_docs: int, repeat: int, work_dir: str) -> List[Dict]:
+    """Generate the corpus in work_dir and run every benchmark."""
+    parser = InvoiceParser()
+    results = []
+
+    text_paths = generate_corpus(os.path.join(work_dir, 'text'), docs, pages, rows)
+    page_count = docs * pages
+
+    def pdfplumber_texts():
+        texts = []
+        for path in text_paths:
+            with pdfplumber.open(path) as pdf:
+                texts.extend(page.extract_text() for page in pdf.pages)
+        return texts
+
+    def pymupdf_texts():
+        texts = []
+        for path in text_paths:
+            with fitz.open(path) as doc:
+                texts.extend(page.get_text() for page in doc)
+        return texts
+
+    seconds, texts = _timed(pdfplumber_texts, repeat)
+    results.append(_row('engine: pdfplumber text', seconds, pages=page_count))
+    seconds, _ = _timed(pymupdf_texts, repeat)
+    results.append(_row('engine: pymupdf text', seconds, pages=page_count))
+
+    seconds, extracted = _timed(lambda: [r for text in texts for r in parser._extract_fields_from_text(text)], repeat)
+    results.append(_row('field extraction', seconds, pages=page_count, rows=len(extracted)))
+
+    seconds, records = _timed(lambda: [r for path in text_paths for r in parser.parse_pdf(path)], repeat)
+    results.append(_row('parse_pdf: digital', seconds, pages=page_count, rows=len(records)))
+
+    csv_path = os.path.join(work_dir, 'out.csv')
+    xlsx_path = os.path.join(work_dir, 'out.xlsx')
+    seconds, _ = _timed(lambda: parser.save_to_csv(records, csv_path), repeat)
+    results.append(_row('save_to_csv', seconds, rows=len(records)))
+    seconds, _ = _timed(lambda: parser.save_to_excel(records, xlsx_path), repeat)
+    results.append(_row('save_to_excel', seconds, rows=len(records)))
+
+    if scanned_docs and tesseract_available():
+        scanned_paths = generate_corpus(os.path.join(work_dir, 'scanned'), scanned_docs, pages, rows, scanned=True)
+        scanned_pages = scanned_docs * pages
+
+        def ocr_texts():
+            # The page path parse_pdf takes; scanned pages have no text layer, so every page is OCR'd
+            texts = []
+            for path in scanned_paths:
+                with open(path, 'rb') as f:
+                    texts.extend(text for _, _, text in parser._extract_page_texts(f.read()))
+            return texts
+
+        seconds, _ = _timed(ocr_texts, 1)
+        results.append(_row('engine: ocr', seconds, pages=scanned_pages))
+        batched = InvoiceParser(ocr_backend='batch')
+        seconds, records = _timed(lambda: [r for path in scanned_paths for r in batched.parse_pdf(path)], 1)
+        results.append(_row('parse_pdf: scanned batch', seconds, pages=scanned_pages, rows=len(records)))
+        seconds, records = _timed(lambda: [r for path in scanned_paths for r in parser.parse_pdf(path)], 1)
+        results.append(_row('parse_pdf: scanned', seconds, pages=scanned_pages, rows=len(records)))
+        adaptive = InvoiceParser(adaptive_ocr=True)
+        seconds, records = _timed(lambda: [r for path in scanned_paths for r in adaptive.parse_pdf(path)], 1)
+        results.append(_row('parse_pdf: scanned adaptive', seconds, pages=scanned_pages, rows=len(records)))
+    elif scanned_docs:
+        print('tesseract not found, skipping OCR benchmarks', file=sys.stderr)
+
+    return results
+
+
+def print_table(results: List[Dict]) -> None:
+    print(f"{'benchmark':<28} {'seconds':>10} {'pages/sec':>12} {'rows/sec':>12}")
+    for result in results:
+        pages = f"{result['pages_per_sec']:,.1f}" if result['pages_per_sec'] else '-'
+        rows = f"{result['rows_per_sec']:,.1f}" if result['rows_per_sec'] else '-'
+        print(f"{result['benchmark']:<28} {result['seconds']:>10.3f} {pages:>12} {rows:>12}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--docs', type=int, default=10, help='Digital invoices to generate (default: 10)')
+    arg_parser.add_argument('--pages', type=int, default=3, help='Pages per invoice (default: 3)')
+    arg_parser.add_argument('--rows', type=int, default=30, help='Line items per page (default: 30)')
+    arg_parser.add_argument('--scanned-docs', type=int, default=2,
+                            help='Scanned invoices to generate for OCR benchmarks (default: 2, 0 to skip)')
+    arg_parser.add_argument('--repeat', type=int, default=3,
+                            help='Repetitions for non-OCR benchmarks, best time is kept (default: 3)')
+    arg_parser.add_argument('--json', help='Also write results as JSON to this path')
+    args = arg_parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run(args.docs, args.pages, args.rows, args.scanned_docs, args.repeat, work_dir)
+
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'parameters': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,7 @@ from invoice_parser import InvoiceParser
 import pandas as pd
 import tempfile
 import os
+import logging
 
 def example_single_pdf_processing():
     """Example of processing a single PDF file."""
@@ -254,4 +255,5 @@ def main():
     print("3. Check the generated output files")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     main() 
\ No newline at end of file
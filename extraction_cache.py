@@ -0,0 +1,156 @@
+"""
+Content-addressed on-disk cache of InvoiceParser.parse_pdf results.
+
+Entries are keyed by the SHA-256 of the PDF bytes together with the parser
+version, so re-uploading or re-dropping the same invoice returns the stored
+rows without running any extraction engine, and bumping PARSER_VERSION
+invalidates everything at once. The cache is bounded in size; the least
+recently used entries are evicted first.
+
+The size is tracked in memory rather than by listing the directory on
+every write. Copies of the cache in worker processes start from the size
+their parent knew, so a put only rescans the directory when the tracked
+size goes over budget, or for about one put in RESCAN_EVERY_PUTS, which
+catches up with entries other processes wrote in the meantime.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = '.invoice_cache'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Roughly one put in this many rescans the directory even while under budget
+RESCAN_EVERY_PUTS = 64
+
+
+class ExtractionCache:
+    """
+    Size-bounded LRU cache of extracted records stored as JSON files.
+
+    Safe to share between threads and between processes pointing at the same
+    directory: entries are written atomically and a missing or corrupt entry
+    is treated as a miss.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        # Locks can't be pickled; drop it so the cache can be sent to worker processes.
+        # Measure the size once here so the copies don't each rescan on their first put.
+        with self._lock:
+            if self._size is None:
+                self._evict()
+            state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(doc_hash: str, version: str) -> str:
+        """Build the cache key from a PDF's SHA-256 hex digest and a parser version."""
+        return hashlib.sha256(f"{version}:{doc_hash}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """
+        Look up cached records.
+
+        Returns:
+            Optional[List[Dict]]: The cached records, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            # Touch the entry so eviction sees it as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {str(e)}")
+            return None
+        logger.info(f"Cache hit: {key[:12]}")
+        return records
+
+    def put(self, key: str, records: List[Dict]) -> None:
+        """Store records under key and evict old entries if over the size limit."""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {path}: {str(e)}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._evict()
+                return
+            self._size += size
+            # Keys are hashes, so this picks puts evenly in every process sharing the directory
+            if self._size > self.max_bytes or zlib.crc32(key.encode('utf-8')) % RESCAN_EVERY_PUTS == 0:
+                self._evict()
+
+    def _entries(self) -> List[os.DirEntry]:
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if shard.is_dir():
+                entries.extend(entry for entry in os.scandir(shard.path) if entry.name.endswith('.json'))
+        return entries
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                total -= size
+            except OSError as e:
+                logger.warning(f"Could not evict cache entry {path}: {str(e)}")
+        self._size = total
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        with self._lock:
+            for entry in self._entries():
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+            self._size = 0
@@ -0,0 +1,180 @@
+"""
+Persistent manifest of processed input files.
+
+Each processed PDF is recorded in a SQLite database by absolute path, with the
+SHA-256 of its bytes, its size and modification time, whether processing
+succeeded, how many records it produced, how long it took, the error if it
+failed and how many attempts it has had. Entries are written as each file
+finishes, so the manifest survives a run that dies halfway.
+
+main.py uses it in two ways. Directory runs record every file and, with
+--resume, skip the files already done and retry failed ones up to a limit;
+their summary is read back from the manifest. The watch mode looks files
+up by content hash, so a file is parsed once however often it is copied,
+touched or re-dropped, and across restarts. Unchanged files are recognized
+by path, size and modification time without reading them.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCH_MANIFEST = '.invoice_watch.db'
+DEFAULT_RUN_MANIFEST = '.invoice_run.db'
+
+# Attempts a failing file gets across resumed directory runs
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Status values of a manifest entry
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    file_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    records INTEGER NOT NULL DEFAULT 0,
+    duration REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    processed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_hash ON files (file_hash);
+"""
+
+# Bytes read at a time when hashing a file
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 hex digest of a file's bytes, the same digest InvoiceParser keys its cache with."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileManifest:
+    """
+    SQLite-backed record of processed files, keyed by path and indexed by content hash.
+
+    Each thread and each process opens its own connection, like
+    PageTextStore.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_WATCH_MANIFEST):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def __getstate__(self):
+        # Connections can't be pickled; worker processes open their own
+        return {'db_path': self.db_path}
+
+    def __setstate__(self, state):
+        self.db_path = state['db_path']
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def status(self, file_hash: str) -> Optional[str]:
+        """Latest status of any file with this content hash, None if none was processed."""
+        row = self._connect().execute(
+            'SELECT status FROM files WHERE file_hash = ? ORDER BY processed_at DESC LIMIT 1', (file_hash,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def entries(self) -> Dict[str, Dict]:
+        """
+        Load every entry.
+
+        Returns:
+            Dict[str, Dict]: Entry dicts (file_hash, size, mtime_ns, status,
+            records, duration, error, attempts, processed_at) by absolute path
+        """
+        conn = self._connect()
+        cursor = conn.execute(
+            'SELECT path, file_hash, size, mtime_ns, status, records, duration, error, attempts, processed_at '
+            'FROM files'
+        )
+        columns = [column[0] for column in cursor.description]
+        return {row[0]: dict(zip(columns[1:], row[1:])) for row in cursor}
+
+    def has_unchanged(self, path: str, size: int, mtime_ns: int) -> bool:
+        """Check whether a file was processed at this path with this size and modification time."""
+        row = self._connect().execute(
+            'SELECT 1 FROM files WHERE path = ? AND size = ? AND mtime_ns = ?', (os.path.abspath(path), size, mtime_ns)
+        ).fetchone()
+        return row is not None
+
+    def record(self, file_hash: str, path: str, size: int, mtime_ns: int, status: str, records: int = 0,
+               duration: float = 0.0, error: Optional[str] = None, attempts: int = 1) -> None:
+        """
+        Record the outcome of processing a file, replacing any earlier entry for the same path.
+
+        Args:
+            file_hash (str): SHA-256 of the file bytes
+            path (str): Path the file was processed at; stored as an absolute path
+            size (int): File size in bytes
+            mtime_ns (int): Modification time in nanoseconds
+            status (str): STATUS_DONE or STATUS_FAILED
+            records (int): Records extracted
+            duration (float): Processing time in seconds
+            error (str): Why processing failed
+            attempts (int): Attempts so far, this one included
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO files (path, file_hash, size, mtime_ns, status, records, duration, error, '
+                'attempts, processed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (os.path.abspath(path), file_hash, size, mtime_ns, status, records, duration, error, attempts,
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def summarize(self, paths: Iterable[str]) -> Dict:
+        """
+        Summarize the outcomes of a set of files, e.g. the files of one directory run.
+
+        Files without an entry count as failed.
+
+        Returns:
+            Dict: successful, failed and failed_files (in the order of paths),
+            plus the total records and seconds spent on them
+        """
+        entries = self.entries()
+        summary = {'successful': 0, 'failed': 0, 'failed_files': [], 'records': 0, 'seconds': 0.0}
+        for path in paths:
+            entry = entries.get(os.path.abspath(path))
+            if entry is not None and entry['status'] == STATUS_DONE:
+                summary['successful'] += 1
+            else:
+                summary['failed'] += 1
+                summary['failed_files'].append(path)
+            if entry is not None:
+                summary['records'] += entry['records']
+                summary['seconds'] += entry['duration']
+        return summary
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
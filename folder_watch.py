@@ -0,0 +1,211 @@
+"""
+Detection of new and changed PDFs in a folder, for main.py --watch.
+
+On Linux the folder is watched with inotify (through ctypes, so no extra
+package is needed): the kernel reports files as they are created, written,
+closed or moved in, and the folder is never re-listed. Elsewhere, or when
+inotify is unavailable (e.g. on some network shares), the folder is
+polled: its entries are stat'ed every poll interval and files whose size
+or modification time changed are picked up.
+
+Either way a file is only handed out once it has stopped changing for
+settle_seconds, so PDFs that are still being copied or uploaded are not
+parsed half-written:
+
+    with FolderWatcher('./incoming') as watcher:
+        while True:
+            for path in watcher.poll(1.0):
+                ...
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTLE_SECONDS = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify event flags (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+INOTIFY_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event header: wd, mask, cookie, len
+INOTIFY_EVENT = struct.Struct('iIII')
+
+# (size, modification time in ns) of a file
+Signature = Tuple[int, int]
+
+
+class _Inotify:
+    """Minimal inotify watch on one directory, reporting the names of changed entries."""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), INOTIFY_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def read(self, timeout: float) -> Optional[List[str]]:
+        """
+        Wait up to timeout seconds for events.
+
+        Returns:
+            Optional[List[str]]: Names of the entries that changed, or None if
+            the kernel's event queue overflowed and events were lost
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        names = []
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif name:
+                    names.append(os.fsdecode(name))
+        return None if overflow else names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Reports PDFs in a directory once they are new or changed and have stopped changing.
+
+    Files already in the directory when watching starts are reported too.
+    A file is reported again only after its size or modification time
+    changes.
+    """
+
+    def __init__(self, directory: str, settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+                 use_inotify: bool = True, suffix: str = '.pdf'):
+        self.directory = directory
+        self.settle_seconds = settle_seconds
+        self.suffix = suffix.lower()
+        # Signature of each file when it was last reported
+        self._reported: Dict[str, Signature] = {}
+        # Files waiting to settle: last signature seen and when it was first seen
+        self._pending: Dict[str, Tuple[Signature, float]] = {}
+
+        self._inotify = None
+        if use_inotify and sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify(directory)
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify unavailable, polling {directory} instead: {str(e)}")
+        # Started after the watch is in place, so no file slips through in between
+        self._scan()
+
+    @property
+    def uses_inotify(self) -> bool:
+        """Whether changes are reported by inotify rather than found by polling."""
+        return self._inotify is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _is_candidate(self, name: str) -> bool:
+        return name.lower().endswith(self.suffix) and not name.startswith('.')
+
+    def _signature(self, path: str) -> Optional[Signature]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _touch(self, path: str, now: float) -> None:
+        """Note a possibly changed file."""
+        signature = self._signature(path)
+        if signature is None or signature == self._reported.get(path):
+            return
+        if path not in self._pending or self._pending[path][0] != signature:
+            self._pending[path] = (signature, now)
+
+    def _scan(self) -> None:
+        """List the directory, noting every file not reported in its current state."""
+        now = time.monotonic()
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if self._is_candidate(entry.name) and entry.is_file():
+                        self._touch(entry.path, now)
+        except OSError as e:
+            logger.error(f"Cannot list {self.directory}: {str(e)}")
+
+    def poll(self, timeout: float = DEFAULT_POLL_INTERVAL) -> List[str]:
+        """
+        Wait up to timeout seconds for changes, then return the files that are ready.
+
+        Args:
+            timeout (float): Longest wait, in seconds
+
+        Returns:
+            List[str]: Paths of new or changed PDFs that have not changed for
+            settle_seconds, oldest change first
+        """
+        if self._inotify is not None:
+            names = self._inotify.read(timeout)
+            if names is None:
+                logger.warning(f"inotify events lost for {self.directory}, re-listing it")
+                self._scan()
+            else:
+                now = time.monotonic()
+                for name in names:
+                    if self._is_candidate(name):
+                        self._touch(os.path.join(self.directory, name), now)
+        else:
+            time.sleep(timeout)
+            self._scan()
+        return self._ready()
+
+    def _ready(self) -> List[str]:
+        """Move pending files that have settled to the reported set."""
+        now = time.monotonic()
+        ready = []
+        for path, (signature, since) in sorted(self._pending.items(), key=lambda item: item[1][1]):
+            current = self._signature(path)
+            if current is None:
+                del self._pending[path]
+            elif current != signature:
+                self._pending[path] = (current, now)
+            elif now - since >= self.settle_seconds and current[0] > 0:
+                del self._pending[path]
+                self._reported[path] = current
+                ready.append(path)
+        return ready
+
+    def close(self) -> None:
+        """Stop watching."""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
@@ -1,10 +1,24 @@
 # Gunicorn configuration file
+import os
+
 bind = "0.0.0.0:10000"
-workers = 2
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
 worker_class = "sync"
 worker_connections = 1000
 timeout = 300  # 5 minutes for file processing
 keepalive = 2
 max_requests = 1000
 max_requests_jitter = 50
-preload_app = True 
\ No newline at end of file
+preload_app = True
+
+def when_ready(server):
+    # The app is preloaded in the master, so text parsing is warmed up once
+    # here and inherited by every forked (and recycled) worker
+    from app import shared_parser
+    shared_parser.warm_up(ocr=False)
+
+def post_worker_init(worker):
+    # OpenCV and tesseract are warmed up in each worker rather than the
+    # master, so no native thread pools are started before forking
+    from app import shared_parser
+    shared_parser.warm_up(ocr=True)
@@ -1,136 +1,1201 @@
 import re
-import pandas as pd
 import pdfplumber
 import fitz  # PyMuPDF
-from datetime import datetime
-from dateutil import parser as date_parser
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union, BinaryIO, Callable, Iterable, Iterator, TYPE_CHECKING
 import logging
-import pytesseract
-import cv2
-import numpy as np
-from PIL import Image
 import io
 import os
+import hashlib
+import shlex
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from extraction_cache import ExtractionCache
+from page_text_store import PageTextStore
+from parse_metrics import ParseMetrics
+from record_writers import CsvRecordWriter, XlsxRecordWriter, ParquetRecordWriter
+from invoice_records import HEADER_ATTRS, InvoiceHeader, LineItem, from_records, to_records
+from table_layout import TABLE_CELL_SEPARATOR, TABLE_COLUMNS, layout_text, words_from_ocr_data, words_from_pdfplumber, \
+    words_from_pymupdf
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# OCR dependencies (OpenCV, NumPy, Pillow, pytesseract) are imported on first
+# use, so text-layer parsing and CLI start-up don't load them
+if TYPE_CHECKING:
+    import numpy as np
+
+# Logging is configured by the entry points (main.py, app.py), not on import
 logger = logging.getLogger(__name__)
 
+# Bump whenever extraction rules change so cached results are not reused
+PARSER_VERSION = '1.1'
+
+# Plan names recognized in invoice table rows, in priority order
+DEFAULT_PLAN_NAMES = (
+    'Base Plan', 'Ultimate Plan', '$0 Per Usage Fee Plan', 'Premium Plan', 'Standard Plan'
+)
+
+# Precompiled patterns for _extract_fields_from_text
+BILLED_TO_LABEL_RE = re.compile(r'billed to[:]*', re.IGNORECASE)
+BILLED_TO_END_RE = re.compile(r'Invoice Period|Issue date|Payment terms|Invoice number|,', re.IGNORECASE)
+INVOICE_PERIOD_LABEL_RE = re.compile(r'invoice period[:]*', re.IGNORECASE)
+INVOICE_PERIOD_RE = re.compile(r'(\d{2}/\d{2}/\d{4}[-–]\d{2}/\d{2}/\d{4})')
+ISSUE_DATE_LABEL_RE = re.compile(r'issue date[:]*', re.IGNORECASE)
+ISSUE_DATE_RE = re.compile(r'([A-Z]{3}\s+\d{1,2},\s+\d{4})')
+TABLE_HEADER_RE = re.compile(r'company.*plan.*qty.*price.*amount')
+TABLE_HEADER_LOOSE_RE = re.compile(r'company|plan|qty|unit.*price|amount', re.IGNORECASE)
+SUMMARY_LINE_RE = re.compile(r'subtotal|total|amount due|hst|gst|summary|page', re.IGNORECASE)
+DISCOUNT_RE = re.compile(r'\b20% off\b', re.IGNORECASE)
+TRAILING_AMOUNT_RE = re.compile(r'(-?\$?\d+[.,]?\d*)$')
+NUMBER_RE = re.compile(r'(-?\$?\d+[.,]?\d*)')
+PRICING_RE = re.compile(r'\$|\d+\.\d+|\d+,\d+')
+COLUMN_SPLIT_RE = re.compile(r'\s{2,}|\t+')
+
+# Company name clean-up in post-processing
+WHITESPACE_RE = re.compile(r'\s+')
+COMPANY_JUNK_RE = re.compile(r'[^\w\s&.,()-]')
+
+# Pages with fewer alphanumeric characters than this in their text layer are OCR'd
+MIN_TEXT_LAYER_CHARS = 20
+
+# Upper bound on the default number of concurrent tesseract processes per document
+DEFAULT_OCR_WORKERS = 4
+
+# Pages are rendered for OCR at this zoom over PDF units (72 dpi), i.e. 144 dpi
+OCR_ZOOM = 2
+
+# Resolutions tried in turn by adaptive OCR, until a page's mean word confidence is high enough
+ADAPTIVE_OCR_DPIS = (100, 200, 300)
+DEFAULT_OCR_MIN_CONFIDENCE = 80.0
+
+# Most pages one tesseract process reads with the batch OCR backend
+DEFAULT_OCR_BATCH_PAGES = 8
+
+# Share of dark pixels below which a page without recognized words counts as blank
+BLANK_PAGE_INK_RATIO = 0.001
+
+# Classes of the classify_pages pre-pass (see InvoiceParser._classify_page): pages
+# with the table header, pages with only Billed To / Invoice Period / Issue date,
+# scans without a text layer, and pages carrying none of these
+PAGE_LINE_ITEMS = 'line_items'
+PAGE_HEADER = 'header'
+PAGE_OCR = 'ocr'
+PAGE_SKIP = 'skip'
+
+# Share of its area a page without a text layer must have covered by images to be OCR'd by classify_pages
+MIN_SCAN_IMAGE_COVERAGE = 0.25
+
+# Windows install locations tried when no tesseract_path is given
+COMMON_TESSERACT_PATHS = (
+    r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+    r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+    r'C:\Users\charl\AppData\Local\Programs\Tesseract-OCR\tesseract.exe'
+)
+
+# Lines of the one-page invoice parsed by InvoiceParser.warm_up
+WARM_UP_LINES = (
+    'INVOICE', 'Billed to', 'Warm Up Ltd, 1 Main St', 'Invoice Period: 01/01/2025-01/31/2025',
+    'Issue date: JAN 31, 2025', 'Company Plan Qty Unit Price Amount', 'Warm Up Co Base Plan 1 $20.00 $20.00',
+    'Subtotal $20.00'
+)
+
+_tesseract_lock = threading.Lock()
+_tesseract_configured = False
+_tesseract_ignored_paths = set()
+
+def _load_pytesseract(tesseract_path: Optional[str] = None):
+    """
+    Import pytesseract on first OCR use and point it at the tesseract binary.
+    
+    pytesseract keeps the command in a module global, so it is set once per
+    process: to the first tesseract_path given, or else to the first common
+    Windows install location that exists, or else left at pytesseract's
+    default (tesseract on PATH). A different tesseract_path given later is
+    ignored with a warning rather than switching the binary under parsers
+    running in other threads.
+    
+    Returns:
+        module: The pytesseract module
+    """
+    global _tesseract_configured
+    import pytesseract
+    
+    if _tesseract_configured and (not tesseract_path or tesseract_path == pytesseract.pytesseract.tesseract_cmd):
+        return pytesseract
+    with _tesseract_lock:
+        if not _tesseract_configured:
+            _tesseract_configured = True
+            if tesseract_path:
+                pytesseract.pytesseract.tesseract_cmd = tesseract_path
+            else:
+                for path in COMMON_TESSERACT_PATHS:
+                    if os.path.exists(path):
+                        pytesseract.pytesseract.tesseract_cmd = path
+                        logger.info(f"Found Tesseract at: {path}")
+                        break
+        elif tesseract_path not in _tesseract_ignored_paths:
+            _tesseract_ignored_paths.add(tesseract_path)
+            logger.warning(f"Ignoring tesseract_path {tesseract_path}: this process already uses "
+                           f"{pytesseract.pytesseract.tesseract_cmd}")
+    return pytesseract
+
+def _pixmap_array(pix: fitz.Pixmap) -> 'np.ndarray':
+    """
+    Wrap a PyMuPDF pixmap's samples as a NumPy array without copying them.
+    
+    The array is a view into the pixmap's buffer and is only valid while the
+    pixmap is alive, so keep a reference to pix for as long as it is used.
+    
+    Returns:
+        np.ndarray: height x width array for one-channel pixmaps, height x
+        width x channels otherwise
+    """
+    import numpy as np
+    
+    rows = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+    image = rows[:, :pix.width * pix.n]
+    return image if pix.n == 1 else image.reshape(pix.height, pix.width, pix.n)
+
+def _ocr_data_text(data: Dict[str, list]) -> Tuple[str, float, int]:
+    """
+    Rebuild page text from pytesseract.image_to_data output.
+    
+    Words are joined into tesseract's lines, in reading order, with blank
+    lines between blocks like image_to_string.
+    
+    Args:
+        data (Dict[str, list]): image_to_data result with output_type=Output.DICT
+        
+    Returns:
+        Tuple[str, float, int]: Text, mean word confidence (0-100, 0 without
+        words) and number of words
+    """
+    lines = []
+    confidences = []
+    current_key = None
+    for block, paragraph, line, word, conf in zip(data['block_num'], data['par_num'], data['line_num'],
+                                                  data['text'], data['conf']):
+        word = word.strip()
+        conf = float(conf)
+        if not word or conf < 0:
+            continue
+        confidences.append(conf)
+        key = (block, paragraph, line)
+        if key != current_key:
+            if current_key is not None and block != current_key[0]:
+                lines.append('')
+            lines.append(word)
+            current_key = key
+        else:
+            lines[-1] += ' ' + word
+    mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return '\n'.join(lines), mean_confidence, len(confidences)
+
+def _image_coverage(page: fitz.Page) -> float:
+    """Share of a PyMuPDF page's area covered by images, from their placement boxes without decoding them."""
+    page_rect = page.rect
+    if page_rect.is_empty:
+        return 0.0
+    covered = sum(abs(fitz.Rect(info['bbox']) & page_rect) for info in page.get_image_info())
+    return min(1.0, covered / abs(page_rect))
+
+def _tsv_pages(tsv: str, page_count: int) -> List[Dict[str, list]]:
+    """
+    Split tesseract TSV output for several images into one dict per image.
+    
+    The dicts have the shape of pytesseract.image_to_data with
+    output_type=Output.DICT: a list per column, with every column but the
+    text converted to int as pytesseract does.
+    
+    Args:
+        tsv (str): TSV from one tesseract run over page_count images
+        page_count (int): Number of images in the run
+        
+    Returns:
+        List[Dict[str, list]]: One dict per image, in input order
+    """
+    lines = tsv.strip('\n').split('\n')
+    header = lines[0].split('\t') if lines and lines[0] else []
+    pages = [{column: [] for column in header} for _ in range(page_count)]
+    if not header:
+        return pages
+    page_index = header.index('page_num')
+    text_index = len(header) - 1
+    for line in lines[1:]:
+        cells = line.split('\t')
+        if cells[0] == header[0]:
+            continue
+        # The text cell is missing when it is empty at the end of the output
+        cells += [''] * (len(header) - len(cells))
+        page = pages[int(cells[page_index]) - 1]
+        for index, (column, value) in enumerate(zip(header, cells)):
+            page[column].append(value if index == text_index else int(float(value)))
+    return pages
+
+class PytesseractBackend:
+    """
+    OCR backend that runs one tesseract process per image through pytesseract.
+    
+    Each image is written to a temporary file and tesseract loads its
+    language models again for it. Simple and the default; the per-page
+    start-up cost matters most on short pages.
+    """
+    
+    name = 'pytesseract'
+    batched = False
+    
+    def __init__(self, tesseract_path: Optional[str] = None):
+        self.tesseract_path = tesseract_path
+    
+    def image_to_string(self, images: List['np.ndarray'], config: str) -> List[str]:
+        """Recognize each image; returns one text per image."""
+        pytesseract = _load_pytesseract(self.tesseract_path)
+        return [pytesseract.image_to_string(image, config=config) for image in images]
+    
+    def image_to_data(self, images: List['np.ndarray'], config: str) -> List[Dict[str, list]]:
+        """Recognize each image; returns one image_to_data dict (Output.DICT) per image."""
+        pytesseract = _load_pytesseract(self.tesseract_path)
+        return [pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+                for image in images]
+
+class TesseractBatchBackend:
+    """
+    OCR backend that reads a batch of images with one tesseract process.
+    
+    The images are written as PGM files, which need no compression, and
+    passed to tesseract in a list file, so the process starts and loads
+    its language models once per batch instead of once per page. Output
+    matches PytesseractBackend's up to the page separator. Uses the
+    tesseract binary pytesseract is configured with (see _load_pytesseract).
+    """
+    
+    name = 'batch'
+    batched = True
+    
+    def __init__(self, tesseract_path: Optional[str] = None):
+        self.tesseract_path = tesseract_path
+    
+    def _run(self, images: List['np.ndarray'], config: str, output_format: Optional[str] = None) -> str:
+        import cv2
+        
+        tesseract_cmd = _load_pytesseract(self.tesseract_path).pytesseract.tesseract_cmd
+        with tempfile.TemporaryDirectory(prefix='invoice_ocr_') as work_dir:
+            paths = []
+            for index, image in enumerate(images):
+                path = os.path.join(work_dir, f'page{index}.pgm')
+                if not cv2.imwrite(path, image):
+                    raise RuntimeError(f"Could not write OCR image {path}")
+                paths.append(path)
+            list_path = os.path.join(work_dir, 'pages.txt')
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(paths) + '\n')
+            args = [tesseract_cmd, list_path, 'stdout'] + shlex.split(config)
+            if output_format:
+                args.append(output_format)
+            result = subprocess.run(args, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"tesseract exited with status {result.returncode}: "
+                               f"{result.stderr.decode('utf-8', 'replace').strip()}")
+        return result.stdout.decode('utf-8', 'replace')
+    
+    def image_to_string(self, images: List['np.ndarray'], config: str) -> List[str]:
+        """Recognize all images in one tesseract run; returns one text per image."""
+        if not images:
+            return []
+        # tesseract ends the text of every image with a form feed
+        texts = self._run(images, config).split('\f')
+        if len(texts) == len(images) + 1 and not texts[-1].strip():
+            texts.pop()
+        if len(texts) != len(images):
+            raise RuntimeError(f"tesseract returned {len(texts)} pages for {len(images)} images")
+        return texts
+    
+    def image_to_data(self, images: List['np.ndarray'], config: str) -> List[Dict[str, list]]:
+        """Recognize all images in one tesseract run; returns one image_to_data dict (Output.DICT) per image."""
+        if not images:
+            return []
+        return _tsv_pages(self._run(images, config, 'tsv'), len(images))
+
+# OCR backends by the name InvoiceParser(ocr_backend=...) and --ocr-backend accept
+OCR_BACKENDS = {backend.name: backend for backend in (PytesseractBackend, TesseractBatchBackend)}
+
+class _HeaderFiller:
+    """
+    Incremental form of InvoiceParser._post_process_data, over LineItems.
+    
+    Missing Billed To, Invoice Period and Issue date values are filled with the
+    first non-empty value of each in the document, company names are cleaned
+    up and items without a company or plan are dropped. Items are released
+    by feed() as soon as all three first values are known, since they can't
+    change after that; the rest are released by finish().
+    
+    Items are updated in place. Each distinct page header is filled once and
+    the result shared by all of its items.
+    """
+    
+    def __init__(self):
+        self.first_values = {}
+        self.pending = []
+        self._filled_headers = {}
+    
+    def feed(self, items: List[LineItem]) -> List[LineItem]:
+        """Add items in document order and return those ready to emit."""
+        if len(self.first_values) < len(HEADER_ATTRS):
+            header = None
+            for item in items:
+                if item.header is header:
+                    continue
+                header = item.header
+                for attr in HEADER_ATTRS:
+                    if attr not in self.first_values and getattr(header, attr):
+                        self.first_values[attr] = getattr(header, attr)
+            self.pending.extend(items)
+            if len(self.first_values) < len(HEADER_ATTRS):
+                return []
+            items, self.pending = self.pending, []
+        return self._process(items)
+    
+    def finish(self) -> List[LineItem]:
+        """Return the items still waiting for header values."""
+        items, self.pending = self.pending, []
+        return self._process(items)
+    
+    def _process(self, items: List[LineItem]) -> List[LineItem]:
+        processed_items = []
+        for item in items:
+            # Fill missing header fields
+            filled = self._filled_headers.get(item.header)
+            if filled is None:
+                filled = self._filled_headers[item.header] = item.header.filled(self.first_values)
+            item.header = filled
+            
+            # Clean up company names
+            if item.company_name:
+                company = item.company_name.strip()
+                # Remove common OCR artifacts
+                company = WHITESPACE_RE.sub(' ', company)  # Normalize whitespace
+                company = COMPANY_JUNK_RE.sub('', company)  # Remove special chars except common ones
+                item.company_name = company
+            
+            # Only include items with meaningful data
+            if item.company_name and item.plan and item.company_name.strip() and item.plan.strip():
+                processed_items.append(item)
+        
+        return processed_items
+
 class InvoiceParser:
     """
     A comprehensive invoice parser that extracts structured data from PDF invoices.
     Handles multi-page PDFs and extracts specific fields as requested.
     Now includes OCR support for scanned/image-based PDFs.
+    
+    A parser keeps no state between calls besides its configuration, the
+    shared cache, text store and metrics, so one instance can serve any
+    number of threads at once; the web app shares one per worker process.
     """
     
-    def __init__(self, tesseract_path: str = None):
-        self.extracted_data = []
+    def __init__(self, tesseract_path: str = None, ocr_workers: int = None,
+                 cache: Optional[ExtractionCache] = None, text_store: Optional[PageTextStore] = None,
+                 plan_names: Optional[List[str]] = None, metrics: Optional[ParseMetrics] = None,
+                 ocr_close_kernel: int = 0, ocr_blur_kernel: int = 0, adaptive_ocr: bool = False,
+                 ocr_min_confidence: float = DEFAULT_OCR_MIN_CONFIDENCE, roi_ocr: bool = False,
+                 ocr_backend: Union[str, PytesseractBackend, TesseractBatchBackend] = 'pytesseract',
+                 ocr_batch_pages: int = DEFAULT_OCR_BATCH_PAGES, positional_tables: bool = True,
+                 classify_pages: bool = False):
+        self.cache = cache
+        self.text_store = text_store
+        # Stage timings and counters; pass a shared ParseMetrics to aggregate across parsers
+        self.metrics = metrics if metrics is not None else ParseMetrics()
         
-        # Configure Tesseract path if provided
-        if tesseract_path:
-            pytesseract.pytesseract.tesseract_cmd = tesseract_path
+        # Plan names are matched with one combined pattern, listing the names in
+        # priority order so the first alternative at a position wins
+        self.plan_names = tuple(plan_names) if plan_names is not None else DEFAULT_PLAN_NAMES
+        names = list(dict.fromkeys(name for name in self.plan_names if name))
+        self._plan_names_before = {name: names[:rank] for rank, name in enumerate(names)}
+        if names:
+            self._plan_pattern = re.compile('|'.join(re.escape(name) for name in names))
         else:
-            # Try common Windows installation paths
-            common_paths = [
-                r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-                r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-                r'C:\Users\charl\AppData\Local\Programs\Tesseract-OCR\tesseract.exe'
-            ]
-            for path in common_paths:
-                if os.path.exists(path):
-                    pytesseract.pytesseract.tesseract_cmd = path
-                    logger.info(f"Found Tesseract at: {path}")
-                    break
+            self._plan_pattern = None
+        
+        # Adaptive OCR renders scanned pages at the lowest resolution in
+        # ADAPTIVE_OCR_DPIS whose mean word confidence reaches ocr_min_confidence
+        self.adaptive_ocr = adaptive_ocr
+        self.ocr_min_confidence = ocr_min_confidence
+        
+        # Region-of-interest OCR reads only the text bands found by ocr_layout,
+        # falling back to the full page when they yield (almost) no text
+        self.roi_ocr = roi_ocr
+        
+        # Tables are rebuilt from word boxes where the engine provides them
+        # (see table_layout); False parses only the flattened page text
+        self.positional_tables = positional_tables
+        
+        # Route each page by a cheap look at its text layer and images before
+        # extracting it (see _classify_page); pages without an invoice table,
+        # header fields or a scan are skipped
+        self.classify_pages = classify_pages
+        
+        # Cache entries depend on the plan dictionary, table and OCR modes as well as the code
+        self.rules_version = PARSER_VERSION
+        if self.plan_names != DEFAULT_PLAN_NAMES:
+            plans_digest = hashlib.sha256('\n'.join(self.plan_names).encode('utf-8')).hexdigest()[:16]
+            self.rules_version = f"{PARSER_VERSION}+{plans_digest}"
+        if not positional_tables:
+            self.rules_version = f"{self.rules_version}+text-tables"
+        if adaptive_ocr:
+            self.rules_version = f"{self.rules_version}+adaptive-ocr-{ocr_min_confidence:g}"
+        if roi_ocr:
+            self.rules_version = f"{self.rules_version}+roi-ocr"
+        if classify_pages:
+            self.rules_version = f"{self.rules_version}+classified"
+        # Clean-up kernels change the OCR text; the blur kernel is rounded up to odd when applied
+        ocr_cleanup = []
+        if ocr_close_kernel > 1:
+            ocr_cleanup.append(f"close-{ocr_close_kernel}")
+        if ocr_blur_kernel > 1:
+            ocr_cleanup.append(f"blur-{ocr_blur_kernel | 1}")
+        for step in ocr_cleanup:
+            self.rules_version = f"{self.rules_version}+{step}"
         
-    def parse_pdf(self, pdf_path: str) -> List[Dict]:
+        # Number of pages OCR'd concurrently; each one runs its own tesseract process
+        if ocr_workers is None:
+            ocr_workers = min(DEFAULT_OCR_WORKERS, os.cpu_count() or 1)
+        self.ocr_workers = max(1, ocr_workers)
+        
+        # Tesseract is located on the first OCR'd page, see _load_pytesseract
+        self.tesseract_path = tesseract_path
+        
+        # How images reach tesseract: a backend name from OCR_BACKENDS or an
+        # object with the same methods. Batching backends read up to
+        # ocr_batch_pages consecutive scanned pages per tesseract run.
+        if isinstance(ocr_backend, str):
+            if ocr_backend not in OCR_BACKENDS:
+                raise ValueError(f"Unknown OCR backend {ocr_backend!r}, expected one of: {', '.join(OCR_BACKENDS)}")
+            ocr_backend = OCR_BACKENDS[ocr_backend](tesseract_path)
+        self.ocr_backend = ocr_backend
+        self.ocr_batch_pages = max(1, ocr_batch_pages)
+        
+        # Page texts depend on the table and OCR modes but not on the plan
+        # dictionary; the text store only reuses texts extracted in this mode
+        text_mode = ['positional' if positional_tables else 'text-tables',
+                     f"ocr-{getattr(ocr_backend, 'name', type(ocr_backend).__name__)}"]
+        if adaptive_ocr:
+            text_mode.append(f"adaptive-ocr-{ocr_min_confidence:g}")
+        if roi_ocr:
+            text_mode.append('roi-ocr')
+        if classify_pages:
+            text_mode.append('classified')
+        text_mode.extend(ocr_cleanup)
+        self.text_mode = '+'.join(text_mode)
+        
+        # Optional clean-up of binarized scans: morphological closing and
+        # Gaussian blur with square kernels of this size; 0 or 1 skips the step
+        self.ocr_close_kernel = ocr_close_kernel
+        self.ocr_blur_kernel = ocr_blur_kernel
+    
+    def warm_up(self, ocr: bool = True) -> float:
+        """
+        Pay one-time start-up costs before the first real document arrives.
+        
+        Parses a generated one-page invoice, which loads pdfplumber's and
+        PyMuPDF's lazily initialized internals, and with ocr also imports the
+        OCR dependencies, locates Tesseract and runs the image preprocessing
+        once. Nothing is cached or counted in the parser's metrics. Problems
+        are logged, never raised.
+        
+        Args:
+            ocr (bool): Also warm up the OCR path
+            
+        Returns:
+            float: Seconds spent
+        """
+        start = time.perf_counter()
+        try:
+            doc = fitz.open()
+            page = doc.new_page()
+            for line_num, line in enumerate(WARM_UP_LINES):
+                page.insert_text((72, 72 + 14 * line_num), line, fontsize=10)
+            pdf_bytes = doc.tobytes()
+            doc.close()
+            
+            # A throwaway parser, so the warm-up document stays out of self.metrics
+            scratch = InvoiceParser(ocr_workers=1, plan_names=self.plan_names)
+            for _, _, text in scratch._extract_page_texts(pdf_bytes):
+                scratch._extract_items_from_text(text)
+            
+            if ocr:
+                import numpy as np
+                
+                pytesseract = _load_pytesseract(self.tesseract_path)
+                self._preprocess_image_for_ocr(np.full((32, 32), 255, dtype=np.uint8))
+                try:
+                    logger.info(f"Tesseract {pytesseract.get_tesseract_version()} ready")
+                except Exception as e:
+                    logger.warning(f"Tesseract is not available, scanned pages can't be OCR'd: {str(e)}")
+        except Exception as e:
+            logger.warning(f"Parser warm-up failed: {str(e)}")
+        seconds = time.perf_counter() - start
+        logger.info(f"Parser warmed up in {seconds:.2f}s")
+        return seconds
+        
+    def parse_pdf(self, pdf_path: Union[str, bytes, BinaryIO], use_cache: bool = True,
+                  source: Optional[str] = None) -> List[Dict]:
         """
         Parse a PDF invoice and extract structured data from all pages.
-        Now includes OCR fallback for scanned/image-based PDFs.
+        The file is read once and the extraction engine is chosen per page:
+        pages with a text layer use it, only pages without one are OCR'd.
+        
+        If the parser has a cache, results are looked up by the file's
+        contents first; pass use_cache=False to bypass it. If it has a text
+        store, page texts are saved there and reused instead of re-extracting.
+        
+        Args:
+            pdf_path (Union[str, bytes, BinaryIO]): Path to the PDF, its bytes,
+                or a binary file-like object such as an uploaded file stream
+            use_cache (bool): Whether to use the result cache
+            source (str): Name used in logs and the text store for bytes and
+                streams; defaults to the path, or '<memory>'
         """
+        source = self._source_name(pdf_path, source)
         try:
-            logger.info(f"Starting to parse PDF: {pdf_path}")
-            # Try pdfplumber first for better text extraction
-            data = self._parse_with_pdfplumber(pdf_path)
-            if data:
-                return self._post_process_data(data)
-            # Fallback to PyMuPDF if pdfplumber fails
-            logger.info("Falling back to PyMuPDF")
-            data = self._parse_with_pymupdf(pdf_path)
-            if data:
-                return self._post_process_data(data)
-            # Final fallback: OCR for scanned/image-based PDFs
-            logger.info("No text found, attempting OCR extraction")
-            data = self._parse_with_ocr(pdf_path)
-            if data:
-                return self._post_process_data(data)
+            pdf_bytes, doc_hash = self._read_document(pdf_path, source)
+            cache_key, cached, stored = self._lookup(doc_hash, use_cache)
+            if cached is not None:
+                return cached
+            
+            if stored:
+                logger.info(f"Using stored page text for {source}")
+                self.metrics.increment('text_store_hits')
+                page_texts = self.text_store.load_document(doc_hash)
+            else:
+                page_texts = self._extract_page_texts(pdf_bytes)
+                if self.text_store is not None:
+                    self.text_store.save_document(doc_hash, page_texts, source=source, text_mode=self.text_mode)
+            
+            data = self.parse_page_texts(page_texts)
+            if cache_key is not None and data:
+                self.cache.put(cache_key, data)
+            return data
+        except Exception as e:
+            logger.error(f"Error parsing PDF {source}: {str(e)}")
+            self.metrics.increment('parse_errors')
             return []
+    
+    def iter_parse(self, pdf_path: Union[str, bytes, BinaryIO], use_cache: bool = True,
+                   source: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Parse a PDF invoice like parse_pdf, yielding records page by page.
+        
+        Pages are extracted, OCR'd and run through field extraction one at a
+        time, so memory stays bounded by a few pages rather than the whole
+        document. Records are held back only until the Billed To, Invoice
+        Period and Issue date values used to fill gaps are known, which is
+        usually after the first page. The records are the same as parse_pdf's.
+        
+        Errors are logged and end the iteration, like parse_pdf returning [].
+        
+        Args:
+            pdf_path (Union[str, bytes, BinaryIO]): Path to the PDF, its bytes,
+                or a binary file-like object
+            use_cache (bool): Whether to use the result cache
+            source (str): Name used in logs and the text store
+            
+        Yields:
+            Dict: Extracted records, in document order
+        """
+        source = self._source_name(pdf_path, source)
+        try:
+            pdf_bytes, doc_hash = self._read_document(pdf_path, source)
+            cache_key, cached, stored = self._lookup(doc_hash, use_cache)
+            if cached is not None:
+                yield from cached
+                return
+            
+            if stored:
+                logger.info(f"Using stored page text for {source}")
+                self.metrics.increment('text_store_hits')
+                page_texts = iter(self.text_store.load_document(doc_hash))
+            else:
+                page_texts = self._iter_page_texts(pdf_bytes)
+            
+            # Only what the text store and cache need is kept, and only when they are set
+            saved_pages = [] if self.text_store is not None and not stored else None
+            cached_records = [] if cache_key is not None else None
+            if saved_pages is not None:
+                page_texts = self._tee(page_texts, saved_pages)
+            
+            for record in self.iter_page_records(page_texts):
+                if cached_records is not None:
+                    cached_records.append(record)
+                yield record
+            
+            if saved_pages is not None:
+                self.text_store.save_document(doc_hash, saved_pages, source=source, text_mode=self.text_mode)
+            if cached_records:
+                self.cache.put(cache_key, cached_records)
         except Exception as e:
-            logger.error(f"Error parsing PDF {pdf_path}: {str(e)}")
+            logger.error(f"Error parsing PDF {source}: {str(e)}")
+            self.metrics.increment('parse_errors')
+    
+    def _tee(self, items: Iterable, collected: list) -> Iterator:
+        """Yield items while appending each one to collected."""
+        for item in items:
+            collected.append(item)
+            yield item
+    
+    def _source_name(self, pdf: Union[str, bytes, BinaryIO], source: Optional[str]) -> str:
+        """Name of a document for logs and the text store."""
+        if source is not None:
+            return source
+        return pdf if isinstance(pdf, str) else getattr(pdf, 'name', None) or '<memory>'
+    
+    def _read_document(self, pdf: Union[str, bytes, BinaryIO], source: str) -> Tuple[bytes, str]:
+        """Read a PDF and return its bytes and SHA-256, counting the document."""
+        logger.info(f"Starting to parse PDF: {source}")
+        self.metrics.increment('documents')
+        with self.metrics.time('read'):
+            pdf_bytes = self._read_pdf_bytes(pdf)
+            doc_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        return pdf_bytes, doc_hash
+    
+    def _lookup(self, doc_hash: str, use_cache: bool) -> Tuple[Optional[str], Optional[List[Dict]], bool]:
+        """
+        Check the result cache and text store for a document.
+        
+        A text store missing this document (or holding it in another text
+        mode) takes priority, so cached results don't leave holes in it.
+        
+        Returns:
+            Tuple[Optional[str], Optional[List[Dict]], bool]: Cache key (None when
+            not caching), cached records (None on a miss) and whether the text
+            store has the document
+        """
+        stored = self.text_store is not None and self.text_store.has_document(doc_hash, self.text_mode)
+        cache_key = None
+        cached = None
+        if self.cache is not None and use_cache:
+            cache_key = ExtractionCache.make_key(doc_hash, self.rules_version)
+            cached = self.cache.get(cache_key) if self.text_store is None or stored else None
+            self.metrics.increment('cache_hits' if cached is not None else 'cache_misses')
+        return cache_key, cached, stored
+    
+    def _read_pdf_bytes(self, pdf: Union[str, bytes, BinaryIO]) -> bytes:
+        """Return the contents of a PDF given as a path, bytes or binary stream."""
+        if isinstance(pdf, (bytes, bytearray, memoryview)):
+            return bytes(pdf)
+        if hasattr(pdf, 'read'):
+            return pdf.read()
+        with open(pdf, 'rb') as f:
+            return f.read()
+    
+    def parse_page_texts(self, page_texts: List[Tuple[int, str, str]]) -> List[Dict]:
+        """
+        Run field extraction and post-processing over already extracted pages.
+        
+        Args:
+            page_texts (List[Tuple[int, str, str]]): (page number, engine, text) tuples,
+                as produced by _extract_page_texts or loaded from a PageTextStore
+            
+        Returns:
+            List[Dict]: Extracted records
+        """
+        return to_records(self.parse_page_items(page_texts))
+    
+    def parse_page_items(self, page_texts: List[Tuple[int, str, str]]) -> List[LineItem]:
+        """
+        Like parse_page_texts, but return the compact LineItems instead of
+        record dicts. Use invoice_records.to_records to flatten them.
+        
+        Args:
+            page_texts (List[Tuple[int, str, str]]): (page number, engine, text) tuples
+            
+        Returns:
+            List[LineItem]: Extracted line items
+        """
+        with self.metrics.time('field_extraction'):
+            items = self._extract_items_from_pages(page_texts)
+        if not items:
             return []
+        with self.metrics.time('post_process'):
+            filler = _HeaderFiller()
+            items = filler.feed(items) + filler.finish()
+        self.metrics.increment('rows_extracted', len(items))
+        return items
     
-    def _parse_with_ocr(self, pdf_path: str) -> List[Dict]:
+    def iter_page_records(self, page_texts: Iterable[Tuple[int, str, str]]) -> Iterator[Dict]:
         """
-        Parse PDF using OCR for scanned/image-based PDFs, page by page.
+        Streaming counterpart of parse_page_texts: yields post-processed
+        records as each page is consumed.
+        
+        Args:
+            page_texts (Iterable[Tuple[int, str, str]]): (page number, engine, text) tuples
+            
+        Yields:
+            Dict: Extracted records, in page order
         """
+        filler = _HeaderFiller()
+        for page_num, engine, text in page_texts:
+            with self.metrics.time('field_extraction'):
+                page_items = self._extract_page_items(page_num, engine, text)
+            if not page_items:
+                continue
+            with self.metrics.time('post_process'):
+                ready = filler.feed(page_items)
+            self.metrics.increment('rows_extracted', len(ready))
+            for item in ready:
+                yield item.to_dict()
+        with self.metrics.time('post_process'):
+            ready = filler.finish()
+        self.metrics.increment('rows_extracted', len(ready))
+        for item in ready:
+            yield item.to_dict()
+    
+    def _has_text_layer(self, text: Optional[str]) -> bool:
+        """Check whether extracted page text is enough to skip OCR."""
+        if not text:
+            return False
+        return sum(1 for char in text if char.isalnum()) >= MIN_TEXT_LAYER_CHARS
+    
+    def _extract_page_texts(self, pdf_bytes: bytes) -> List[Tuple[int, str, str]]:
+        """
+        Extract the text of every page, choosing the engine per page.
+        
+        pdfplumber is tried first, PyMuPDF is used for pages where pdfplumber
+        returns no usable text, and the remaining pages are rendered and OCR'd.
+        
+        Args:
+            pdf_bytes (bytes): Contents of the PDF file
+            
+        Returns:
+            List[Tuple[int, str, str]]: (page number, engine, text) in page order
+        """
+        return list(self._iter_page_texts(pdf_bytes))
+    
+    def _iter_page_texts(self, pdf_bytes: bytes) -> Iterator[Tuple[int, str, str]]:
+        """
+        Generator form of _extract_page_texts.
+        
+        Pages are read one at a time. Pages that need OCR are recognized by up
+        to ocr_workers threads while reading continues, and pages are yielded
+        in order as soon as every earlier page is done. With a batching OCR
+        backend, consecutive pages that need OCR go to tesseract together.
+        At most two OCR tasks per worker are in flight, so memory does not
+        grow with the page count.
+        Pages that produce no text with any engine are skipped, and with
+        classify_pages so are pages _classify_page finds nothing to read on.
+        
+        Yields:
+            Tuple[int, str, str]: (page number, engine, text) in page order
+        """
+        doc = fitz.open(stream=pdf_bytes, filetype='pdf')
+        pdf = None
+        executor = None
         try:
-            doc = fitz.open(pdf_path)
-            all_data = []
+            try:
+                pdf = pdfplumber.open(io.BytesIO(pdf_bytes))
+            except Exception as e:
+                logger.warning(f"pdfplumber failed: {str(e)}")
+            
+            # (page number, engine, text or (OCR future, index in its batch)), in page order
+            pending = deque()
+            # Consecutive pages without a text layer, OCR'd as one task
+            batch = []
+            batch_size = self._ocr_batch_size(len(doc))
+            # Adaptive OCR workers re-render pages; PyMuPDF documents are not thread-safe
+            doc_lock = threading.Lock()
             for page_num in range(len(doc)):
-                page = doc[page_num]
-                logger.info(f"Processing page {page_num + 1} with OCR")
-                mat = fitz.Matrix(2, 2)
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_data))
-                img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                img_cv = self._preprocess_image_for_ocr(img_cv)
-                try:
-                    page_text = pytesseract.image_to_string(img_cv, config='--psm 6')
-                    if page_text.strip():
-                        print(f"\n=== PAGE {page_num + 1} OCR TEXT ===")
-                        print(page_text)
-                        print("=" * 50)
-                        page_data = self._extract_fields_from_text(page_text)
-                        if page_data:
-                            all_data.extend(page_data)
-                    else:
-                        logger.warning(f"No text extracted from page {page_num + 1}")
-                except Exception as e:
-                    logger.error(f"OCR failed for page {page_num + 1}: {str(e)}")
+                page_class, engine, text = PAGE_LINE_ITEMS, 'pymupdf', None
+                if self.classify_pages:
+                    with self.metrics.time('classify'), doc_lock:
+                        page_class, text = self._classify_page(doc[page_num])
+                    if page_class == PAGE_SKIP:
+                        self.metrics.increment('pages_skipped')
+                        continue
+                # Header pages keep the classifier's PyMuPDF text; scans go straight to OCR
+                if page_class == PAGE_LINE_ITEMS:
+                    engine = 'pdfplumber'
+                    text = self._pdfplumber_page_text(pdf, page_num)
+                    if not self._has_text_layer(text):
+                        self.metrics.increment('fallbacks_pymupdf')
+                        engine = 'pymupdf'
+                        with self.metrics.time('pymupdf'), doc_lock:
+                            text = self._pymupdf_page_text(doc[page_num])
+                if self._has_text_layer(text):
+                    executor = self._submit_ocr_batch(doc, batch, pending, doc_lock, executor)
+                    pending.append((page_num, engine, text))
+                else:
+                    self.metrics.increment('fallbacks_ocr')
+                    batch.append(page_num)
+                    if len(batch) >= batch_size:
+                        executor = self._submit_ocr_batch(doc, batch, pending, doc_lock, executor)
+                yield from self._drain_pages(pending, self.ocr_workers * 2 * batch_size)
+            executor = self._submit_ocr_batch(doc, batch, pending, doc_lock, executor)
+            yield from self._drain_pages(pending, 0)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            if pdf is not None:
+                pdf.close()
             doc.close()
-            if all_data:
-                return all_data
+    
+    def _classify_page(self, page: fitz.Page) -> Tuple[str, str]:
+        """
+        Decide how to read a page from its PyMuPDF text layer and images.
+        
+        A page whose text holds the Company/Plan/Qty/Price/Amount header has
+        line items, and so does one with only a loose header line (any of
+        the column names, as on continuation pages), which
+        _extract_items_from_text reads a table under too. Otherwise a page
+        with Billed To, Invoice Period or
+        Issue date labels is a header page and any other text page (cover
+        letter, remittance slip, terms, totals carried over) is skipped. A
+        page without a text layer needs OCR if images cover at least
+        MIN_SCAN_IMAGE_COVERAGE of it, and is skipped otherwise (blank
+        pages, a lone logo).
+        
+        Args:
+            page (fitz.Page): The page
+            
+        Returns:
+            Tuple[str, str]: PAGE_LINE_ITEMS, PAGE_HEADER, PAGE_OCR or PAGE_SKIP, and the page's text
+        """
+        text = page.get_text()
+        if self._has_text_layer(text):
+            # Header cells may come out on separate lines, so the signature is matched across them
+            if TABLE_HEADER_RE.search(WHITESPACE_RE.sub('', text).lower()):
+                return PAGE_LINE_ITEMS, text
+            # The loose pattern doesn't match across lines, so this is a per-line check
+            if TABLE_HEADER_LOOSE_RE.search(text):
+                return PAGE_LINE_ITEMS, text
+            if (BILLED_TO_LABEL_RE.search(text) or INVOICE_PERIOD_LABEL_RE.search(text) or
+                    ISSUE_DATE_LABEL_RE.search(text)):
+                return PAGE_HEADER, text
+            return PAGE_SKIP, text
+        if _image_coverage(page) >= MIN_SCAN_IMAGE_COVERAGE:
+            return PAGE_OCR, text
+        return PAGE_SKIP, text
+    
+    def _submit_ocr_batch(self, doc, batch: List[int], pending: deque, doc_lock: threading.Lock,
+                          executor: Optional[ThreadPoolExecutor]) -> Optional[ThreadPoolExecutor]:
+        """
+        Start the OCR of the pages in batch and queue them on pending, then empty batch.
+        
+        With one OCR worker the pages are recognized right away; otherwise in
+        executor, which is created on first use.
+        
+        Returns:
+            Optional[ThreadPoolExecutor]: The executor, to pass to the next call
+        """
+        if not batch:
+            return executor
+        with self.metrics.time('ocr'):
+            recognize, args = self._ocr_task(doc, list(batch), doc_lock)
+            if self.ocr_workers == 1:
+                texts = recognize(*args)
             else:
-                logger.warning("No text extracted with OCR")
-                return []
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=self.ocr_workers)
+                future = executor.submit(recognize, *args)
+                texts = [(future, index) for index in range(len(batch))]
+        pending.extend((page_num, 'ocr', text) for page_num, text in zip(batch, texts))
+        batch.clear()
+        return executor
+    
+    def _pdfplumber_page_text(self, pdf, page_num: int) -> Optional[str]:
+        """Extract one page's text with pdfplumber, None if it fails."""
+        if pdf is None or page_num >= len(pdf.pages):
+            return None
+        try:
+            with self.metrics.time('pdfplumber'):
+                page = pdf.pages[page_num]
+                text = layout_text(words_from_pdfplumber(page)) if self.positional_tables else None
+                if text is None:
+                    text = page.extract_text()
+                # Drop the parsed layout objects so memory stays per page
+                page.flush_cache()
+            return text
         except Exception as e:
-            logger.error(f"OCR parsing failed: {str(e)}")
-            return []
+            logger.warning(f"pdfplumber failed on page {page_num + 1}: {str(e)}")
+            return None
     
-    def _preprocess_image_for_ocr(self, image: np.ndarray) -> np.ndarray:
+    def _pymupdf_page_text(self, page) -> str:
+        """Extract one page's text with PyMuPDF, its table rebuilt from word boxes if possible."""
+        text = layout_text(words_from_pymupdf(page)) if self.positional_tables else None
+        return text if text is not None else page.get_text()
+    
+    def _ocr_data_page_text(self, data: Dict[str, list]) -> Tuple[str, float, int]:
+        """_ocr_data_text, with the page's table rebuilt from the word boxes if possible."""
+        text, confidence, words = _ocr_data_text(data)
+        if self.positional_tables:
+            text = layout_text(words_from_ocr_data(data)) or text
+        return text, confidence, words
+    
+    def _drain_pages(self, pending: deque, max_in_flight: int) -> Iterator[Tuple[int, str, str]]:
+        """
+        Yield finished pages from the front of pending.
+        
+        Stops at the first page whose OCR is still running, unless more than
+        max_in_flight OCR pages are pending, in which case it waits for it.
+        """
+        while pending:
+            page_num, engine, text = pending[0]
+            if isinstance(text, tuple):
+                future, index = text
+                in_flight = sum(1 for _, _, item in pending if isinstance(item, tuple))
+                if not future.done() and in_flight <= max_in_flight:
+                    return
+                with self.metrics.time('ocr'):
+                    text = future.result()[index]
+            pending.popleft()
+            if engine == 'ocr' and not text.strip():
+                logger.warning(f"No text extracted from page {page_num + 1}")
+                self.metrics.increment('pages_empty')
+                continue
+            self.metrics.increment(f'pages_{engine}')
+            yield page_num, engine, text
+    
+    def _extract_items_from_pages(self, page_texts: List[Tuple[int, str, str]]) -> List[LineItem]:
+        """Run field extraction over (page number, engine, text) tuples in order."""
+        all_items = []
+        for page_num, engine, text in page_texts:
+            page_items = self._extract_page_items(page_num, engine, text)
+            if page_items:
+                all_items.extend(page_items)
+        return all_items
+    
+    def _extract_page_items(self, page_num: int, engine: str, text: str) -> List[LineItem]:
+        """Print one page's text and run field extraction on it."""
+        print(f"\n=== PAGE {page_num + 1} {engine.upper()} TEXT ===")
+        print(text)
+        print("=" * 50)
+        return self._extract_items_from_text(text)
+    
+    def _render_page_for_ocr(self, page, dpi: Optional[int] = None) -> fitz.Pixmap:
+        """
+        Render a PyMuPDF page straight to an 8-bit grayscale pixmap for OCR.
+        
+        Rendering in gray skips the RGB samples, the PNG round trip and the
+        color conversion that OCR doesn't need.
+        
+        Args:
+            page: PyMuPDF page
+            dpi (int): Resolution; defaults to OCR_ZOOM times 72 dpi
+        """
+        zoom = dpi / 72 if dpi else OCR_ZOOM
+        return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    
+    def _ocr_batch_size(self, page_count: int) -> int:
+        """
+        Pages per OCR task for a document of page_count pages.
+        
+        1 unless the OCR backend batches; then up to ocr_batch_pages, but
+        small enough that the pages still spread over all ocr_workers.
+        """
+        if not self.ocr_backend.batched:
+            return 1
+        return max(1, min(self.ocr_batch_pages, -(-page_count // self.ocr_workers)))
+    
+    def _ocr_task(self, doc, page_nums: List[int],
+                  doc_lock: threading.Lock) -> Tuple[Callable[..., List[str]], tuple]:
+        """
+        Prepare the OCR of some pages of an open PyMuPDF document.
+        
+        At a fixed resolution the pages are rendered here, on the calling
+        thread. Adaptive OCR renders inside the task instead, at each
+        resolution it tries, holding doc_lock around every render.
+        
+        Returns:
+            Tuple[Callable[..., List[str]], tuple]: Function and arguments that
+            return the text of each page when called on any thread
+        """
+        if not self.adaptive_ocr:
+            with doc_lock:
+                pixes = [self._render_page_for_ocr(doc[page_num]) for page_num in page_nums]
+            return self._recognize_page_images, (pixes, page_nums)
+        
+        def render(page_num: int, dpi: int) -> fitz.Pixmap:
+            with doc_lock:
+                return self._render_page_for_ocr(doc[page_num], dpi)
+        
+        return self._recognize_pages_adaptive, (render, page_nums)
+    
+    def _recognize_page_images(self, pixes: List[fitz.Pixmap], page_nums: List[int]) -> List[str]:
+        """
+        Preprocess rendered pages and run tesseract on them, as one batch if
+        the OCR backend batches. A single page goes through
+        _recognize_page_image.
+        
+        Returns:
+            List[str]: Recognized text per page, empty where OCR failed
+        """
+        if len(pixes) == 1:
+            return [self._recognize_page_image(pixes[0], page_nums[0])]
+        return self._read_page_images(pixes, page_nums)
+    
+    def _recognize_page_image(self, pix: fitz.Pixmap, page_num: int) -> str:
+        """
+        Preprocess a rendered page and run tesseract on it.
+        Safe to call from worker threads; it does not touch the PDF document.
+        
+        Args:
+            pix (fitz.Pixmap): Grayscale page from _render_page_for_ocr
+            page_num (int): Zero-based page number, for logging
+            
+        Returns:
+            str: Recognized text, empty if OCR failed
+        """
+        return self._read_page_images([pix], [page_num])[0]
+    
+    def _read_page_images(self, pixes: List[fitz.Pixmap], page_nums: List[int]) -> List[str]:
+        """Body of _recognize_page_image(s): OCR rendered pages through the OCR backend."""
+        pages = ', '.join(str(page_num + 1) for page_num in page_nums)
+        logger.info(f"Processing page{'s' if len(page_nums) > 1 else ''} {pages} with OCR")
+        try:
+            # Views over the pixmaps' samples; pixes stay referenced until OCR returns
+            images = [self._preprocess_image_for_ocr(_pixmap_array(pix)) for pix in pixes]
+            results = self._read_ocr_regions(images, lambda regions: [
+                (text,) for text in self.ocr_backend.image_to_string(regions, '--psm 6')
+            ])
+            return [text for text, in results]
+        except Exception as e:
+            logger.error(f"OCR failed for page{'s' if len(page_nums) > 1 else ''} {pages}: {str(e)}")
+            return [''] * len(page_nums)
+    
+    def _recognize_pages_adaptive(self, render: Callable[[int, int], fitz.Pixmap],
+                                  page_nums: List[int]) -> List[str]:
+        """
+        OCR pages at increasing resolutions until tesseract is confident.
+        
+        The pages are rendered at each of ADAPTIVE_OCR_DPIS in turn and read
+        with image_to_data, all pages of a round in one batch if the OCR
+        backend batches. A page drops out at the first resolution whose mean
+        word confidence reaches ocr_min_confidence, or when it is blank, and
+        otherwise keeps its most confident attempt. The chosen resolution
+        and confidence are logged per page and counted in the metrics as
+        ocr_pages_<dpi>dpi and ocr_rerenders.
+        
+        Args:
+            render (Callable[[int, int], fitz.Pixmap]): Renders a page number at a given dpi
+            page_nums (List[int]): Zero-based page numbers
+            
+        Returns:
+            List[str]: Recognized text per page, empty where OCR failed
+        """
+        pages = ', '.join(str(page_num + 1) for page_num in page_nums)
+        logger.info(f"Processing page{'s' if len(page_nums) > 1 else ''} {pages} with adaptive OCR")
+        try:
+            best = [None] * len(page_nums)
+            attempts = [0] * len(page_nums)
+            pending = list(range(len(page_nums)))
+            for dpi in ADAPTIVE_OCR_DPIS:
+                if not pending:
+                    break
+                pixes = [render(page_nums[index], dpi) for index in pending]
+                images = [self._preprocess_image_for_ocr(_pixmap_array(pix)) for pix in pixes]
+                results = self._read_ocr_regions(images, lambda regions: [
+                    self._ocr_data_page_text(data) for data in self.ocr_backend.image_to_data(regions, '--psm 6')
+                ])
+                unsure = []
+                for index, image, (text, confidence, words) in zip(pending, images, results):
+                    attempts[index] += 1
+                    if best[index] is None or confidence > best[index][1]:
+                        best[index] = (text, confidence, dpi)
+                    if confidence >= self.ocr_min_confidence:
+                        continue
+                    if not words and (image < 128).mean() < BLANK_PAGE_INK_RATIO:
+                        continue
+                    unsure.append(index)
+                pending = unsure
+            
+            texts = []
+            for page_num, (text, confidence, dpi), count in zip(page_nums, best, attempts):
+                logger.info(f"Page {page_num + 1} OCR'd at {dpi} dpi, mean word confidence {confidence:.1f} "
+                            f"({count} render{'s' if count > 1 else ''})")
+                self.metrics.increment(f'ocr_pages_{dpi}dpi')
+                self.metrics.increment('ocr_rerenders', count - 1)
+                texts.append(text)
+            return texts
+        except Exception as e:
+            logger.error(f"OCR failed for page{'s' if len(page_nums) > 1 else ''} {pages}: {str(e)}")
+            return [''] * len(page_nums)
+    
+    def _read_ocr_regions(self, images: List['np.ndarray'],
+                          read: Callable[[List['np.ndarray']], List[tuple]]) -> List[tuple]:
+        """
+        Run an OCR call on the text regions of binarized pages, or on all of them.
+        
+        With roi_ocr, ocr_layout.crop_to_text stacks each page's text bands
+        into a smaller image and read runs on those. Pages where the layout
+        pass finds nothing worth cropping, or whose crop yields fewer than
+        MIN_TEXT_LAYER_CHARS letters and digits, are read again in full
+        (counted as ocr_roi_fallbacks). A crop that reads fine but has no
+        line items (header, terms or summary pages) is kept, so such pages
+        are recognized once. Pixels sent to tesseract are counted as
+        ocr_pixels.
+        
+        Args:
+            images (List[np.ndarray]): Binarized pages from _preprocess_image_for_ocr
+            read (Callable[[List[np.ndarray]], List[tuple]]): OCR call returning, per
+                image, a tuple that starts with the text
+            
+        Returns:
+            List[tuple]: The result of read for each page
+        """
+        results = [None] * len(images)
+        pending = list(range(len(images)))
+        if self.roi_ocr:
+            from ocr_layout import crop_to_text
+            
+            crops = {index: crop_to_text(images[index]) for index in pending}
+            cropped = [index for index in pending if crops[index] is not None]
+            if cropped:
+                self.metrics.increment('ocr_pixels', sum(crops[index].size for index in cropped))
+                for index, result in zip(cropped, read([crops[index] for index in cropped])):
+                    if self._has_text_layer(result[0]):
+                        results[index] = result
+            pending = [index for index in pending if results[index] is None]
+            if pending:
+                self.metrics.increment('ocr_roi_fallbacks', len(pending))
+        if pending:
+            self.metrics.increment('ocr_pixels', sum(images[index].size for index in pending))
+            for index, result in zip(pending, read([images[index] for index in pending])):
+                results[index] = result
+        return results
+    
+    def _preprocess_image_for_ocr(self, image: 'np.ndarray') -> 'np.ndarray':
         """
         Preprocess image to improve OCR accuracy.
         
+        The image is binarized with Otsu's threshold, then closed and blurred
+        if ocr_close_kernel and ocr_blur_kernel are set.
+        
         Args:
-            image (np.ndarray): Input image
+            image (np.ndarray): Grayscale image, or a BGR one
             
         Returns:
             np.ndarray: Preprocessed image
         """
+        import cv2
+        import numpy as np
+        
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            # Pages are rendered in gray; other callers may pass BGR
+            gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
             
             # Apply thresholding to get binary image
             _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
             
             # Apply morphological operations to remove noise
-            kernel = np.ones((1, 1), np.uint8)
-            binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+            if self.ocr_close_kernel > 1:
+                kernel = np.ones((self.ocr_close_kernel, self.ocr_close_kernel), np.uint8)
+                binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
             
-            # Apply slight blur to smooth edges
-            binary = cv2.GaussianBlur(binary, (1, 1), 0)
+            # Apply slight blur to smooth edges; Gaussian kernels must be odd
+            if self.ocr_blur_kernel > 1:
+                size = self.ocr_blur_kernel | 1
+                binary = cv2.GaussianBlur(binary, (size, size), 0)
             
             return binary
             
@@ -138,159 +1203,128 @@ class InvoiceParser:
             logger.warning(f"Image preprocessing failed: {str(e)}")
             return image
     
-    def _parse_with_pdfplumber(self, pdf_path: str) -> List[Dict]:
-        """Parse PDF using pdfplumber for better text extraction, page by page."""
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                all_data = []
-                for page_num, page in enumerate(pdf.pages):
-                    text = page.extract_text()
-                    if text:
-                        print(f"\n=== PAGE {page_num + 1} PDFPLUMBER TEXT ===")
-                        print(text)
-                        print("=" * 50)
-                        page_data = self._extract_fields_from_text(text)
-                        if page_data:
-                            all_data.extend(page_data)
-                if all_data:
-                    return all_data
-                else:
-                    return []
-        except Exception as e:
-            logger.warning(f"pdfplumber failed: {str(e)}")
-            return []
-    
-    def _parse_with_pymupdf(self, pdf_path: str) -> List[Dict]:
-        """Parse PDF using PyMuPDF as fallback, page by page."""
-        try:
-            doc = fitz.open(pdf_path)
-            all_data = []
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                if text:
-                    print(f"\n=== PAGE {page_num + 1} PYMUPDF TEXT ===")
-                    print(text)
-                    print("=" * 50)
-                    page_data = self._extract_fields_from_text(text)
-                    if page_data:
-                        all_data.extend(page_data)
-            doc.close()
-            if all_data:
-                return all_data
-            else:
-                return []
-        except Exception as e:
-            logger.error(f"PyMuPDF failed: {str(e)}")
-            return []
+    def _find_plan(self, row: str) -> Optional[str]:
+        """
+        Find the plan name in a table row.
+        
+        When several plan names occur, the one listed first in plan_names wins,
+        regardless of where it appears in the row.
+        """
+        if self._plan_pattern is None:
+            return None
+        match = self._plan_pattern.search(row)
+        if match is None:
+            return None
+        found = match.group(0)
+        # Only names ranked above the leftmost match can take precedence
+        for name in self._plan_names_before[found]:
+            if name in row:
+                return name
+        return found
     
     def _extract_fields_from_text(self, text: str) -> list:
-        import re
-        lines = [line.strip() for line in text.splitlines()]
-        data = []
-
-        # Extract Billed To: only the part before 'Invoice Period' or other fields
-        billed_to = ''
-        for i, line in enumerate(lines):
-            if re.search(r'billed to[:]*', line, re.IGNORECASE):
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1]
-                    # Remove anything after 'Invoice Period', 'Issue date', or 'Payment terms'
-                    split_line = re.split(r'Invoice Period|Issue date|Payment terms|Invoice number|,', next_line, flags=re.IGNORECASE)[0]
-                    billed_to = split_line.strip()
-                break
-
-        # Extract Invoice Period
-        invoice_period = ''
-        for i, line in enumerate(lines):
-            if re.search(r'invoice period[:]*', line, re.IGNORECASE):
-                period_match = re.search(r'(\d{2}/\d{2}/\d{4}[-–]\d{2}/\d{2}/\d{4})', line)
-                if period_match:
-                    invoice_period = period_match.group(1)
-                elif i + 1 < len(lines):
-                    period_match = re.search(r'(\d{2}/\d{2}/\d{4}[-–]\d{2}/\d{2}/\d{4})', lines[i + 1])
-                    if period_match:
-                        invoice_period = period_match.group(1)
-                break
-
-        # Extract Issue Date
-        invoice_date = ''
-        for i, line in enumerate(lines):
-            if re.search(r'issue date[:]*', line, re.IGNORECASE):
-                date_match = re.search(r'([A-Z]{3}\s+\d{1,2},\s+\d{4})', line)
-                if date_match:
-                    invoice_date = date_match.group(1)
-                elif i + 1 < len(lines):
-                    date_match = re.search(r'([A-Z]{3}\s+\d{1,2},\s+\d{4})', lines[i + 1])
-                    if date_match:
-                        invoice_date = date_match.group(1)
-                break
-
-        # Find the table header
-        table_start = -1
-        for i, line in enumerate(lines):
-            if re.search(r'company.*plan.*qty.*price.*amount', line.replace(' ', '').lower()):
-                table_start = i
-                break
-        if table_start == -1:
-            for i, line in enumerate(lines):
-                if re.search(r'company|plan|qty|unit.*price|amount', line, re.IGNORECASE):
-                    table_start = i
-                    break
-        if table_start == -1:
-            return []
-
-        # Parse table rows with improved logic
+        """Extract the records of one page as dicts; see _extract_items_from_text."""
+        return to_records(self._extract_items_from_text(text))
+    
+    def _extract_items_from_text(self, text: str) -> List[LineItem]:
+        """
+        Extract header fields and line items from the text of one page.
+        
+        All items of the page share one InvoiceHeader.
+        
+        A single sweep over the lines picks up Billed To, Invoice Period,
+        Issue Date and the table rows. Rows are parsed as soon as a loose
+        header match (any of company/plan/qty/unit price/amount) is seen, and
+        parsing restarts if a full Company/Plan/Qty/Price/Amount header shows
+        up later.
+        
+        Rows rebuilt by table_layout (five tab-separated cells) are taken as
+        they are, once they are known not to be summary lines; a row without
+        a company continues the previous one.
+        """
+        raw_lines = text.splitlines()
+        lines = [line.strip() for line in raw_lines]
+        line_count = len(lines)
+        
+        # None until the label has been seen; the first label wins even if its value is missing
+        billed_to = None
+        invoice_period = None
+        invoice_date = None
+        
+        header_kind = None  # None, 'loose' or 'strict'
+        in_table = False
+        rows = []
         last_company = ''
         current_company_lines = []
         
-        for i in range(table_start + 1, len(lines)):
-            row = lines[i].strip()
+        for i, row in enumerate(lines):
+            if billed_to is None and BILLED_TO_LABEL_RE.search(row):
+                # Only the part before 'Invoice Period' or other fields
+                billed_to = BILLED_TO_END_RE.split(lines[i + 1], 1)[0].strip() if i + 1 < line_count else ''
+            
+            if invoice_period is None and INVOICE_PERIOD_LABEL_RE.search(row):
+                period_match = INVOICE_PERIOD_RE.search(row)
+                if period_match is None and i + 1 < line_count:
+                    period_match = INVOICE_PERIOD_RE.search(lines[i + 1])
+                invoice_period = period_match.group(1) if period_match else ''
+            
+            if invoice_date is None and ISSUE_DATE_LABEL_RE.search(row):
+                date_match = ISSUE_DATE_RE.search(row)
+                if date_match is None and i + 1 < line_count:
+                    date_match = ISSUE_DATE_RE.search(lines[i + 1])
+                invoice_date = date_match.group(1) if date_match else ''
+            
+            if header_kind != 'strict':
+                is_strict = TABLE_HEADER_RE.search(row.replace(' ', '').lower()) is not None
+                if is_strict or (header_kind is None and TABLE_HEADER_LOOSE_RE.search(row)):
+                    header_kind = 'strict' if is_strict else 'loose'
+                    in_table = True
+                    rows = []
+                    last_company = ''
+                    current_company_lines = []
+                    continue
+            
+            if not in_table:
+                continue
+            
+            # Case-insensitive regexes are slow; ASCII rows use lowercase substring checks
+            if row.isascii():
+                lower = row.lower()
+                is_summary = ('total' in lower or 'amount due' in lower or 'hst' in lower or
+                              'gst' in lower or 'summary' in lower or 'page' in lower)
+                is_discount = '20% off' in lower and DISCOUNT_RE.search(row) is not None
+            else:
+                is_summary = SUMMARY_LINE_RE.search(row) is not None
+                is_discount = DISCOUNT_RE.search(row) is not None
             
             # Skip summary lines
-            if re.search(r'subtotal|total|amount due|hst|gst|summary|page', row, re.IGNORECASE):
-                break
+            if is_summary:
+                in_table = False
+                continue
             if not row:
                 continue
-                
+            
+            if TABLE_CELL_SEPARATOR in row:
+                cells = raw_lines[i].split(TABLE_CELL_SEPARATOR)
+                if len(cells) == len(TABLE_COLUMNS):
+                    company, plan, qty, unit_price, amount = (cell.strip() for cell in cells)
+                    if company:
+                        last_company = company
+                    rows.append((company or last_company, plan, qty, unit_price, amount))
+                    continue
+            
             # Handle 20% off discount lines
-            if re.search(r'\b20% off\b', row, re.IGNORECASE):
-                plan = '20% off'
-                amount_match = re.search(r'(-?\$?\d+[.,]?\d*)$', row)
-                amount = amount_match.group(1) if amount_match else ''
-                
+            if is_discount:
+                amount_match = TRAILING_AMOUNT_RE.search(row)
                 # Use the last complete company name
                 company_name = last_company
                 if current_company_lines:
                     company_name = ' '.join(current_company_lines).strip()
-                
-                data.append({
-                    'Billed To': billed_to if billed_to else '',
-                    'Invoice Period': invoice_period,
-                    'Invoice Issue Date': invoice_date,
-                    'Company Name': company_name,
-                    'Plan': plan,
-                    'Qty': '',
-                    'Unit Price': '',
-                    'Amount': amount
-                })
+                rows.append((company_name, '20% off', '', '', amount_match.group(1) if amount_match else ''))
                 continue
             
-            # Check if this line contains plan information
-            plan_keywords = [
-                'Base Plan', 'Ultimate Plan', '$0 Per Usage Fee Plan', 'Premium Plan', 'Standard Plan'
-            ]
-            
-            found_plan = False
-            plan_found = None
-            
-            for keyword in plan_keywords:
-                if keyword in row:
-                    plan_found = keyword
-                    found_plan = True
-                    break
-            
-            if found_plan:
+            plan_found = self._find_plan(row)
+            if plan_found is not None:
                 # This is a complete row with company, plan, and pricing
                 idx = row.find(plan_found)
                 company_part = row[:idx].strip()
@@ -301,96 +1335,44 @@ class InvoiceParser:
                     current_company_lines = []
                 else:
                     company_name = company_part
-                
                 last_company = company_name
                 
                 # Extract pricing information
-                after_plan = row[idx+len(plan_found):].strip()
-                nums = re.findall(r'(-?\$?\d+[.,]?\d*)', after_plan)
-                
-                qty = ''
-                unit_price = ''
-                amount = ''
-                
-                if len(nums) >= 3:
-                    qty, unit_price, amount = nums[0], nums[1], nums[2]
-                elif len(nums) == 2:
-                    qty, unit_price = nums[0], nums[1]
-                elif len(nums) == 1:
-                    qty = nums[0]
+                nums = NUMBER_RE.findall(row[idx + len(plan_found):].strip())
+                nums = (nums + ['', '', ''])[:3]
+                rows.append((company_name, plan_found, nums[0], nums[1], nums[2]))
+            elif not PRICING_RE.search(row):
+                # No pricing info, likely a company name continuation
+                current_company_lines.append(row)
+            else:
+                # Try to parse as a regular row
+                parts = COLUMN_SPLIT_RE.split(row)
+                if len(parts) < 2:
+                    parts = row.split()
+                if len(parts) < 3:
+                    continue
                 
-                data.append({
-                    'Billed To': billed_to if billed_to else '',
-                    'Invoice Period': invoice_period,
-                    'Invoice Issue Date': invoice_date,
-                    'Company Name': company_name,
-                    'Plan': plan_found,
-                    'Qty': qty,
-                    'Unit Price': unit_price,
-                    'Amount': amount
-                })
+                company = parts[0].strip()
+                # Combine with any previous company lines
+                if current_company_lines:
+                    company = ' '.join(current_company_lines + [company]).strip()
+                    current_company_lines = []
+                last_company = company
                 
-            else:
-                # This might be a continuation of a company name or a separate entry
-                # Check if it looks like a company name continuation
-                if not re.search(r'\$|\d+\.\d+|\d+,\d+', row):  # No pricing info
-                    # Likely a company name continuation
-                    current_company_lines.append(row)
+                if len(parts) >= 5:
+                    rows.append((company, parts[1].strip(), parts[2].strip(), parts[3].strip(), parts[4].strip()))
                 else:
-                    # Try to parse as a regular row
-                    parts = re.split(r'\s{2,}|\t+', row)
-                    if len(parts) < 2:
-                        parts = row.split()
-                    
-                    if len(parts) >= 5:
-                        company = parts[0].strip()
-                        plan = parts[1].strip()
-                        qty = parts[2].strip()
-                        unit_price = parts[3].strip()
-                        amount = parts[4].strip()
-                        
-                        # Combine with any previous company lines
-                        if current_company_lines:
-                            company = ' '.join(current_company_lines + [company]).strip()
-                            current_company_lines = []
-                        
-                        last_company = company
-                        
-                        data.append({
-                            'Billed To': billed_to if billed_to else '',
-                            'Invoice Period': invoice_period,
-                            'Invoice Issue Date': invoice_date,
-                            'Company Name': company,
-                            'Plan': plan,
-                            'Qty': qty,
-                            'Unit Price': unit_price,
-                            'Amount': amount
-                        })
-                    elif len(parts) >= 3:
-                        # Handle cases with fewer columns
-                        company = parts[0].strip()
-                        plan = parts[1].strip()
-                        qty = parts[2].strip() if len(parts) > 2 else ''
-                        
-                        # Combine with any previous company lines
-                        if current_company_lines:
-                            company = ' '.join(current_company_lines + [company]).strip()
-                            current_company_lines = []
-                        
-                        last_company = company
-                        
-                        data.append({
-                            'Billed To': billed_to if billed_to else '',
-                            'Invoice Period': invoice_period,
-                            'Invoice Issue Date': invoice_date,
-                            'Company Name': company,
-                            'Plan': plan,
-                            'Qty': qty,
-                            'Unit Price': '',
-                            'Amount': ''
-                        })
-        
-        return data
+                    # Handle cases with fewer columns
+                    rows.append((company, parts[1].strip(), parts[2].strip(), '', ''))
+        
+        if header_kind is None:
+            return []
+        
+        header = InvoiceHeader(billed_to or '', invoice_period or '', invoice_date or '')
+        return [
+            LineItem(header, company, plan, qty, unit_price, amount)
+            for company, plan, qty, unit_price, amount in rows
+        ]
     
     def _post_process_data(self, data: List[Dict]) -> List[Dict]:
         """
@@ -398,51 +1380,10 @@ class InvoiceParser:
         """
         if not data:
             return data
-            
-        # Find the first non-empty values for header fields
-        first_billed_to = ''
-        first_invoice_period = ''
-        first_invoice_date = ''
-        
-        for record in data:
-            if not first_billed_to and record.get('Billed To'):
-                first_billed_to = record['Billed To']
-            if not first_invoice_period and record.get('Invoice Period'):
-                first_invoice_period = record['Invoice Period']
-            if not first_invoice_date and record.get('Invoice Issue Date'):
-                first_invoice_date = record['Invoice Issue Date']
-            if first_billed_to and first_invoice_period and first_invoice_date:
-                break
-        
-        # Fill missing header values
-        processed_data = []
-        for record in data:
-            processed_record = record.copy()
-            
-            # Fill missing header fields
-            if not processed_record.get('Billed To') and first_billed_to:
-                processed_record['Billed To'] = first_billed_to
-            if not processed_record.get('Invoice Period') and first_invoice_period:
-                processed_record['Invoice Period'] = first_invoice_period
-            if not processed_record.get('Invoice Issue Date') and first_invoice_date:
-                processed_record['Invoice Issue Date'] = first_invoice_date
-            
-            # Clean up company names
-            if processed_record.get('Company Name'):
-                company = processed_record['Company Name'].strip()
-                # Remove common OCR artifacts
-                company = re.sub(r'\s+', ' ', company)  # Normalize whitespace
-                company = re.sub(r'[^\w\s&.,()-]', '', company)  # Remove special chars except common ones
-                processed_record['Company Name'] = company
-            
-            # Only include records with meaningful data
-            if (processed_record.get('Company Name') and 
-                processed_record.get('Plan') and 
-                processed_record['Company Name'].strip() and 
-                processed_record['Plan'].strip()):
-                processed_data.append(processed_record)
         
-        return processed_data
+        filler = _HeaderFiller()
+        items = from_records(data)
+        return to_records(filler.feed(items) + filler.finish())
     
     def save_to_csv(self, data: List[Dict], output_path: str) -> bool:
         """
@@ -456,30 +1397,64 @@ class InvoiceParser:
             bool: True if successful, False otherwise
         """
         try:
-            df = pd.DataFrame(data)
-            df.to_csv(output_path, index=False)
+            with self.metrics.time('save_csv'):
+                # Rows are written as they go, without building a DataFrame copy
+                fieldnames = list(dict.fromkeys(key for record in data for key in record))
+                with CsvRecordWriter(output_path, fieldnames) as writer:
+                    writer.write_many(data)
             logger.info(f"Data saved to CSV: {output_path}")
             return True
         except Exception as e:
             logger.error(f"Error saving to CSV: {str(e)}")
             return False
     
-    def save_to_excel(self, data: List[Dict], output_path: str) -> bool:
+    def save_to_excel(self, data: List[Dict], output_path: str, sheet_per_billed_to: bool = False) -> bool:
         """
         Save extracted data to Excel file.
         
+        Rows are streamed with openpyxl's write-only mode, and Qty, Unit Price
+        and Amount are written as numbers.
+        
         Args:
             data (List[Dict]): Extracted data
             output_path (str): Output file path
+            sheet_per_billed_to (bool): Write one sheet per Billed To value
             
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            df = pd.DataFrame(data)
-            df.to_excel(output_path, index=False, engine='openpyxl')
+            with self.metrics.time('save_excel'):
+                fieldnames = list(dict.fromkeys(key for record in data for key in record))
+                with XlsxRecordWriter(output_path, fieldnames, sheet_per_billed_to=sheet_per_billed_to) as writer:
+                    writer.write_many(data)
             logger.info(f"Data saved to Excel: {output_path}")
             return True
         except Exception as e:
             logger.error(f"Error saving to Excel: {str(e)}")
+            return False
+    
+    def save_to_parquet(self, data: List[Dict], output_path: str) -> bool:
+        """
+        Save extracted data as typed columns to a Parquet file (or an Arrow
+        IPC file for .arrow/.feather paths).
+        
+        Amounts are stored as integer cents, Qty as an integer, and the issue
+        date and invoice period start/end as dates. Needs pyarrow.
+        
+        Args:
+            data (List[Dict]): Extracted data
+            output_path (str): Output file path
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            with self.metrics.time('save_parquet'):
+                with ParquetRecordWriter(output_path) as writer:
+                    writer.write_many(data)
+            logger.info(f"Data saved to Parquet: {output_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving to Parquet: {str(e)}")
             return False 
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Compact in-memory form of extracted invoice records.
+
+The legacy record is a dict of eight columns, three of which (Billed To,
+Invoice Period and Invoice Issue Date) repeat the same values on every line
+item of a page. Inside the parser, each page's header values are instead
+held once in an InvoiceHeader that all of the page's LineItems point to,
+and both classes use __slots__, so a line item costs a fraction of a dict.
+Records are flattened to the dict shape only where they leave the parser:
+
+    items = parser.parse_page_items(page_texts)
+    records = to_records(items)
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+# Columns of a flattened record, in output order
+RECORD_FIELDS = ('Billed To', 'Invoice Period', 'Invoice Issue Date', 'Company Name', 'Plan', 'Qty',
+                 'Unit Price', 'Amount')
+
+# InvoiceHeader attributes, in the order of the header columns of RECORD_FIELDS
+HEADER_ATTRS = ('billed_to', 'invoice_period', 'invoice_issue_date')
+
+
+class InvoiceHeader:
+    """Billed To, Invoice Period and Issue date values shared by the line items of a page."""
+
+    __slots__ = HEADER_ATTRS
+
+    def __init__(self, billed_to: str = '', invoice_period: str = '', invoice_issue_date: str = ''):
+        self.billed_to = billed_to
+        self.invoice_period = invoice_period
+        self.invoice_issue_date = invoice_issue_date
+
+    def filled(self, defaults: Dict[str, str]) -> 'InvoiceHeader':
+        """
+        Return this header with empty values taken from defaults.
+
+        Args:
+            defaults (Dict[str, str]): Values by attribute name, e.g. {'billed_to': 'Acme'}
+
+        Returns:
+            InvoiceHeader: self if nothing needs filling, otherwise a new header
+        """
+        values = [getattr(self, attr) or defaults.get(attr, '') for attr in HEADER_ATTRS]
+        if values == [getattr(self, attr) for attr in HEADER_ATTRS]:
+            return self
+        return InvoiceHeader(*values)
+
+    def __repr__(self):
+        return (f"InvoiceHeader(billed_to={self.billed_to!r}, invoice_period={self.invoice_period!r}, "
+                f"invoice_issue_date={self.invoice_issue_date!r})")
+
+
+class LineItem:
+    """One table row of an invoice, pointing at the header of its page."""
+
+    __slots__ = ('header', 'company_name', 'plan', 'qty', 'unit_price', 'amount')
+
+    def __init__(self, header: InvoiceHeader, company_name: str, plan: str, qty: str = '',
+                 unit_price: str = '', amount: str = ''):
+        self.header = header
+        self.company_name = company_name
+        self.plan = plan
+        self.qty = qty
+        self.unit_price = unit_price
+        self.amount = amount
+
+    def to_dict(self) -> Dict[str, str]:
+        """Flatten to the legacy record dict, with the columns in RECORD_FIELDS order."""
+        header = self.header
+        return {
+            'Billed To': header.billed_to,
+            'Invoice Period': header.invoice_period,
+            'Invoice Issue Date': header.invoice_issue_date,
+            'Company Name': self.company_name,
+            'Plan': self.plan,
+            'Qty': self.qty,
+            'Unit Price': self.unit_price,
+            'Amount': self.amount
+        }
+
+    def __repr__(self):
+        return (f"LineItem(company_name={self.company_name!r}, plan={self.plan!r}, qty={self.qty!r}, "
+                f"unit_price={self.unit_price!r}, amount={self.amount!r})")
+
+
+def to_records(items: Iterable[LineItem]) -> List[Dict[str, str]]:
+    """Flatten line items to record dicts."""
+    return [item.to_dict() for item in items]
+
+
+def from_records(records: Iterable[Dict]) -> List[LineItem]:
+    """
+    Build line items from record dicts, sharing one header per distinct set of header values.
+
+    Missing columns become empty strings and columns outside RECORD_FIELDS are dropped.
+    """
+    headers: Dict[tuple, InvoiceHeader] = {}
+    items = []
+    for record in records:
+        key = (record.get('Billed To') or '', record.get('Invoice Period') or '',
+               record.get('Invoice Issue Date') or '')
+        header: Optional[InvoiceHeader] = headers.get(key)
+        if header is None:
+            header = headers[key] = InvoiceHeader(*key)
+        items.append(LineItem(header, record.get('Company Name') or '', record.get('Plan') or '',
+                              record.get('Qty') or '', record.get('Unit Price') or '',
+                              record.get('Amount') or ''))
+    return items
@@ -0,0 +1,175 @@
+"""
+Background job queue for the web app.
+
+Uploads are parsed by a small thread pool instead of inside the request, so
+a long OCR run no longer ties up a gunicorn worker. Job state is kept in one
+JSON file per job, so a status poll can be answered by any worker process,
+not only the one running the job.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = 'jobs'
+# Finished jobs older than this are deleted
+JOB_RETENTION_SECONDS = 24 * 60 * 60
+
+JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """File-backed job state shared by all worker processes."""
+
+    def __init__(self, jobs_dir: str = DEFAULT_JOBS_DIR):
+        self.jobs_dir = jobs_dir
+        self._last_prune = 0.0
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _write(self, job_id: str, job: Dict) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.jobs_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(job_id))
+
+    def create(self, **fields) -> str:
+        """Create a queued job owned by this process and return its ID."""
+        self.prune()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {'id': job_id, 'status': QUEUED, 'pid': os.getpid(), 'created': now, 'updated': now}
+        job.update(fields)
+        self._write(job_id, job)
+        return job_id
+
+    def update(self, job_id: str, **fields) -> None:
+        """Merge fields into a job's state."""
+        job = self.get(job_id) or {'id': job_id}
+        job.update(fields)
+        job['updated'] = time.time()
+        self._write(job_id, job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Load a job's state.
+
+        A job that is still queued or running but whose owning process has
+        exited is reported as failed.
+
+        Returns:
+            Optional[Dict]: The job, or None if the ID is unknown or malformed
+        """
+        if not JOB_ID_RE.match(job_id or ''):
+            return None
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if job.get('status') in (QUEUED, RUNNING) and not _pid_alive(job.get('pid', 0)):
+            job.update(status=FAILED, error='The worker processing this file stopped before it finished.')
+            self._write(job_id, job)
+        return job
+
+    def prune(self, max_age: float = JOB_RETENTION_SECONDS) -> None:
+        """Delete finished jobs older than max_age; runs at most once an hour per process."""
+        now = time.time()
+        if now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        for entry in os.scandir(self.jobs_dir):
+            try:
+                if entry.name.endswith('.json') and now - entry.stat().st_mtime > max_age:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class JobQueue:
+    """
+    Runs jobs on a thread pool and records their state in a JobStore.
+
+    The pool is started lazily in each process, so the queue can be created
+    at import time in a preloaded gunicorn master and still work in the
+    forked workers.
+    """
+
+    def __init__(self, store: JobStore, max_workers: int = 2):
+        self.store = store
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_pid = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+                self._executor_pid = os.getpid()
+                self._futures = {}
+            return self._executor
+
+    def submit(self, func: Callable[..., Dict], *args, **fields) -> str:
+        """
+        Queue func(*args) and return the job ID.
+
+        func must return a JSON-serializable dict, stored as the job's
+        result. Any exception marks the job as failed with its message.
+        Extra keyword arguments are stored on the job, e.g. the file name.
+        """
+        job_id = self.store.create(**fields)
+        future = self._get_executor().submit(self._run, job_id, func, args)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+        return job_id
+
+    def _forget(self, job_id: str) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id: str, func: Callable[..., Dict], args: tuple) -> None:
+        self.store.update(job_id, status=RUNNING, started=time.time())
+        try:
+            result = func(*args)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            self.store.update(job_id, status=FAILED, error=str(e))
+        else:
+            self.store.update(job_id, status=DONE, result=result)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Block until a job submitted by this process finishes, then return its state."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.exception(timeout=timeout)
+        return self.store.get(job_id)
@@ -8,34 +8,53 @@ import os
 import sys
 import argparse
 import glob
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from invoice_parser import InvoiceParser
+from typing import Callable, Dict, List, Tuple
+from invoice_parser import InvoiceParser, DEFAULT_OCR_BATCH_PAGES, DEFAULT_OCR_MIN_CONFIDENCE, OCR_BACKENDS
+from extraction_cache import ExtractionCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from file_manifest import FileManifest, DEFAULT_MAX_ATTEMPTS, DEFAULT_RUN_MANIFEST, DEFAULT_WATCH_MANIFEST, \
+    STATUS_DONE, STATUS_FAILED, file_sha256
+from folder_watch import FolderWatcher, DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE_SECONDS
+from page_text_store import PageTextStore
+from parse_metrics import ParseMetrics
+from record_writers import CsvRecordWriter, XlsxRecordWriter, ParquetRecordWriter
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def process_single_pdf(pdf_path: str, output_format: str = 'csv', output_filename: str = None) -> bool:
+# Extensions written as typed columns by --merge; anything else but .xlsx is CSV
+MERGE_TYPED_EXTENSIONS = ('.parquet', '.arrow', '.feather')
+
+def process_single_pdf(pdf_path: str, output_format: str = 'csv', output_filename: str = None,
+                       parser_options: dict = None, parser: InvoiceParser = None) -> int:
     """
     Process a single PDF file.
     
     Args:
         pdf_path (str): Path to the PDF file
-        output_format (str): Output format ('csv' or 'excel')
-        output_filename (str): Custom output filename (CSV or Excel) for single PDF processing
+        output_format (str): Output format ('csv', 'excel' or 'parquet')
+        output_filename (str): Custom output filename (CSV, Excel or Parquet) for single PDF processing
+        parser_options (dict): Keyword arguments for InvoiceParser
+        parser (InvoiceParser): Parser to reuse instead of building one from parser_options
         
     Returns:
-        bool: True if successful, False otherwise
+        int: Number of records saved, 0 (false) if processing failed
     """
     try:
         # Validate file exists
         if not os.path.exists(pdf_path):
             logger.error(f"PDF file not found: {pdf_path}")
-            return False
+            return 0
         
         # Initialize parser
-        parser = InvoiceParser()
+        if parser is None:
+            parser = InvoiceParser(**(parser_options or {}))
         
         # Parse PDF
         logger.info(f"Processing PDF: {pdf_path}")
@@ -43,47 +62,267 @@ def process_single_pdf(pdf_path: str, output_format: str = 'csv', output_filenam
         
         if not data:
             logger.warning(f"No data extracted from {pdf_path}")
-            return False
+            return 0
         
-        # Generate output filename
-        if output_filename:
-            output_path = output_filename
+        return len(data) if _save_output(parser, data, pdf_path, output_format, output_filename) else 0
+            
+    except Exception as e:
+        logger.error(f"Error processing {pdf_path}: {str(e)}")
+        return 0
+
+def _save_output(parser: InvoiceParser, data: list, pdf_path: str, output_format: str,
+                 output_filename: str = None) -> bool:
+    """
+    Write extracted records next to the current directory as <pdf name>_extracted.csv/.xlsx/.parquet.
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    # Generate output filename
+    if output_filename:
+        output_path = output_filename
+    else:
+        pdf_name = Path(pdf_path).stem
+        if output_format.lower() == 'excel':
+            output_path = f"{pdf_name}_extracted.xlsx"
+        elif output_format.lower() == 'parquet':
+            output_path = f"{pdf_name}_extracted.parquet"
         else:
-            pdf_name = Path(pdf_path).stem
-            if output_format.lower() == 'excel':
-                output_path = f"{pdf_name}_extracted.xlsx"
-            else:
-                output_path = f"{pdf_name}_extracted.csv"
+            output_path = f"{pdf_name}_extracted.csv"
+    
+    success = False
+    if output_format.lower() == 'excel':
+        success = parser.save_to_excel(data, output_path)
+    elif output_format.lower() == 'parquet':
+        success = parser.save_to_parquet(data, output_path)
+    else:
+        success = parser.save_to_csv(data, output_path)
+    
+    if success:
+        logger.info(f"Successfully processed {pdf_path}")
+        logger.info(f"Extracted {len(data)} records")
+        logger.info(f"Output saved to: {output_path}")
+        return True
+    else:
+        logger.error(f"Failed to save output for {pdf_path}")
+        return False
+
+class _LastProblem(logging.Handler):
+    """Logging handler keeping the last warning or error, as the reason a file failed."""
+    
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.message = None
+    
+    def emit(self, record):
+        self.message = record.getMessage()
+
+def _failed_outcome(error: str) -> dict:
+    """Outcome of a file that could not be processed at all, e.g. because its worker crashed."""
+    return {'success': False, 'records': 0, 'duration': 0.0, 'error': error,
+            'file_hash': None, 'size': None, 'mtime_ns': None}
+
+def _run_pdf(pdf_path: str, output_format: str, parser_options: dict = None, parser: InvoiceParser = None,
+             file_hash: str = None) -> dict:
+    """
+    Process one PDF with process_single_pdf and describe the outcome for a FileManifest.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        output_format (str): Output format ('csv', 'excel' or 'parquet')
+        parser_options (dict): Keyword arguments for InvoiceParser
+        parser (InvoiceParser): Parser to reuse instead of building one from parser_options
+        file_hash (str): SHA-256 of the file if already known
         
-        success = False
-        if output_format.lower() == 'excel':
-            success = parser.save_to_excel(data, output_path)
+    Returns:
+        dict: success, records, duration (seconds), error (the last warning or
+        error logged, for failed files), and file_hash, size and mtime_ns of
+        the file as it was processed (None if it could not be read)
+    """
+    outcome = _failed_outcome(None)
+    try:
+        stat = os.stat(pdf_path)
+        outcome['size'], outcome['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+        outcome['file_hash'] = file_hash or file_sha256(pdf_path)
+    except OSError:
+        pass  # process_single_pdf reports the missing file
+    
+    problem = _LastProblem()
+    logging.getLogger().addHandler(problem)
+    start = time.perf_counter()
+    try:
+        if parser is None:
+            records = process_single_pdf(pdf_path, output_format, None, parser_options)
         else:
-            success = parser.save_to_csv(data, output_path)
+            records = process_single_pdf(pdf_path, output_format, parser=parser)
+    finally:
+        outcome['duration'] = time.perf_counter() - start
+        logging.getLogger().removeHandler(problem)
+    
+    outcome['success'], outcome['records'] = bool(records), int(records)
+    if not outcome['success']:
+        outcome['error'] = problem.message or 'Processing failed'
+    return outcome
+
+def _record_outcome(manifest: FileManifest, pdf_file: str, outcome: dict, attempts: int = 1) -> None:
+    """Write a file's outcome to the manifest, hashing the file here if its worker could not."""
+    file_hash, size, mtime_ns = outcome['file_hash'], outcome['size'], outcome['mtime_ns']
+    if file_hash is None:
+        try:
+            stat = os.stat(pdf_file)
+            file_hash, size, mtime_ns = file_sha256(pdf_file), stat.st_size, stat.st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Not recording {pdf_file} in the manifest: {str(e)}")
+            return
+    status = STATUS_DONE if outcome['success'] else STATUS_FAILED
+    manifest.record(file_hash, pdf_file, size, mtime_ns, status, outcome['records'], outcome['duration'],
+                    outcome['error'], attempts)
+
+def _process_pdf_task(pdf_path: str, output_format: str, parser_options: dict = None) -> tuple:
+    """
+    Worker-process entry point: process one PDF with fresh metrics.
+    
+    Returns:
+        tuple: (outcome as from _run_pdf, metrics snapshot) so the parent can
+        record the outcome and merge the metrics
+    """
+    parser_options = dict(parser_options or {})
+    metrics = parser_options['metrics'] = ParseMetrics()
+    outcome = _run_pdf(pdf_path, output_format, parser_options)
+    return outcome, metrics.snapshot()
+
+def _process_in_pool(pdf_files: list, output_format: str, jobs: int, parser_options: dict = None,
+                     on_outcome: Callable[[str, dict], None] = None) -> dict:
+    """
+    Run process_single_pdf over pdf_files in a pool of worker processes.
+    
+    A worker that dies outright (segfault, OOM kill) breaks the whole pool, so
+    files that were still in flight are retried in a fresh single-worker pool.
+    There the first file to break the pool is the one that crashed; it is
+    marked as failed and the rest are retried again.
+    
+    Stage metrics from the workers are merged into parser_options['metrics']
+    when it is set.
+    
+    Args:
+        pdf_files (list): Paths to the PDF files
+        output_format (str): Output format ('csv', 'excel' or 'parquet')
+        jobs (int): Number of worker processes
+        parser_options (dict): Keyword arguments for InvoiceParser
+        on_outcome (Callable[[str, dict], None]): Called with each file and its
+            outcome as soon as the file is finished
         
-        if success:
-            logger.info(f"Successfully processed {pdf_path}")
-            logger.info(f"Extracted {len(data)} records")
-            logger.info(f"Output saved to: {output_path}")
-            return True
+    Returns:
+        dict: Mapping of PDF path to its outcome, as from _run_pdf
+    """
+    outcomes = {}
+    pending = list(pdf_files)
+    workers = jobs
+    metrics = (parser_options or {}).get('metrics')
+    
+    def finish(pdf_file: str, outcome: dict) -> None:
+        outcomes[pdf_file] = outcome
+        if on_outcome is not None:
+            on_outcome(pdf_file, outcome)
+    
+    while pending:
+        broken = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            futures = {
+                executor.submit(_process_pdf_task, pdf_file, output_format, parser_options): pdf_file
+                for pdf_file in pending
+            }
+            for future in as_completed(futures):
+                pdf_file = futures[future]
+                try:
+                    outcome, snapshot = future.result()
+                    if metrics is not None:
+                        metrics.merge(snapshot)
+                    finish(pdf_file, outcome)
+                except BrokenProcessPool:
+                    broken.append(pdf_file)
+                except Exception as e:
+                    logger.error(f"Error processing {pdf_file}: {str(e)}")
+                    finish(pdf_file, _failed_outcome(str(e)))
+        
+        if not broken:
+            break
+        
+        # Keep submission order so the crashing file is first in line
+        broken = set(broken)
+        pending = [pdf_file for pdf_file in pending if pdf_file in broken]
+        if workers == 1:
+            crashed = pending.pop(0)
+            logger.error(f"Worker process crashed while processing {crashed}")
+            finish(crashed, _failed_outcome('Worker process crashed'))
         else:
-            logger.error(f"Failed to save output for {pdf_path}")
-            return False
-            
-    except Exception as e:
-        logger.error(f"Error processing {pdf_path}: {str(e)}")
-        return False
+            logger.warning(f"Worker pool crashed, retrying {len(pending)} file(s) one at a time")
+            workers = 1
+    
+    return outcomes
 
-def process_directory(input_dir: str, output_format: str = 'csv') -> dict:
+def _files_to_resume(manifest: FileManifest, pdf_files: List[str],
+                     max_attempts: int) -> Tuple[List[str], Dict[str, int], int]:
+    """
+    Pick the files a resumed run still has to process.
+    
+    Files the manifest has as done are skipped, and so are failed files
+    after max_attempts attempts, unless the file changed (size or
+    modification time) since.
+    
+    Returns:
+        Tuple[List[str], Dict[str, int], int]: Files to process in order, the
+        attempt number each is on, and the number of files skipped as done
+    """
+    entries = manifest.entries()
+    to_process, attempts, done = [], {}, 0
+    for pdf_file in pdf_files:
+        entry = entries.get(os.path.abspath(pdf_file))
+        attempt = 1
+        if entry is not None:
+            try:
+                stat = os.stat(pdf_file)
+                unchanged = (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                unchanged = False
+            if unchanged and entry['status'] == STATUS_DONE:
+                done += 1
+                continue
+            if unchanged:
+                if entry['attempts'] >= max_attempts:
+                    logger.warning(f"Not retrying {pdf_file}: failed {entry['attempts']} times, "
+                                   f"last with: {entry['error']}")
+                    continue
+                attempt = entry['attempts'] + 1
+        to_process.append(pdf_file)
+        attempts[pdf_file] = attempt
+    return to_process, attempts, done
+
+def process_directory(input_dir: str, output_format: str = 'csv', jobs: int = 1,
+                      parser_options: dict = None, manifest_path: str = None, resume: bool = False,
+                      max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> dict:
     """
     Process all PDF files in a directory.
     
+    With a manifest, each file's hash, status, duration, record count and
+    error are written to it as soon as the file is finished, and the
+    summary is read back from it. A run that dies halfway can then be
+    continued with resume, which skips the files already done and retries
+    failed ones until they have had max_attempts attempts.
+    
     Args:
         input_dir (str): Directory containing PDF files
-        output_format (str): Output format ('csv' or 'excel')
+        output_format (str): Output format ('csv', 'excel' or 'parquet')
+        jobs (int): Number of worker processes (1 processes files in-line,
+            0 or less uses one worker per CPU)
+        parser_options (dict): Keyword arguments for InvoiceParser
+        manifest_path (str): SQLite run manifest (see file_manifest), or None for none
+        resume (bool): Continue the run recorded in the manifest
+        max_attempts (int): Attempts a failing file gets across resumed runs
         
     Returns:
-        dict: Summary of processing results
+        dict: Summary of processing results; with a manifest also the files
+        skipped as already done and the records extracted
     """
     results = {
         'total_files': 0,
@@ -92,10 +331,11 @@ def process_directory(input_dir: str, output_format: str = 'csv') -> dict:
         'failed_files': []
     }
     
+    manifest = None
     try:
         # Find all PDF files in directory
         pdf_pattern = os.path.join(input_dir, "*.pdf")
-        pdf_files = glob.glob(pdf_pattern)
+        pdf_files = sorted(glob.glob(pdf_pattern))
         
         if not pdf_files:
             logger.warning(f"No PDF files found in {input_dir}")
@@ -104,31 +344,337 @@ def process_directory(input_dir: str, output_format: str = 'csv') -> dict:
         results['total_files'] = len(pdf_files)
         logger.info(f"Found {len(pdf_files)} PDF files to process")
         
-        # Process each PDF file
-        for pdf_file in pdf_files:
-            success = process_single_pdf(pdf_file, output_format)
-            if success:
-                results['successful'] += 1
-            else:
-                results['failed'] += 1
-                results['failed_files'].append(pdf_file)
+        to_process, attempts, done = pdf_files, {}, 0
+        record = None
+        if manifest_path:
+            manifest = FileManifest(manifest_path)
+            if resume:
+                to_process, attempts, done = _files_to_resume(manifest, pdf_files, max_attempts)
+                logger.info(f"Resuming from {manifest_path}: {done} done, {len(to_process)} to process")
+            
+            def record(pdf_file: str, outcome: dict) -> None:
+                _record_outcome(manifest, pdf_file, outcome, attempts.get(pdf_file, 1))
         
-        # Print summary
-        logger.info(f"\nProcessing Summary:")
-        logger.info(f"Total files: {results['total_files']}")
-        logger.info(f"Successful: {results['successful']}")
-        logger.info(f"Failed: {results['failed']}")
+        if jobs < 1:
+            jobs = os.cpu_count() or 1
         
-        if results['failed_files']:
-            logger.info(f"Failed files:")
-            for failed_file in results['failed_files']:
-                logger.info(f"  - {failed_file}")
+        # Process each PDF file
+        if jobs > 1 and len(to_process) > 1:
+            logger.info(f"Processing with {jobs} worker processes")
+            outcomes = _process_in_pool(to_process, output_format, jobs, parser_options, record)
+        else:
+            metrics = (parser_options or {}).get('metrics')
+            outcomes = {}
+            for pdf_file in to_process:
+                outcomes[pdf_file], snapshot = _process_pdf_task(pdf_file, output_format, parser_options)
+                if metrics is not None:
+                    metrics.merge(snapshot)
+                if record is not None:
+                    record(pdf_file, outcomes[pdf_file])
+        
+        if manifest is not None:
+            summary = manifest.summarize(pdf_files)
+            for key in ('successful', 'failed', 'failed_files', 'records'):
+                results[key] = summary[key]
+            results['skipped'] = done
+            logger.info(f"Extracted {summary['records']} records in {summary['seconds']:.1f}s of processing")
+        else:
+            for pdf_file in pdf_files:
+                if outcomes[pdf_file]['success']:
+                    results['successful'] += 1
+                else:
+                    results['failed'] += 1
+                    results['failed_files'].append(pdf_file)
         
+        _log_summary(results, (parser_options or {}).get('metrics'))
         return results
         
     except Exception as e:
         logger.error(f"Error processing directory {input_dir}: {str(e)}")
         return results
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+def _parse_pdf_task(pdf_path: str, parser_options: dict = None) -> tuple:
+    """
+    Worker-process entry point for merged exports: parse one PDF with fresh metrics.
+    
+    Returns:
+        tuple: (records, metrics snapshot)
+    """
+    parser_options = dict(parser_options or {})
+    metrics = parser_options['metrics'] = ParseMetrics()
+    records = InvoiceParser(**parser_options).parse_pdf(pdf_path)
+    return records, metrics.snapshot()
+
+def _iter_parsed_in_pool(pdf_files: list, jobs: int, parser_options: dict = None):
+    """
+    Parse pdf_files in worker processes, yielding (pdf_file, records) in input order.
+    
+    At most two files per worker are in flight, so finished documents don't
+    pile up while an earlier one is still parsing. A crashed pool is handled
+    as in _process_in_pool: in-flight files are retried one at a time and the
+    file that crashes a single worker is yielded with no records.
+    """
+    pending = deque(pdf_files)
+    workers = jobs
+    metrics = (parser_options or {}).get('metrics')
+    
+    while pending:
+        in_flight = deque()
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            try:
+                while pending or in_flight:
+                    while pending and len(in_flight) < workers * 2:
+                        pdf_file = pending.popleft()
+                        in_flight.append((pdf_file, executor.submit(_parse_pdf_task, pdf_file, parser_options)))
+                    pdf_file, future = in_flight[0]
+                    try:
+                        records, snapshot = future.result()
+                        if metrics is not None:
+                            metrics.merge(snapshot)
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        logger.error(f"Error processing {pdf_file}: {str(e)}")
+                        records = []
+                    in_flight.popleft()
+                    yield pdf_file, records
+            except BrokenProcessPool:
+                retry = [pdf_file for pdf_file, _ in in_flight]
+                if workers == 1:
+                    crashed = retry.pop(0)
+                    logger.error(f"Worker process crashed while processing {crashed}")
+                    yield crashed, []
+                else:
+                    logger.warning(f"Worker pool crashed, retrying {len(retry)} file(s) one at a time")
+                    workers = 1
+                pending.extendleft(reversed(retry))
+
+def _merge_writer(output_path: str, sheet_per_billed_to: bool = False):
+    """Open the record writer matching the extension of output_path."""
+    extension = Path(output_path).suffix.lower()
+    if extension == '.xlsx':
+        return XlsxRecordWriter(output_path, sheet_per_billed_to=sheet_per_billed_to)
+    if extension in MERGE_TYPED_EXTENSIONS:
+        return ParquetRecordWriter(output_path)
+    return CsvRecordWriter(output_path)
+
+def merge_directory(input_dir: str, output_path: str, jobs: int = 1, parser_options: dict = None,
+                    sheet_per_billed_to: bool = False) -> dict:
+    """
+    Stream the records of every PDF in a directory into one CSV, Excel or Parquet file.
+    
+    Rows are written as they are extracted, so memory does not grow with the
+    number of files. With one job, records are streamed page by page through
+    InvoiceParser.iter_parse; with more, workers parse whole documents and the
+    parent writes them in file order.
+    
+    Args:
+        input_dir (str): Directory containing PDF files
+        output_path (str): File to write; .xlsx writes Excel, .parquet Parquet,
+            .arrow/.feather Arrow IPC, anything else CSV
+        jobs (int): Number of worker processes (0 or less uses one per CPU)
+        parser_options (dict): Keyword arguments for InvoiceParser
+        sheet_per_billed_to (bool): For Excel, write one sheet per Billed To value
+        
+    Returns:
+        dict: Summary of processing results, plus the number of records written
+    """
+    results = {
+        'total_files': 0,
+        'successful': 0,
+        'failed': 0,
+        'failed_files': [],
+        'records': 0
+    }
+    
+    pdf_files = sorted(glob.glob(os.path.join(input_dir, "*.pdf")))
+    if not pdf_files:
+        logger.warning(f"No PDF files found in {input_dir}")
+        return results
+    
+    results['total_files'] = len(pdf_files)
+    logger.info(f"Found {len(pdf_files)} PDF files to merge into {output_path}")
+    if jobs < 1:
+        jobs = os.cpu_count() or 1
+    
+    try:
+        with _merge_writer(output_path, sheet_per_billed_to) as writer:
+            if jobs > 1 and len(pdf_files) > 1:
+                logger.info(f"Processing with {jobs} worker processes")
+                counts = ((pdf_file, writer.write_many(records))
+                          for pdf_file, records in _iter_parsed_in_pool(pdf_files, jobs, parser_options))
+            else:
+                parser = InvoiceParser(**(parser_options or {}))
+                counts = ((pdf_file, writer.write_many(parser.iter_parse(pdf_file))) for pdf_file in pdf_files)
+            
+            for pdf_file, count in counts:
+                if count:
+                    results['successful'] += 1
+                    results['records'] += count
+                else:
+                    logger.warning(f"No data extracted from {pdf_file}")
+                    results['failed'] += 1
+                    results['failed_files'].append(pdf_file)
+    except Exception as e:
+        logger.error(f"Error writing {output_path}: {str(e)}")
+        results['failed_files'].extend(pdf_files[results['successful'] + results['failed']:])
+        results['failed'] = len(results['failed_files'])
+    
+    logger.info(f"Wrote {results['records']} records to {output_path}")
+    _log_summary(results, (parser_options or {}).get('metrics'))
+    return results
+
+def watch_directory(input_dir: str, output_format: str = 'csv', parser_options: dict = None,
+                    manifest_path: str = DEFAULT_WATCH_MANIFEST, settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+                    poll_interval: float = DEFAULT_POLL_INTERVAL, use_inotify: bool = True,
+                    stop: Callable[[], bool] = None) -> dict:
+    """
+    Process PDFs as they appear in a directory, until interrupted.
+    
+    PDFs already in the directory are processed first, then new and changed
+    ones once they have stopped changing for settle_seconds (see
+    folder_watch). Each file's SHA-256 is recorded in a FileManifest, so a
+    file whose content was already processed, successfully or not, is
+    skipped, including across restarts. One warmed-up parser serves all
+    files.
+    
+    Args:
+        input_dir (str): Directory to watch
+        output_format (str): Output format ('csv', 'excel' or 'parquet')
+        parser_options (dict): Keyword arguments for InvoiceParser
+        manifest_path (str): SQLite file recording processed files
+        settle_seconds (float): How long a file must stay unchanged before it is parsed
+        poll_interval (float): Seconds between checks for changes
+        use_inotify (bool): Use inotify where available instead of polling
+        stop (Callable[[], bool]): Checked between polls; watching ends when it
+            returns True. Without it, watching runs until Ctrl+C.
+        
+    Returns:
+        dict: Summary of processing results, plus the number of files skipped as already processed
+    """
+    results = {
+        'total_files': 0,
+        'successful': 0,
+        'failed': 0,
+        'failed_files': [],
+        'skipped': 0
+    }
+    
+    if not os.path.isdir(input_dir):
+        logger.error(f"Directory not found: {input_dir}")
+        return results
+    
+    parser = InvoiceParser(**(parser_options or {}))
+    parser.warm_up()
+    manifest = FileManifest(manifest_path)
+    try:
+        with FolderWatcher(input_dir, settle_seconds, use_inotify) as watcher:
+            logger.info(f"Watching {input_dir} for PDFs ({'inotify' if watcher.uses_inotify else 'polling'}), "
+                        f"press Ctrl+C to stop")
+            while stop is None or not stop():
+                for pdf_file in watcher.poll(poll_interval):
+                    _process_watched_pdf(pdf_file, output_format, parser, manifest, results)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+    finally:
+        manifest.close()
+    
+    _log_summary(results, (parser_options or {}).get('metrics'))
+    return results
+
+def _process_watched_pdf(pdf_file: str, output_format: str, parser: InvoiceParser, manifest: FileManifest,
+                         results: dict) -> None:
+    """Process one settled PDF from a watched directory, unless the manifest has its content."""
+    try:
+        stat = os.stat(pdf_file)
+        if manifest.has_unchanged(pdf_file, stat.st_size, stat.st_mtime_ns):
+            results['skipped'] += 1
+            return
+        file_hash = file_sha256(pdf_file)
+    except OSError as e:
+        logger.warning(f"Cannot read {pdf_file}: {str(e)}")
+        return
+    
+    if manifest.status(file_hash) is not None:
+        logger.info(f"Skipping {pdf_file}: already processed")
+        results['skipped'] += 1
+        return
+    
+    results['total_files'] += 1
+    outcome = _run_pdf(pdf_file, output_format, parser=parser, file_hash=file_hash)
+    if outcome['success']:
+        results['successful'] += 1
+    else:
+        results['failed'] += 1
+        results['failed_files'].append(pdf_file)
+    _record_outcome(manifest, pdf_file, outcome)
+
+def _log_summary(results: dict, metrics: ParseMetrics = None) -> None:
+    """Print the processing summary, with the stage breakdown if metrics are given."""
+    logger.info(f"\nProcessing Summary:")
+    logger.info(f"Total files: {results['total_files']}")
+    logger.info(f"Successful: {results['successful']}")
+    logger.info(f"Failed: {results['failed']}")
+    if 'skipped' in results:
+        logger.info(f"Skipped (already processed): {results['skipped']}")
+    
+    if results['failed_files']:
+        logger.info(f"Failed files:")
+        for failed_file in results['failed_files']:
+            logger.info(f"  - {failed_file}")
+    
+    if metrics is not None:
+        for line in metrics.summary_lines():
+            logger.info(line)
+
+def replay_text_store(text_store_path: str, output_format: str = 'csv', plan_names: list = None) -> dict:
+    """
+    Re-run field extraction over every document in a page text store.
+    
+    Only _extract_fields_from_text and _post_process_data run, so the effect
+    of a rule change can be checked without re-rendering or re-OCRing.
+    
+    Args:
+        text_store_path (str): Path to the page text store database
+        output_format (str): Output format ('csv', 'excel' or 'parquet')
+        plan_names (list): Recognized plan names, defaults to the parser's built-in list
+        
+    Returns:
+        dict: Summary of processing results, with stored source names as files
+    """
+    results = {
+        'total_files': 0,
+        'successful': 0,
+        'failed': 0,
+        'failed_files': []
+    }
+    
+    if not os.path.exists(text_store_path):
+        logger.error(f"Text store not found: {text_store_path}")
+        return results
+    
+    store = PageTextStore(text_store_path)
+    parser = InvoiceParser(plan_names=plan_names)
+    try:
+        for doc_hash, source in store.iter_documents():
+            name = source or doc_hash
+            results['total_files'] += 1
+            data = parser.parse_page_texts(store.load_document(doc_hash))
+            if data and _save_output(parser, data, name, output_format):
+                results['successful'] += 1
+            else:
+                if not data:
+                    logger.warning(f"No data extracted from {name}")
+                results['failed'] += 1
+                results['failed_files'].append(name)
+    finally:
+        store.close()
+    
+    _log_summary(results, parser.metrics)
+    return results
 
 def main():
     """Main function to handle command line arguments and execute processing."""
@@ -148,6 +694,26 @@ Examples:
   
   # Process all PDFs in a directory and save as Excel
   python main.py --directory ./invoices/ --format excel
+  
+  # Save typed columns (integer cents, dates) as Parquet
+  python main.py --directory ./invoices/ --format parquet
+  
+  # Process a directory with 8 worker processes
+  python main.py --directory ./invoices/ --jobs 8
+  
+  # Continue an interrupted directory run, retrying failed PDFs up to 3 times
+  python main.py --directory ./invoices/ --resume
+  
+  # Stream every invoice in a directory into one CSV, or one workbook with a sheet per customer
+  python main.py --directory ./invoices/ --merge all_invoices.csv
+  python main.py --directory ./invoices/ --merge all_invoices.xlsx --sheet-per-billed-to
+  
+  # Keep extracted page text, then re-run field extraction from it
+  python main.py --directory ./invoices/ --text-store pages.db
+  python main.py --replay --text-store pages.db
+  
+  # Keep processing PDFs as they are dropped into a directory
+  python main.py --directory ./incoming/ --watch
         """
     )
     
@@ -164,14 +730,165 @@ Examples:
     
     parser.add_argument(
         '--format', '-f',
-        choices=['csv', 'excel'],
+        choices=['csv', 'excel', 'parquet'],
         default='csv',
-        help='Output format (default: csv)'
+        help='Output format (default: csv); parquet writes typed columns and needs pyarrow'
     )
     
     parser.add_argument(
         '--output', '-o',
-        help='Custom output filename (CSV or Excel) for single PDF processing'
+        help='Custom output filename for single PDF processing, written in --format: CSV, Excel, or with parquet '
+             'typed columns (.parquet, or Arrow IPC for .arrow/.feather)'
+    )
+    
+    parser.add_argument(
+        '--merge',
+        metavar='OUTPUT_FILE',
+        help='With --directory, stream the records of all PDFs into this one file (.csv, .xlsx, .parquet, .arrow or .feather)'
+    )
+    
+    parser.add_argument(
+        '--sheet-per-billed-to',
+        action='store_true',
+        help='With an .xlsx --merge file, write one sheet per Billed To value'
+    )
+    
+    parser.add_argument(
+        '--manifest',
+        help=f'SQLite file recording the outcome of each PDF of a directory run (default with --resume: '
+             f'{DEFAULT_RUN_MANIFEST})'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='With --directory, skip the PDFs the --manifest has as done and retry the failed ones'
+    )
+    
+    parser.add_argument(
+        '--max-attempts',
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help='With --resume, how many times a failing PDF is tried across runs (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='With --directory, keep running and process PDFs as they arrive, each content once'
+    )
+    
+    parser.add_argument(
+        '--watch-manifest',
+        default=DEFAULT_WATCH_MANIFEST,
+        help='SQLite file recording the PDFs --watch has processed (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--settle-seconds',
+        type=float,
+        default=DEFAULT_SETTLE_SECONDS,
+        help='With --watch, how long a PDF must stay unchanged before it is parsed (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--poll',
+        action='store_true',
+        help='With --watch, poll the directory instead of using inotify, e.g. on network shares'
+    )
+    
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='Number of worker processes for directory processing (default: 1, 0 = one per CPU)'
+    )
+    
+    parser.add_argument(
+        '--ocr-workers',
+        type=int,
+        default=None,
+        help='Number of pages to OCR concurrently within one PDF (default: up to 4)'
+    )
+    
+    parser.add_argument(
+        '--adaptive-ocr',
+        action='store_true',
+        help='OCR scanned pages at 100 dpi first and re-render at 200/300 dpi only when tesseract is unsure'
+    )
+    
+    parser.add_argument(
+        '--ocr-min-confidence',
+        type=float,
+        default=DEFAULT_OCR_MIN_CONFIDENCE,
+        help='Mean word confidence (0-100) that ends --adaptive-ocr retries (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--ocr-backend',
+        choices=sorted(OCR_BACKENDS),
+        default='pytesseract',
+        help='How pages reach tesseract: one process per page (pytesseract) or per batch of pages (batch)'
+    )
+    
+    parser.add_argument(
+        '--ocr-batch-pages',
+        type=int,
+        default=DEFAULT_OCR_BATCH_PAGES,
+        help='Most scanned pages read by one tesseract run with --ocr-backend batch (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--roi-ocr',
+        action='store_true',
+        help='OCR only the text regions of scanned pages, falling back to the full page when they yield no text'
+    )
+    
+    parser.add_argument(
+        '--classify-pages',
+        action='store_true',
+        help='Skip pages without an invoice table, header fields or a scan before extracting or OCRing them'
+    )
+    
+    parser.add_argument(
+        '--no-positional-tables',
+        action='store_true',
+        help='Parse invoice tables from the flattened page text instead of the word positions'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        default=DEFAULT_CACHE_DIR,
+        help=f'Directory for cached extraction results (default: {DEFAULT_CACHE_DIR})'
+    )
+    
+    parser.add_argument(
+        '--cache-max-mb',
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help='Maximum size of the result cache in MB (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always re-parse PDFs instead of using cached results'
+    )
+    
+    parser.add_argument(
+        '--plans-file',
+        help='Text file with one recognized plan name per line, in priority order'
+    )
+    
+    parser.add_argument(
+        '--text-store',
+        help='SQLite file to save per-page extracted text in (and replay it from)'
+    )
+    
+    parser.add_argument(
+        '--replay',
+        action='store_true',
+        help='Re-run field extraction from --text-store instead of reading PDFs'
     )
     
     parser.add_argument(
@@ -186,7 +903,20 @@ Examples:
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
+    plan_names = None
+    if args.plans_file:
+        with open(args.plans_file, 'r', encoding='utf-8') as f:
+            plan_names = [line.strip() for line in f if line.strip()]
+    
     # Validate arguments
+    if args.replay:
+        if not args.text_store:
+            logger.error("--replay requires --text-store")
+            parser.print_help()
+            sys.exit(1)
+        results = replay_text_store(args.text_store, args.format, plan_names)
+        sys.exit(0 if results['failed'] == 0 else 1)
+    
     if not args.pdf_file and not args.directory:
         logger.error("Please provide either a PDF file or a directory to process")
         parser.print_help()
@@ -197,15 +927,56 @@ Examples:
         parser.print_help()
         sys.exit(1)
     
+    if args.merge and not args.directory:
+        logger.error("--merge requires --directory")
+        parser.print_help()
+        sys.exit(1)
+    
+    if args.watch and (not args.directory or args.merge):
+        logger.error("--watch requires --directory and can't be combined with --merge")
+        parser.print_help()
+        sys.exit(1)
+    
+    if (args.resume or args.manifest) and (not args.directory or args.merge or args.watch):
+        logger.error("--resume and --manifest require --directory and can't be combined with --merge or --watch")
+        parser.print_help()
+        sys.exit(1)
+    
+    merge_extensions = {'excel': ('.xlsx',), 'parquet': MERGE_TYPED_EXTENSIONS}.get(args.format)
+    if args.merge and merge_extensions and not args.merge.lower().endswith(merge_extensions):
+        logger.error(f"--merge with --format {args.format} needs a {', '.join(merge_extensions)} file name")
+        sys.exit(1)
+    
+    parser_options = {'ocr_workers': args.ocr_workers, 'plan_names': plan_names, 'metrics': ParseMetrics(),
+                      'adaptive_ocr': args.adaptive_ocr, 'ocr_min_confidence': args.ocr_min_confidence,
+                      'roi_ocr': args.roi_ocr, 'ocr_backend': args.ocr_backend,
+                      'ocr_batch_pages': args.ocr_batch_pages, 'positional_tables': not args.no_positional_tables,
+                      'classify_pages': args.classify_pages}
+    if not args.no_cache:
+        parser_options['cache'] = ExtractionCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+    if args.text_store:
+        parser_options['text_store'] = PageTextStore(args.text_store)
+    
     # Process based on input type
     if args.pdf_file:
         # Process single file
         output_filename = args.output if args.output else None
-        success = process_single_pdf(args.pdf_file, args.format, output_filename)
+        success = process_single_pdf(args.pdf_file, args.format, output_filename, parser_options)
+        for line in parser_options['metrics'].summary_lines():
+            logger.info(line)
         sys.exit(0 if success else 1)
+    elif args.watch:
+        results = watch_directory(args.directory, args.format, parser_options, args.watch_manifest,
+                                  args.settle_seconds, use_inotify=not args.poll)
+        sys.exit(0 if results['failed'] == 0 else 1)
+    elif args.merge:
+        results = merge_directory(args.directory, args.merge, args.jobs, parser_options, args.sheet_per_billed_to)
+        sys.exit(0 if results['failed'] == 0 else 1)
     else:
         # Process directory
-        results = process_directory(args.directory, args.format)
+        manifest_path = args.manifest or (DEFAULT_RUN_MANIFEST if args.resume else None)
+        results = process_directory(args.directory, args.format, args.jobs, parser_options, manifest_path,
+                                    args.resume, args.max_attempts)
         sys.exit(0 if results['failed'] == 0 else 1)
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+"""
+Layout pass for OCR: find the text on a binarized page before tesseract reads it.
+
+A scanned invoice page is mostly margins and white space, with a logo, a
+footer and perhaps a stamp around the header block and line item table the
+parser needs. crop_to_text finds the text lines with a few OpenCV passes
+(ruling lines removed, characters merged into lines, logos and specks
+dropped) and stacks the horizontal bands that hold them into one compact
+image, so tesseract reads far fewer pixels. Bands keep their full common
+width, so table columns stay aligned.
+
+OpenCV and NumPy are imported with this module; invoice_parser imports it
+only when region-of-interest OCR is switched on.
+"""
+
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# (x, y, width, height) in pixels
+Box = Tuple[int, int, int, int]
+
+# Components taller than this many median text lines are treated as graphics (logos, stamps, photos)
+MAX_LINE_HEIGHT_RATIO = 3.0
+# The layout pass runs on the page shrunk by this factor; boxes are scaled back up
+LAYOUT_SCALE = 2
+# Crops covering more than this share of the page are not worth it; the full page is read instead
+MAX_CROP_RATIO = 0.8
+
+
+def _median_char_height(ink: np.ndarray) -> int:
+    """Median height of the connected components of a page, roughly its character height."""
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    heights = heights[heights > 2]
+    return int(np.median(heights)) if len(heights) else 0
+
+
+def find_text_lines(binary: np.ndarray) -> List[Box]:
+    """
+    Find the bounding boxes of text lines on a binarized page.
+
+    Args:
+        binary (np.ndarray): Grayscale page with dark text on a light background
+
+    Returns:
+        List[Box]: Text line boxes, top to bottom; empty if no text was found
+    """
+    _, ink = cv2.threshold(binary, 127, 255, cv2.THRESH_BINARY_INV)
+    # Any ink in a LAYOUT_SCALE square keeps its pixel, so thin strokes survive the shrink
+    ink = cv2.resize(ink, (max(1, ink.shape[1] // LAYOUT_SCALE), max(1, ink.shape[0] // LAYOUT_SCALE)),
+                     interpolation=cv2.INTER_AREA)
+    _, ink = cv2.threshold(ink, 0, 255, cv2.THRESH_BINARY)
+    char_height = _median_char_height(ink)
+    if not char_height:
+        return []
+
+    # Remove table ruling lines so they don't join the rows they separate
+    page_height, page_width = ink.shape
+    horizontal = cv2.getStructuringElement(cv2.MORPH_RECT, (max(char_height * 8, page_width // 20), 1))
+    vertical = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(char_height * 4, page_height // 40)))
+    rules = cv2.bitwise_or(cv2.morphologyEx(ink, cv2.MORPH_OPEN, horizontal),
+                           cv2.morphologyEx(ink, cv2.MORPH_OPEN, vertical))
+    text = cv2.subtract(ink, rules)
+
+    # Merge the characters and words of a line into one component
+    joined = cv2.dilate(text, cv2.getStructuringElement(cv2.MORPH_RECT, (char_height * 2, 1)))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(joined, connectivity=8)
+    boxes = [tuple(int(v) for v in stats[label, :4]) for label in range(1, count)]
+    if not boxes:
+        return []
+    line_height = float(np.median([height for _, _, _, height in boxes]))
+    return sorted(
+        (tuple(value * LAYOUT_SCALE for value in box) for box in boxes
+         # Drop specks and graphics
+         if box[3] >= line_height / 3 and box[2] >= char_height / 2
+         and box[3] <= line_height * MAX_LINE_HEIGHT_RATIO),
+        key=lambda box: (box[1], box[0])
+    )
+
+
+def _bands(lines: List[Box], pad: int) -> List[Tuple[int, int]]:
+    """Merge text line boxes into padded, non-overlapping (top, bottom) row ranges."""
+    bands = []
+    for _, y, _, height in lines:
+        top, bottom = y - pad, y + height + pad
+        if bands and top <= bands[-1][1]:
+            bands[-1] = (bands[-1][0], max(bands[-1][1], bottom))
+        else:
+            bands.append((top, bottom))
+    return bands
+
+
+def crop_to_text(binary: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Stack the text bands of a binarized page into one compact image.
+
+    Args:
+        binary (np.ndarray): Grayscale page with dark text on a light background
+
+    Returns:
+        Optional[np.ndarray]: The stacked bands, or None if no text was found or
+        cropping would not save at least 1 - MAX_CROP_RATIO of the pixels
+    """
+    lines = find_text_lines(binary)
+    if not lines:
+        return None
+    page_height, page_width = binary.shape[:2]
+    pad = max(2, int(np.median([height for _, _, _, height in lines])) // 3)
+    left = max(0, min(x for x, _, _, _ in lines) - pad)
+    right = min(page_width, max(x + width for x, _, width, _ in lines) + pad)
+    bands = [(max(0, top), min(page_height, bottom)) for top, bottom in _bands(lines, pad)]
+
+    height = sum(bottom - top for top, bottom in bands) + pad * (len(bands) - 1)
+    if height * (right - left) > MAX_CROP_RATIO * page_height * page_width:
+        return None
+    stacked = np.full((height, right - left), 255, dtype=binary.dtype)
+    y = 0
+    for top, bottom in bands:
+        stacked[y:y + bottom - top] = binary[top:bottom, left:right]
+        y += bottom - top + pad
+    return stacked
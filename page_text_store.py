@@ -0,0 +1,138 @@
+"""
+Persistent store of per-page extracted text.
+
+Every page's text is saved zlib-compressed in a SQLite database together with
+the engine that produced it (pdfplumber, pymupdf or ocr), keyed by the SHA-256
+of the PDF bytes and the page number. Re-running field extraction after a
+rule change can then replay the stored text instead of re-rendering and
+re-OCRing the archive.
+
+Each document also records the text mode it was extracted in (see
+InvoiceParser.text_mode): positional tables, page classification and the
+OCR settings change the text itself, so a parser running in another mode
+treats the stored copy as missing and extracts the document again.
+"""
+
+import logging
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_hash TEXT PRIMARY KEY,
+    source TEXT,
+    text_mode TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    doc_hash TEXT NOT NULL REFERENCES documents(doc_hash) ON DELETE CASCADE,
+    page_num INTEGER NOT NULL,
+    engine TEXT NOT NULL,
+    text BLOB NOT NULL,
+    PRIMARY KEY (doc_hash, page_num)
+);
+"""
+
+
+class PageTextStore:
+    """
+    SQLite-backed store of (page number, engine, text) per document.
+
+    Each thread and each process opens its own connection, so one store can be
+    shared by the OCR thread pool and handed to batch worker processes.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Stores written before text modes were recorded; their documents have no mode
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(documents)')]
+            if 'text_mode' not in columns:
+                conn.execute('ALTER TABLE documents ADD COLUMN text_mode TEXT')
+
+    def __getstate__(self):
+        # Connections can't be pickled; worker processes open their own
+        return {'db_path': self.db_path}
+
+    def __setstate__(self, state):
+        self.db_path = state['db_path']
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA foreign_keys = ON')
+            self._local.conn = conn
+        return conn
+
+    def has_document(self, doc_hash: str, text_mode: Optional[str] = None) -> bool:
+        """
+        Check whether the pages of a document are stored.
+
+        Args:
+            doc_hash (str): SHA-256 of the PDF bytes
+            text_mode (str): Only count a copy extracted in this text mode; None accepts any
+        """
+        row = self._connect().execute(
+            'SELECT text_mode FROM documents WHERE doc_hash = ?', (doc_hash,)
+        ).fetchone()
+        return row is not None and (text_mode is None or row[0] == text_mode)
+
+    def save_document(self, doc_hash: str, page_texts: List[Tuple[int, str, str]],
+                      source: Optional[str] = None, text_mode: Optional[str] = None) -> None:
+        """
+        Store the extracted pages of a document, replacing any previous copy.
+
+        Args:
+            doc_hash (str): SHA-256 of the PDF bytes
+            page_texts (List[Tuple[int, str, str]]): (page number, engine, text) tuples
+            source (str): Original file name, used to name replay outputs
+            text_mode (str): Text mode the pages were extracted in
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM documents WHERE doc_hash = ?', (doc_hash,))
+            conn.execute(
+                'INSERT INTO documents (doc_hash, source, text_mode, created_at) VALUES (?, ?, ?, ?)',
+                (doc_hash, source, text_mode, datetime.now().isoformat(timespec='seconds'))
+            )
+            conn.executemany(
+                'INSERT INTO pages (doc_hash, page_num, engine, text) VALUES (?, ?, ?, ?)',
+                [(doc_hash, page_num, engine, zlib.compress(text.encode('utf-8')))
+                 for page_num, engine, text in page_texts]
+            )
+
+    def load_document(self, doc_hash: str) -> List[Tuple[int, str, str]]:
+        """
+        Load the stored pages of a document.
+
+        Returns:
+            List[Tuple[int, str, str]]: (page number, engine, text) in page order
+        """
+        rows = self._connect().execute(
+            'SELECT page_num, engine, text FROM pages WHERE doc_hash = ? ORDER BY page_num',
+            (doc_hash,)
+        ).fetchall()
+        return [(page_num, engine, zlib.decompress(text).decode('utf-8')) for page_num, engine, text in rows]
+
+    def iter_documents(self) -> Iterator[Tuple[str, Optional[str]]]:
+        """Yield (doc_hash, source) for every stored document, oldest first."""
+        rows = self._connect().execute(
+            'SELECT doc_hash, source FROM documents ORDER BY created_at, doc_hash'
+        ).fetchall()
+        yield from rows
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,169 @@
+"""
+Per-stage timing and counters for invoice parsing.
+
+InvoiceParser records how long each stage took (pdfplumber, PyMuPDF, OCR,
+field extraction, post-processing, CSV/Excel/Parquet writes) and counts pages per
+engine, fallbacks, rows and cache hits into a ParseMetrics object. Hooks can
+subscribe to every observation, snapshots can be merged across worker
+processes, and the totals render as Prometheus text or a log summary.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+# Display order for the summary; any other stage or counter is listed after these
+STAGES = ('read', 'classify', 'pdfplumber', 'pymupdf', 'ocr', 'field_extraction', 'post_process', 'save_csv',
+          'save_excel', 'save_parquet')
+COUNTERS = (
+    'documents', 'parse_errors', 'cache_hits', 'cache_misses', 'text_store_hits',
+    'pages_pdfplumber', 'pages_pymupdf', 'pages_ocr', 'pages_empty', 'pages_skipped',
+    'fallbacks_pymupdf', 'fallbacks_ocr', 'ocr_rerenders', 'ocr_pixels',
+    'ocr_roi_fallbacks', 'rows_extracted'
+)
+
+COUNTER_HELP = {
+    'documents': 'PDF documents parsed',
+    'parse_errors': 'Documents that failed to parse',
+    'cache_hits': 'Documents served from the result cache',
+    'cache_misses': 'Documents not found in the result cache',
+    'text_store_hits': 'Documents whose page text was loaded from the text store',
+    'pages_pdfplumber': 'Pages read from the text layer with pdfplumber',
+    'pages_pymupdf': 'Pages read from the text layer with PyMuPDF',
+    'pages_ocr': 'Pages read with OCR',
+    'pages_empty': 'Pages that produced no text with any engine',
+    'pages_skipped': 'Pages the page classifier found no invoice table, header fields or scan on',
+    'fallbacks_pymupdf': 'Pages where pdfplumber found no text and PyMuPDF was tried',
+    'fallbacks_ocr': 'Pages without a usable text layer that were sent to OCR',
+    'ocr_rerenders': 'Extra renders of scanned pages by adaptive OCR after a low-confidence attempt',
+    'ocr_pixels': 'Pixels of binarized page images sent to tesseract',
+    'ocr_roi_fallbacks': 'Scanned pages where region-of-interest OCR fell back to the full page',
+    'rows_extracted': 'Records extracted',
+}
+
+# Hook signature: hook(kind, name, value) with kind 'stage' (value in seconds) or 'counter'
+MetricsHook = Callable[[str, str, float], None]
+
+
+class ParseMetrics:
+    """Thread-safe accumulator of stage durations and event counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hooks: List[MetricsHook] = []
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+
+    def __getstate__(self):
+        # Hooks and locks stay in the process that registered them
+        return {'stage_seconds': dict(self.stage_seconds), 'stage_calls': dict(self.stage_calls),
+                'counters': dict(self.counters)}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.merge(state)
+
+    def add_hook(self, hook: MetricsHook) -> None:
+        """Call hook(kind, name, value) on every stage timing and counter increment."""
+        self._hooks.append(hook)
+
+    def _notify(self, kind: str, name: str, value: float) -> None:
+        for hook in self._hooks:
+            hook(kind, name, value)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record one run of a stage."""
+        with self._lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+        self._notify('stage', stage, seconds)
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        """Add amount to a counter."""
+        if not amount:
+            return
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+        self._notify('counter', counter, amount)
+
+    @contextmanager
+    def time(self, stage: str):
+        """Context manager that records the duration of its block as a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Return a picklable copy of the totals."""
+        with self._lock:
+            return self.__getstate__()
+
+    def merge(self, snapshot: Dict[str, Dict]) -> None:
+        """Add the totals of a snapshot, e.g. one returned by a worker process."""
+        with self._lock:
+            for stage, seconds in snapshot.get('stage_seconds', {}).items():
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            for stage, calls in snapshot.get('stage_calls', {}).items():
+                self.stage_calls[stage] = self.stage_calls.get(stage, 0) + calls
+            for counter, value in snapshot.get('counters', {}).items():
+                self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def _ordered(self, names, known) -> List[str]:
+        return [name for name in known if name in names] + sorted(set(names) - set(known))
+
+    def summary_lines(self) -> List[str]:
+        """Format the totals for the CLI processing summary."""
+        snapshot = self.snapshot()
+        lines = []
+        if snapshot['stage_seconds']:
+            lines.append("Stage timings:")
+            for stage in self._ordered(snapshot['stage_seconds'], STAGES):
+                lines.append(f"  {stage:<18} {snapshot['stage_seconds'][stage]:9.3f}s"
+                             f"  ({snapshot['stage_calls'][stage]} calls)")
+        if snapshot['counters']:
+            lines.append("Counters:")
+            for counter in self._ordered(snapshot['counters'], COUNTERS):
+                lines.append(f"  {counter:<18} {snapshot['counters'][counter]:9d}")
+        return lines
+
+    def to_prometheus(self, prefix: str = 'invoice_parser', labels: Dict[str, str] = None) -> str:
+        """Render the totals in the Prometheus text exposition format.
+
+        Args:
+            prefix: Metric name prefix
+            labels: Constant labels added to every sample, e.g. ``{'worker': '1234'}``
+                so each worker process exposes its own series
+
+        Returns:
+            Prometheus text exposition
+        """
+        snapshot = self.snapshot()
+        constant = ''.join(f',{key}="{_escape_label(value)}"' for key, value in sorted((labels or {}).items()))
+        lines = [
+            f"# HELP {prefix}_stage_seconds_total Time spent in each parsing stage.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        stages = self._ordered(snapshot['stage_seconds'], STAGES)
+        for stage in stages:
+            lines.append(f'{prefix}_stage_seconds_total{{stage="{stage}"{constant}}} '
+                         f'{snapshot["stage_seconds"][stage]:.6f}')
+        lines.append(f"# HELP {prefix}_stage_calls_total Number of times each parsing stage ran.")
+        lines.append(f"# TYPE {prefix}_stage_calls_total counter")
+        for stage in stages:
+            lines.append(f'{prefix}_stage_calls_total{{stage="{stage}"{constant}}} {snapshot["stage_calls"][stage]}')
+        counter_labels = f"{{{constant[1:]}}}" if constant else ''
+        for counter in self._ordered(set(COUNTERS) | set(snapshot['counters']), COUNTERS):
+            name = f"{prefix}_{counter}_total"
+            lines.append(f"# HELP {name} {COUNTER_HELP.get(counter, counter.replace('_', ' ').capitalize())}.")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{counter_labels} {snapshot['counters'].get(counter, 0)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
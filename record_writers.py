@@ -0,0 +1,356 @@
+"""
+Streaming writers for extracted invoice records.
+
+Records are written as they arrive instead of being collected into a list
+and a DataFrame first, so exports of any size run in constant memory. The
+Excel writer uses openpyxl's write-only mode, which streams rows to
+temporary files instead of building the workbook in memory. The Parquet
+writer converts records to typed columns a batch at a time (see
+typed_frame) and needs the optional pyarrow package. openpyxl, pandas and
+pyarrow are imported when a writer that needs them is created, so
+importing this module stays cheap. The writers pair with
+InvoiceParser.iter_parse:
+
+    with CsvRecordWriter('all_invoices.csv') as writer:
+        for pdf_path in pdf_paths:
+            writer.write_many(parser.iter_parse(pdf_path))
+"""
+
+import csv
+import re
+from typing import Dict, Iterable, Optional, Sequence, Union
+
+# Columns written as numbers in Excel exports, with their number formats
+NUMERIC_FIELDS = {'Qty': '0', 'Unit Price': '$#,##0.00', 'Amount': '$#,##0.00'}
+
+MONEY_RE = re.compile(r'^(-)?\s*\$?\s*(-)?\s*(\d[\d,]*(?:\.\d+)?|\.\d+)$')
+
+# Columns of typed (Parquet/Arrow) exports: name and Arrow type name
+TYPED_COLUMNS = (
+    ('billed_to', 'string'),
+    ('invoice_period_start', 'date32'),
+    ('invoice_period_end', 'date32'),
+    ('invoice_issue_date', 'date32'),
+    ('company_name', 'string'),
+    ('plan', 'string'),
+    ('qty', 'int64'),
+    ('unit_price_cents', 'int64'),
+    ('amount_cents', 'int64'),
+)
+
+# Rows converted and written per Parquet row group
+DEFAULT_PARQUET_BATCH_ROWS = 50000
+
+# Excel sheet titles: at most 31 characters, none of []:*?/\\
+SHEET_TITLE_INVALID_RE = re.compile(r'[\[\]:*?/\\]')
+MAX_SHEET_TITLE = 31
+
+
+def parse_number(text: str) -> Optional[Union[int, float]]:
+    """
+    Parse a quantity or amount such as '3', '$1,234.50' or '-$4.00'.
+
+    Returns:
+        Optional[Union[int, float]]: int for whole numbers without a decimal
+        point, float otherwise, None if the text is not a number
+    """
+    match = MONEY_RE.match(text.strip()) if text else None
+    if match is None:
+        return None
+    digits = match.group(3).replace(',', '')
+    sign = -1 if match.group(1) or match.group(2) else 1
+    return sign * (float(digits) if '.' in digits else int(digits))
+
+
+class CsvRecordWriter:
+    """
+    Write records to a CSV file one row at a time.
+
+    The columns are fieldnames if given, otherwise the keys of the first
+    record, matching the header save_to_csv produced with pandas. Keys that
+    are not columns are ignored and missing values are left empty.
+    """
+
+    def __init__(self, output_path: str, fieldnames: Optional[Sequence[str]] = None):
+        self.output_path = output_path
+        self.fieldnames = list(fieldnames) if fieldnames is not None else None
+        self.rows_written = 0
+        self._file = open(output_path, 'w', encoding='utf-8', newline='')
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _start(self, record: Dict) -> None:
+        if self.fieldnames is None:
+            self.fieldnames = list(record)
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore',
+                                      lineterminator='\n')
+        self._writer.writeheader()
+
+    def write(self, record: Dict) -> None:
+        """Write one record."""
+        if self._writer is None:
+            self._start(record)
+        self._writer.writerow(record)
+        self.rows_written += 1
+
+    def write_many(self, records: Iterable[Dict]) -> int:
+        """
+        Write records from any iterable, e.g. a generator from iter_parse.
+
+        Returns:
+            int: Number of records written by this call
+        """
+        count = 0
+        for record in records:
+            self.write(record)
+            count += 1
+        return count
+
+    def close(self) -> None:
+        """Flush and close the file; an empty export still gets its header if fieldnames were given."""
+        if self._file.closed:
+            return
+        if self._writer is None and self.fieldnames is not None:
+            csv.writer(self._file, lineterminator='\n').writerow(self.fieldnames)
+        self._file.close()
+
+
+class XlsxRecordWriter:
+    """
+    Write records to an Excel file one row at a time.
+
+    Qty, Unit Price and Amount are written as numbers with number formats
+    unless numeric is False; values that don't parse stay text. With
+    sheet_per_billed_to, each Billed To value gets a sheet of its own.
+    The workbook is saved by close().
+    """
+
+    def __init__(self, output_path: str, fieldnames: Optional[Sequence[str]] = None,
+                 sheet_per_billed_to: bool = False, numeric: bool = True, sheet_title: str = 'Sheet1'):
+        self.output_path = output_path
+        self.fieldnames = list(fieldnames) if fieldnames is not None else None
+        self.sheet_per_billed_to = sheet_per_billed_to
+        self.numeric = numeric
+        self.sheet_title = sheet_title
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        self.rows_written = 0
+        self._workbook = Workbook(write_only=True)
+        self._sheets = {}
+        self._titles = set()
+        self._cell_class = WriteOnlyCell
+        self._header_font = Font(bold=True)
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _unique_title(self, name: str) -> str:
+        title = SHEET_TITLE_INVALID_RE.sub(' ', name).strip()[:MAX_SHEET_TITLE] or 'No Billed To'
+        candidate, number = title, 2
+        while candidate.lower() in self._titles:
+            suffix = f" ({number})"
+            candidate = title[:MAX_SHEET_TITLE - len(suffix)] + suffix
+            number += 1
+        self._titles.add(candidate.lower())
+        return candidate
+
+    def _sheet(self, key: str):
+        sheet = self._sheets.get(key)
+        if sheet is None:
+            sheet = self._workbook.create_sheet(self._unique_title(key))
+            header = []
+            for name in self.fieldnames:
+                cell = self._cell_class(sheet, value=name)
+                cell.font = self._header_font
+                header.append(cell)
+            sheet.append(header)
+            self._sheets[key] = sheet
+        return sheet
+
+    def _cell(self, sheet, field: str, value):
+        if value is None:
+            return None
+        if self.numeric and field in NUMERIC_FIELDS and isinstance(value, str):
+            number = parse_number(value)
+            if number is not None:
+                cell = self._cell_class(sheet, value=number)
+                cell.number_format = NUMERIC_FIELDS[field]
+                return cell
+        return value
+
+    def write(self, record: Dict) -> None:
+        """Write one record."""
+        if self.fieldnames is None:
+            self.fieldnames = list(record)
+        key = (record.get('Billed To') or '') if self.sheet_per_billed_to else self.sheet_title
+        sheet = self._sheet(key)
+        sheet.append([self._cell(sheet, field, record.get(field)) for field in self.fieldnames])
+        self.rows_written += 1
+
+    def write_many(self, records: Iterable[Dict]) -> int:
+        """
+        Write records from any iterable, e.g. a generator from iter_parse.
+
+        Returns:
+            int: Number of records written by this call
+        """
+        count = 0
+        for record in records:
+            self.write(record)
+            count += 1
+        return count
+
+    def close(self) -> None:
+        """Save the workbook; an empty export gets one sheet with the header if fieldnames were given."""
+        if self._closed:
+            return
+        self._closed = True
+        if not self._sheets:
+            if self.fieldnames is not None:
+                self._sheet(self.sheet_title)
+            else:
+                self._workbook.create_sheet(self.sheet_title)
+        self._workbook.save(self.output_path)
+
+
+def _to_cents(values):
+    """Vectorized '$1,234.50' / '-$4.00' -> 123450 / -400 as nullable Int64."""
+    import pandas as pd
+
+    text = values.fillna('').astype(str).str.replace(r'[$,\s]', '', regex=True)
+    negative = text.str.startswith('-')
+    number = pd.to_numeric(text.str.lstrip('-'), errors='coerce')
+    cents = (number * 100).round()
+    return cents.where(~negative, -cents).astype('Int64')
+
+
+def _to_dates(values, date_format: str):
+    """Vectorized date parsing: date_format first, then any other format dateutil understands."""
+    import pandas as pd
+
+    text = values.fillna('').astype(str).str.strip()
+    dates = pd.to_datetime(text, format=date_format, errors='coerce')
+    retry = dates.isna() & (text != '')
+    if retry.any():
+        dates[retry] = pd.to_datetime(text[retry], format='mixed', errors='coerce')
+    # Kept as datetime64 (midnight); pyarrow casts it to date32 without a per-row Python pass
+    return dates.dt.normalize()
+
+
+def typed_frame(records: Sequence[Dict]):
+    """
+    Convert records to a DataFrame of typed columns (see TYPED_COLUMNS).
+
+    Every column is converted in one vectorized pass over the batch: amounts
+    become integer cents, quantities integers, the issue date and the two
+    ends of the invoice period dates. Values that don't parse become nulls.
+
+    Args:
+        records (Sequence[Dict]): Records in the InvoiceParser output shape
+
+    Returns:
+        pandas.DataFrame: One row per record, columns in TYPED_COLUMNS order
+    """
+    import pandas as pd
+
+    fields = ('Billed To', 'Invoice Period', 'Invoice Issue Date', 'Company Name', 'Plan', 'Qty',
+              'Unit Price', 'Amount')
+    raw = pd.DataFrame.from_records(list(records), columns=fields)
+    period = raw['Invoice Period'].fillna('').astype(str).str.extract(
+        r'(\d{1,2}/\d{1,2}/\d{4})\s*[-\u2013]\s*(\d{1,2}/\d{1,2}/\d{4})'
+    )
+    qty = pd.to_numeric(raw['Qty'].fillna('').astype(str).str.replace(',', ''), errors='coerce')
+    return pd.DataFrame({
+        'billed_to': raw['Billed To'],
+        'invoice_period_start': _to_dates(period[0], '%m/%d/%Y'),
+        'invoice_period_end': _to_dates(period[1], '%m/%d/%Y'),
+        'invoice_issue_date': _to_dates(raw['Invoice Issue Date'], '%b %d, %Y'),
+        'company_name': raw['Company Name'],
+        'plan': raw['Plan'],
+        'qty': qty.where(qty == qty.round()).astype('Int64'),
+        'unit_price_cents': _to_cents(raw['Unit Price']),
+        'amount_cents': _to_cents(raw['Amount']),
+    })
+
+
+class ParquetRecordWriter:
+    """
+    Write records as typed columns to a Parquet file, or an Arrow IPC file
+    when the path ends in .arrow or .feather.
+
+    Records are buffered and converted with typed_frame batch_rows at a time,
+    each batch becoming one Parquet row group, so memory is bounded by the
+    batch size. Needs pyarrow.
+    """
+
+    def __init__(self, output_path: str, batch_rows: int = DEFAULT_PARQUET_BATCH_ROWS):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("Parquet and Arrow output need pyarrow: pip install pyarrow")
+        self.output_path = output_path
+        self.batch_rows = max(1, batch_rows)
+        self.rows_written = 0
+        self.schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in TYPED_COLUMNS])
+        self.arrow_ipc = output_path.lower().endswith(('.arrow', '.feather'))
+        if self.arrow_ipc:
+            self._writer = pa.ipc.new_file(output_path, self.schema)
+        else:
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(output_path, self.schema)
+        self._batch = []
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _flush(self) -> None:
+        import pyarrow as pa
+
+        if not self._batch:
+            return
+        table = pa.Table.from_pandas(typed_frame(self._batch), schema=self.schema, preserve_index=False)
+        self._writer.write_table(table)
+        self._batch = []
+
+    def write(self, record: Dict) -> None:
+        """Write one record."""
+        self._batch.append(record)
+        self.rows_written += 1
+        if len(self._batch) >= self.batch_rows:
+            self._flush()
+
+    def write_many(self, records: Iterable[Dict]) -> int:
+        """
+        Write records from any iterable, e.g. a generator from iter_parse.
+
+        Returns:
+            int: Number of records written by this call
+        """
+        count = 0
+        for record in records:
+            self.write(record)
+            count += 1
+        return count
+
+    def close(self) -> None:
+        """Write the last batch and finish the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._flush()
+        self._writer.close()
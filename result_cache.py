@@ -0,0 +1,128 @@
+"""
+Parsed records of web uploads, with exports rendered on demand.
+
+The web app keeps the records of every finished upload here instead of
+writing a CSV and an Excel file up front. Each export is rendered the first
+time it is downloaded and the file is kept for later requests, so formats
+nobody asks for are never built and the upload response does not wait for
+openpyxl.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Entries older than this are deleted
+RESULT_RETENTION_SECONDS = 24 * 60 * 60
+
+KEY_RE = re.compile(r'^[0-9A-Za-z_-]+$')
+
+# Renderer signature: render(records, output_path) -> bool, like InvoiceParser.save_to_csv
+Renderer = Callable[[List[Dict], str], bool]
+
+
+class ResultCache:
+    """Directory of cache_dir/<key>/records.json plus the exports rendered from it."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._last_prune = 0.0
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_dir(self, key: str) -> Optional[str]:
+        if not KEY_RE.match(key or ''):
+            return None
+        return os.path.join(self.cache_dir, key)
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def put(self, key: str, records: List[Dict]) -> None:
+        """Store the records of an upload."""
+        self.prune()
+        entry_dir = self._entry_dir(key)
+        if entry_dir is None:
+            raise ValueError(f"Invalid result key: {key!r}")
+        os.makedirs(entry_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(entry_dir, 'records.json'))
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Load the records of an upload, or None if they are unknown or expired."""
+        entry_dir = self._entry_dir(key)
+        if entry_dir is None:
+            return None
+        try:
+            with open(os.path.join(entry_dir, 'records.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def export(self, key: str, filename: str, render: Renderer) -> Optional[str]:
+        """
+        Return the path of an export, rendering it from the records on first use.
+
+        Args:
+            key (str): Result key
+            filename (str): Export file name, e.g. invoice_20250101_120000.xlsx
+            render (Renderer): Writes records to a path and returns True on success
+
+        Returns:
+            Optional[str]: Path of the export, or None if the result is unknown or rendering failed
+        """
+        entry_dir = self._entry_dir(key)
+        if entry_dir is None or os.path.basename(filename) != filename:
+            return None
+        path = os.path.join(entry_dir, filename)
+        with self._lock(key):
+            if os.path.exists(path):
+                return path
+            records = self.get(key)
+            if records is None:
+                return None
+            # Render beside the target and swap it in, so another worker
+            # process never serves a half-written file. The extension is kept
+            # because pandas checks it even when the engine is given.
+            root, extension = os.path.splitext(path)
+            tmp_path = f"{root}.{os.getpid()}.tmp{extension}"
+            if not render(records, tmp_path):
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return None
+            os.replace(tmp_path, path)
+            logger.info(f"Rendered {filename} for result {key}")
+            return path
+
+    def delete(self, key: str) -> bool:
+        """Remove the records and exports of an upload."""
+        entry_dir = self._entry_dir(key)
+        if entry_dir is None or not os.path.isdir(entry_dir):
+            return False
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return True
+
+    def prune(self, max_age: float = RESULT_RETENTION_SECONDS) -> None:
+        """Delete entries older than max_age; runs at most once an hour per process."""
+        now = time.time()
+        if now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        for entry in os.scandir(self.cache_dir):
+            try:
+                if entry.is_dir() and now - entry.stat().st_mtime > max_age:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                pass
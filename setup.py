@@ -57,6 +57,9 @@ setup(
             "black>=21.0",
             "flake8>=3.8",
         ],
+        "parquet": [
+            "pyarrow>=14",
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -0,0 +1,193 @@
+"""
+Positional reconstruction of invoice tables from word boxes.
+
+Text extraction flattens a page into lines, so the parser has to guess
+where the Company, Plan, Qty, Unit Price and Amount cells of a row begin
+and end, and which lines are wrapped company names. The engines also know
+where each word sits: pdfplumber's extract_words, PyMuPDF's
+get_text('words') and tesseract's image_to_data. layout_text uses those
+boxes instead. It groups words into lines, finds the table header, and
+assigns every word below it to the column whose header it lines up with,
+in one pass. Lines holding only a company name are joined to the row
+that follows them.
+
+The result is the page text with each table row as one line of five
+tab-separated cells. InvoiceParser reads such rows without guessing, and
+the text can be stored and cached like any other page text:
+
+    text = layout_text(words_from_pdfplumber(page)) or page.extract_text()
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# (x0, top, x1, bottom, text) in page or image coordinates
+Word = Tuple[float, float, float, float, str]
+
+# Table columns in order; a table row is written as these cells joined by TABLE_CELL_SEPARATOR
+TABLE_COLUMNS = ('Company', 'Plan', 'Qty', 'Unit Price', 'Amount')
+TABLE_CELL_SEPARATOR = '\t'
+
+# Header labels (word sequences) accepted for each column, in column order
+HEADER_LABELS = (
+    (('company',),),
+    (('plan',),),
+    (('qty',), ('quantity',)),
+    (('unit', 'price'), ('price',)),
+    (('amount',),),
+)
+
+# Lines that end the table, unless they have a quantity
+SUMMARY_RE = re.compile(r'subtotal|total|amount due|hst|gst|summary|page', re.IGNORECASE)
+DIGIT_RE = re.compile(r'\d')
+HEADER_PUNCTUATION = ':.'
+
+
+def words_from_pdfplumber(page) -> List[Word]:
+    """Word boxes of a pdfplumber page."""
+    return [(word['x0'], word['top'], word['x1'], word['bottom'], word['text']) for word in page.extract_words()]
+
+
+def words_from_pymupdf(page) -> List[Word]:
+    """Word boxes of a PyMuPDF page."""
+    return [(x0, y0, x1, y1, text) for x0, y0, x1, y1, text, *_ in page.get_text('words')]
+
+
+def words_from_ocr_data(data: Dict[str, list]) -> List[Word]:
+    """Word boxes from pytesseract.image_to_data output (Output.DICT); empty and -1 confidence entries are skipped."""
+    words = []
+    for left, top, width, height, text, conf in zip(data['left'], data['top'], data['width'], data['height'],
+                                                    data['text'], data['conf']):
+        text = text.strip()
+        if text and float(conf) >= 0:
+            words.append((left, top, left + width, top + height, text))
+    return words
+
+
+def group_lines(words: Sequence[Word]) -> List[List[Word]]:
+    """
+    Group words into lines, top to bottom, each left to right.
+
+    A word joins the current line when its vertical midpoint falls within
+    the line's height so far.
+    """
+    lines = []
+    bottom = None
+    for word in sorted(words, key=lambda word: (word[1], word[0])):
+        if lines and (word[1] + word[3]) / 2 <= bottom:
+            lines[-1].append(word)
+            bottom = max(bottom, word[3])
+        else:
+            lines.append([word])
+            bottom = word[3]
+    for line in lines:
+        line.sort(key=lambda word: word[0])
+    return lines
+
+
+def _header_spans(line: List[Word]) -> Optional[List[Tuple[float, float]]]:
+    """(x0, x1) of each column's header in a line, or None if the line is not the table header."""
+    texts = [word[4].lower().strip(HEADER_PUNCTUATION) for word in line]
+    spans = []
+    index = 0
+    for labels in HEADER_LABELS:
+        while index < len(texts):
+            label = next((label for label in labels if tuple(texts[index:index + len(label)]) == label), None)
+            if label is not None:
+                spans.append((line[index][0], line[index + len(label) - 1][2]))
+                index += len(label)
+                break
+            index += 1
+        else:
+            return None
+    return spans
+
+
+def _column_of(word: Word, spans: List[Tuple[float, float]]) -> int:
+    """
+    Column of a word: the one whose header it overlaps most, or else the
+    rightmost column whose header starts left of the word.
+    """
+    x0, x1 = word[0], word[2]
+    best, best_overlap = None, 0.0
+    for column, (start, end) in enumerate(spans):
+        overlap = min(x1, end) - max(x0, start)
+        if overlap > best_overlap:
+            best, best_overlap = column, overlap
+    if best is not None:
+        return best
+    column = 0
+    for index, (start, _) in enumerate(spans):
+        if start <= x0:
+            column = index
+    return column
+
+
+def _valid_row(cells: List[str]) -> bool:
+    """Quantity and amount cells must be single words with a digit, if present."""
+    return all(not cell or (' ' not in cell and DIGIT_RE.search(cell)) for cell in cells[2:])
+
+
+def layout_text(words: Sequence[Word]) -> Optional[str]:
+    """
+    Rebuild a page's text from word boxes, with its table as tab-separated rows.
+
+    Lines outside the table are their words joined by spaces. The header
+    becomes TABLE_COLUMNS joined by TABLE_CELL_SEPARATOR and every table row
+    its five cells; a discount line under a row has an empty company cell.
+    The table ends at a summary line (Subtotal, Total, ...) without a
+    quantity.
+
+    Args:
+        words (Sequence[Word]): Word boxes of one page, in any order
+
+    Returns:
+        Optional[str]: The page text, or None if the page has no table header,
+        no rows, or a row whose quantity or amounts don't line up with their
+        columns, in which case the engine's own text should be used
+    """
+    lines = group_lines(words)
+    output = []
+    spans = None
+    in_table = False
+    rows = 0
+    fragments = []
+    for line in lines:
+        text = ' '.join(word[4] for word in line)
+        if spans is None:
+            spans = _header_spans(line)
+            if spans is not None:
+                in_table = True
+                output.append(TABLE_CELL_SEPARATOR.join(TABLE_COLUMNS))
+            else:
+                output.append(text)
+            continue
+        if not in_table:
+            output.append(text)
+            continue
+
+        cells = [[] for _ in TABLE_COLUMNS]
+        for word in line:
+            cells[_column_of(word, spans)].append(word[4])
+        cells = [' '.join(cell) for cell in cells]
+        if not cells[2] and SUMMARY_RE.search(text):
+            in_table = False
+            output.append(text)
+            continue
+        if not any(cells[1:]):
+            # A wrapped company name, completed by the next row
+            fragments.append(cells[0])
+            continue
+        if not _valid_row(cells):
+            return None
+        if fragments:
+            cells[0] = ' '.join(fragments + [cells[0]]).strip()
+            fragments = []
+        output.append(TABLE_CELL_SEPARATOR.join(cells))
+        rows += 1
+
+    if not rows:
+        return None
+    # Company-only lines after the last row, e.g. notes under a table without a summary
+    output.extend(fragments)
+    return '\n'.join(output)
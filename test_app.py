@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test suite for the Flask web application.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import app as webapp
+from job_queue import JobQueue, JobStore, DONE, FAILED
+from result_cache import ResultCache
+from test_main import INVOICE_LINES, write_invoice_pdf
+
+
+class TestMetricsRoute(unittest.TestCase):
+    """Test cases for the /metrics route."""
+
+    def setUp(self):
+        self.client = webapp.app.test_client()
+
+    def test_metrics_is_prometheus_text(self):
+        """Test that /metrics serves the parser metrics as Prometheus text."""
+        webapp.parse_metrics.observe('pdfplumber', 0.1)
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.get_data(as_text=True)
+        self.assertIn('invoice_parser_stage_seconds_total{stage="pdfplumber",', body)
+        self.assertIn('invoice_parser_documents_total', body)
+
+    def test_metrics_samples_carry_worker_pid(self):
+        """Test that every /metrics sample is labelled with the serving worker's pid."""
+        webapp.parse_metrics.observe('pdfplumber', 0.1)
+
+        body = self.client.get('/metrics').get_data(as_text=True)
+
+        worker = f'worker="{os.getpid()}"'
+        samples = [line for line in body.splitlines() if line and not line.startswith('#')]
+        self.assertTrue(samples)
+        for sample in samples:
+            self.assertIn(worker, sample)
+        self.assertIn(f'invoice_parser_stage_seconds_total{{stage="pdfplumber",{worker}}}', body)
+        self.assertIn(f'invoice_parser_documents_total{{{worker}}}', body)
+
+
+class TestUploadJobs(unittest.TestCase):
+    """Test cases for background parsing of uploads."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = os.path.join(self.temp_dir.name, 'outputs')
+        os.makedirs(self.output_dir)
+        self.queue = JobQueue(JobStore(os.path.join(self.temp_dir.name, 'jobs')), max_workers=1)
+        for name, value in [('OUTPUT_FOLDER', self.output_dir), ('result_cache', ResultCache(self.output_dir)),
+                            ('job_queue', self.queue),
+                            ('shared_parser', webapp.InvoiceParser(metrics=webapp.parse_metrics))]:
+            patcher = patch.object(webapp, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = webapp.app.test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _upload(self, lines=INVOICE_LINES, **kwargs):
+        pdf_path = os.path.join(self.temp_dir.name, 'invoice.pdf')
+        write_invoice_pdf(pdf_path, lines)
+        with open(pdf_path, 'rb') as f:
+            data = {'file': (io.BytesIO(f.read()), 'invoice.pdf')}
+        return self.client.post('/upload', data=data, content_type='multipart/form-data', **kwargs)
+
+    def test_upload_returns_job_and_renders_results(self):
+        """Test that an upload redirects to its job page, which shows the results once parsed."""
+        response = self._upload()
+
+        self.assertEqual(response.status_code, 302)
+        job_id = response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+        job = self.queue.wait(job_id, timeout=60)
+        self.assertEqual(job['status'], DONE)
+        self.assertEqual(job['result']['records_extracted'], 2)
+
+        page = self.client.get(f'/jobs/{job_id}')
+        self.assertEqual(page.status_code, 200)
+        self.assertIn('Extraction Complete!', page.get_data(as_text=True))
+
+        status = self.client.get(f'/jobs/{job_id}/status').get_json()
+        self.assertEqual(status['status'], DONE)
+        self.assertEqual(status['result']['records_extracted'], 2)
+        self.assertIn(status['result']['csv_url'], page.get_data(as_text=True))
+
+    def test_exports_are_rendered_on_first_download(self):
+        """Test that no export is written at upload time and each format is rendered once."""
+        response = self._upload()
+        job_id = response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+        result = self.queue.wait(job_id, timeout=60)['result']
+        result_dir = os.path.join(self.output_dir, result['result_id'])
+        self.assertEqual(os.listdir(result_dir), ['records.json'])
+
+        with patch.object(webapp.InvoiceParser, 'save_to_excel', autospec=True,
+                          side_effect=webapp.InvoiceParser.save_to_excel) as mock_excel:
+            first = self.client.get(f"/download/{result['result_id']}/{result['excel_filename']}")
+            second = self.client.get(f"/download/{result['result_id']}/{result['excel_filename']}")
+            first.close()
+            second.close()
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(mock_excel.call_count, 1)
+        self.assertIn(result['excel_filename'], first.headers['Content-Disposition'])
+        self.assertEqual(sorted(os.listdir(result_dir)), sorted(['records.json', result['excel_filename']]))
+
+        csv_response = self.client.get(f"/download/{result['result_id']}/{result['csv_filename']}")
+        self.assertEqual(csv_response.status_code, 200)
+        self.assertIn('Widget Co', csv_response.get_data(as_text=True))
+        csv_response.close()
+
+        self.client.get(f"/results/{result['result_id']}/cleanup")
+        self.assertFalse(os.path.exists(result_dir))
+        missing = self.client.get(f"/download/{result['result_id']}/{result['csv_filename']}")
+        self.assertEqual(missing.status_code, 302)
+
+    def test_legacy_output_routes_are_gone(self):
+        """Test that files in the output folder can't be fetched or deleted by bare filename."""
+        stray_path = os.path.join(self.output_dir, 'invoice_data.csv')
+        with open(stray_path, 'w') as f:
+            f.write('Vendor\n')
+
+        self.assertEqual(self.client.get('/download/invoice_data.csv').status_code, 404)
+        self.assertEqual(self.client.get('/cleanup/invoice_data.csv').status_code, 404)
+        self.assertTrue(os.path.exists(stray_path))
+
+    def test_ajax_upload_returns_job_urls(self):
+        """Test that uploads accepting JSON get the job's status and result URLs."""
+        response = self._upload(headers={'Accept': 'application/json'})
+
+        self.assertEqual(response.status_code, 202)
+        body = response.get_json()
+        self.assertEqual(body['result_url'], f"/jobs/{body['job_id']}")
+        self.assertEqual(body['status_url'], f"/jobs/{body['job_id']}/status")
+        self.queue.wait(body['job_id'], timeout=60)
+
+    def test_pending_job_renders_processing_page(self):
+        """Test that a job still in the queue renders the polling page."""
+        job_id = self.queue.store.create(filename='invoice.pdf')
+
+        page = self.client.get(f'/jobs/{job_id}')
+
+        self.assertEqual(page.status_code, 200)
+        self.assertIn('Processing invoice.pdf', page.get_data(as_text=True))
+        self.assertEqual(self.client.get(f'/jobs/{job_id}/status').get_json()['status'], 'queued')
+
+    def test_failed_job_reports_error(self):
+        """Test that a PDF without invoice data marks its job as failed."""
+        response = self._upload(lines=['Nothing to see here'])
+        job_id = response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+
+        job = self.queue.wait(job_id, timeout=60)
+
+        self.assertEqual(job['status'], FAILED)
+        self.assertIn('No data could be extracted', job['error'])
+        page = self.client.get(f'/jobs/{job_id}')
+        self.assertEqual(page.status_code, 302)
+
+    def test_unknown_job(self):
+        """Test that unknown or malformed job IDs are not found."""
+        self.assertEqual(self.client.get('/jobs/0123456789abcdef0123456789abcdef/status').status_code, 404)
+        self.assertEqual(self.client.get('/jobs/..%2Fapp/status').status_code, 404)
+
+    def test_orphaned_job_is_failed(self):
+        """Test that a running job whose worker process exited is reported as failed."""
+        job_id = self.queue.store.create()
+        self.queue.store.update(job_id, status='running', pid=2 ** 22 + 1)
+
+        self.assertEqual(self.queue.store.get(job_id)['status'], FAILED)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test suite for the synthetic corpus generator used by the benchmarks.
+"""
+
+import unittest
+import tempfile
+import os
+import contextlib
+import io
+import random
+
+import fitz
+import pandas as pd
+
+from benchmarks.bench_excel_export import pandas_export, streaming_export
+from benchmarks.bench_ocr_backends import read_all
+from benchmarks.bench_ocr_preprocess import current_preprocess, legacy_preprocess
+from benchmarks.bench_ocr_regions import region_volume
+from benchmarks.bench_page_classes import build_packet, page_routes
+from benchmarks.bench_extract_fields import build_page
+from benchmarks.bench_record_memory import legacy_parse
+from benchmarks.bench_table_layout import page_texts, same_items
+from benchmarks.generate_corpus import build_invoice_pdf, generate_corpus
+from invoice_parser import InvoiceParser
+from table_layout import layout_text
+
+
+class TestGenerateCorpus(unittest.TestCase):
+    """Test cases for benchmarks/generate_corpus.py."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_generated_invoice_parses_completely(self):
+        """Test that every generated line item is extracted, wrapped names included."""
+        path = os.path.join(self.temp_dir.name, 'invoice.pdf')
+        expected = build_invoice_pdf(path, pages=3, rows_per_page=25, wrap_ratio=0.3, seed=7)
+
+        records = InvoiceParser().parse_pdf(path)
+
+        self.assertEqual(len(records), expected)
+        self.assertTrue(all(r['Billed To'] == 'Acme Holdings' for r in records))
+        self.assertTrue(any(len(r['Company Name'].split()) >= 3 for r in records))
+
+    def test_scanned_variant_has_no_text_layer(self):
+        """Test that scanned invoices are image-only."""
+        path = os.path.join(self.temp_dir.name, 'scanned.pdf')
+        build_invoice_pdf(path, pages=2, rows_per_page=5, scanned=True, dpi=72)
+
+        with fitz.open(path) as doc:
+            self.assertEqual(len(doc), 2)
+            self.assertTrue(all(not page.get_text().strip() for page in doc))
+            self.assertTrue(all(page.get_images() for page in doc))
+
+    def test_corpus_is_reproducible(self):
+        """Test that the same seed gives the same invoices."""
+        first = generate_corpus(os.path.join(self.temp_dir.name, 'a'), 2, rows_per_page=5, seed=3)
+        second = generate_corpus(os.path.join(self.temp_dir.name, 'b'), 2, rows_per_page=5, seed=3)
+
+        for path_a, path_b in zip(first, second):
+            with fitz.open(path_a) as doc_a, fitz.open(path_b) as doc_b:
+                self.assertEqual(doc_a[0].get_text(), doc_b[0].get_text())
+
+
+class TestExcelExportBenchmark(unittest.TestCase):
+    """Test cases for benchmarks/bench_excel_export.py."""
+
+    def test_both_exports_write_the_same_rows(self):
+        """Test that the pandas and streaming exports hold the same data."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pandas_path = os.path.join(temp_dir, 'pandas.xlsx')
+            streaming_path = os.path.join(temp_dir, 'streaming.xlsx')
+            pandas_export(50, pandas_path)
+            streaming_export(50, streaming_path)
+
+            expected = pd.read_excel(pandas_path)
+            actual = pd.read_excel(streaming_path)
+
+        self.assertEqual(len(actual), 50)
+        self.assertEqual(list(actual.columns), list(expected.columns))
+        self.assertEqual(actual['Company Name'].tolist(), expected['Company Name'].tolist())
+        self.assertEqual(actual['Qty'].tolist(), expected['Qty'].astype(int).tolist())
+
+
+class TestRecordMemoryBenchmark(unittest.TestCase):
+    """Test cases for benchmarks/bench_record_memory.py."""
+
+    def test_compact_pipeline_matches_legacy(self):
+        """Test that the compact pipeline returns the legacy records."""
+        rng = random.Random(5)
+        pages = [build_page(rng, page_num, 10) for page_num in range(5)]
+        parser = InvoiceParser()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            records = parser.parse_page_texts([(n, 'pdfplumber', text) for n, text in enumerate(pages)])
+
+        self.assertEqual(records, legacy_parse(parser, pages))
+
+
+class TestOcrPreprocessBenchmark(unittest.TestCase):
+    """Test cases for benchmarks/bench_ocr_preprocess.py."""
+
+    def test_current_path_matches_legacy(self):
+        """Test that the grayscale path binarizes a scanned page like the PNG round trip did."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'scanned.pdf')
+            build_invoice_pdf(path, pages=1, rows_per_page=5, scanned=True, dpi=72)
+            with fitz.open(path) as doc:
+                legacy = legacy_preprocess(doc[0])
+                current = current_preprocess(InvoiceParser(), doc[0])
+
+        self.assertEqual(current.shape, legacy.shape)
+        self.assertGreater((current == legacy).mean(), 0.99)
+
+
+
+class TestOcrRegionsBenchmark(unittest.TestCase):
+    """Test cases for benchmarks/bench_ocr_regions.py."""
+
+    def test_crops_keep_text_in_fewer_pixels(self):
+        """Test that text crops of a scanned page keep its ink in fewer pixels."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'scanned.pdf')
+            build_invoice_pdf(path, pages=1, rows_per_page=5, scanned=True)
+            with fitz.open(path) as doc:
+                volume = region_volume([current_preprocess(InvoiceParser(), doc[0])])
+
+        self.assertLess(volume['crop_pixels'] * 2, volume['full_pixels'])
+        self.assertEqual(volume['ink_kept'], 1.0)
+
+
+
+class TestOcrBackendsBenchmark(unittest.TestCase):
+    """Test cases for benchmarks/bench_ocr_backends.py."""
+
+    def test_read_all_batches_images(self):
+        """Test that images are passed to the backend batch at a time, texts in order."""
+        calls = []
+
+        class Backend:
+            def image_to_string(self, images, config):
+                calls.append(len(images))
+                return [f"page {image}" for image in images]
+
+        texts = read_all(Backend(), list(range(5)), 2)
+
+        self.assertEqual(texts, [f"page {n}" for n in range(5)])
+        self.assertEqual(calls, [2, 2, 1])
+
+
+class TestPageClassesBenchmark(unittest.TestCase):
+    """Test cases for benchmarks/bench_page_classes.py."""
+
+    def test_packet_routes(self):
+        """Test that only the invoice pages of a packet reach pdfplumber, and no blank page reaches OCR."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'packet.pdf')
+            build_packet(path, pages=2, extra=1)
+            routes = page_routes(path)
+
+        # The remittance slip's 'Amount enclosed' is a loose table header, so it is read like one
+        self.assertEqual((routes['line_items'], routes['header'], routes['ocr'], routes['skip']), (3, 1, 0, 3))
+        self.assertEqual(routes['no_text_layer'], 2)
+
+
+class TestTableLayoutBenchmark(unittest.TestCase):
+    """Test cases for benchmarks/bench_table_layout.py."""
+
+    def test_positional_text_yields_the_same_items(self):
+        """Test that rows rebuilt from word boxes match the flattened text's rows on the corpus."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'invoice.pdf')
+            build_invoice_pdf(path, pages=2, rows_per_page=20, wrap_ratio=0.3, discount_ratio=0.2)
+            flat, words = page_texts(path)
+        positional = [layout_text(page_words) for page_words in words]
+
+        self.assertTrue(all('\t' in text for text in positional))
+        self.assertTrue(same_items(InvoiceParser(), flat, positional))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
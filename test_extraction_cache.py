@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test suite for the on-disk extraction result cache.
+"""
+
+import unittest
+import tempfile
+import os
+import hashlib
+import pickle
+import time
+import zlib
+from unittest.mock import patch
+
+from extraction_cache import ExtractionCache, RESCAN_EVERY_PUTS
+
+RECORDS = [
+    {
+        'Billed To': 'Acme Holdings',
+        'Invoice Period': '04/01/2025-04/30/2025',
+        'Invoice Issue Date': 'APR 30, 2025',
+        'Company Name': 'Widget Co',
+        'Plan': 'Base Plan',
+        'Qty': '1',
+        'Unit Price': '$20.00',
+        'Amount': '$20.00'
+    }
+]
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Test cases for ExtractionCache."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ExtractionCache(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key_depends_on_content_and_version(self):
+        """Test that keys change with the PDF bytes and the parser version."""
+        doc_a = hashlib.sha256(b'%PDF-a').hexdigest()
+        doc_b = hashlib.sha256(b'%PDF-b').hexdigest()
+        key = ExtractionCache.make_key(doc_a, '1.0')
+        self.assertEqual(key, ExtractionCache.make_key(doc_a, '1.0'))
+        self.assertNotEqual(key, ExtractionCache.make_key(doc_b, '1.0'))
+        self.assertNotEqual(key, ExtractionCache.make_key(doc_a, '1.1'))
+
+    def test_put_and_get(self):
+        """Test a round trip through the cache."""
+        key = ExtractionCache.make_key('a' * 64, '1.0')
+        self.assertIsNone(self.cache.get(key))
+
+        self.cache.put(key, RECORDS)
+
+        self.assertEqual(self.cache.get(key), RECORDS)
+
+    def test_corrupt_entry_is_a_miss(self):
+        """Test that an unreadable entry does not raise."""
+        key = ExtractionCache.make_key('a' * 64, '1.0')
+        self.cache.put(key, RECORDS)
+        with open(self.cache._path(key), 'w') as f:
+            f.write('{not json')
+
+        self.assertIsNone(self.cache.get(key))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entries are evicted first."""
+        keys = [ExtractionCache.make_key(str(i) * 64, '1.0') for i in range(3)]
+        self.cache.put(keys[0], RECORDS)
+        entry_size = os.path.getsize(self.cache._path(keys[0]))
+        cache = ExtractionCache(self.temp_dir.name, max_bytes=entry_size * 2)
+
+        old = time.time() - 100
+        os.utime(cache._path(keys[0]), (old, old))
+        cache.put(keys[1], RECORDS)
+        os.utime(cache._path(keys[1]), (old + 10, old + 10))
+        # Reading keys[0] makes keys[1] the least recently used entry
+        self.assertIsNotNone(cache.get(keys[0]))
+        cache.put(keys[2], RECORDS)
+
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[2]))
+
+    def test_clear(self):
+        """Test that clear removes every entry."""
+        key = ExtractionCache.make_key('a' * 64, '1.0')
+        self.cache.put(key, RECORDS)
+
+        self.cache.clear()
+
+        self.assertIsNone(self.cache.get(key))
+
+    def test_picklable(self):
+        """Test that the cache can be handed to worker processes."""
+        clone = pickle.loads(pickle.dumps(self.cache))
+        key = ExtractionCache.make_key('a' * 64, '1.0')
+        clone.put(key, RECORDS)
+
+        self.assertEqual(self.cache.get(key), RECORDS)
+
+    def test_pickled_copies_keep_the_size(self):
+        """Test that worker copies start from the known size instead of rescanning the directory."""
+        keys = [key for key in (ExtractionCache.make_key(str(i) * 64, '1.0') for i in range(10))
+                if zlib.crc32(key.encode('utf-8')) % RESCAN_EVERY_PUTS != 0]
+        self.cache.put(keys[0], RECORDS)
+        size = self.cache._size
+
+        clone = pickle.loads(pickle.dumps(self.cache))
+        with patch.object(ExtractionCache, '_entries', side_effect=AssertionError('rescanned')):
+            clone.put(keys[1], RECORDS)
+
+        self.assertEqual(clone._size, size * 2)
+
+    def test_rescans_when_over_budget(self):
+        """Test that a copy going over budget rescans and evicts what other copies wrote."""
+        keys = [ExtractionCache.make_key(str(i) * 64, '1.0') for i in range(4)]
+        self.cache.put(keys[0], RECORDS)
+        entry_size = self.cache._size
+        cache = ExtractionCache(self.temp_dir.name, max_bytes=entry_size * 2)
+        first, second = pickle.loads(pickle.dumps(cache)), pickle.loads(pickle.dumps(cache))
+
+        first.put(keys[1], RECORDS)
+        second.put(keys[2], RECORDS)
+        second.put(keys[3], RECORDS)
+
+        self.assertEqual(second._size, entry_size * 2)
+        self.assertEqual(sum(cache.get(key) is not None for key in keys), 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
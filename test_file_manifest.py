@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test suite for the manifest of processed files.
+"""
+
+import unittest
+import tempfile
+import os
+import hashlib
+import pickle
+
+from file_manifest import FileManifest, STATUS_DONE, STATUS_FAILED, file_sha256
+
+
+class TestFileManifest(unittest.TestCase):
+    """Test cases for FileManifest and file_sha256."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'manifest.db')
+        self.manifest = FileManifest(self.db_path)
+
+    def tearDown(self):
+        self.manifest.close()
+        self.temp_dir.cleanup()
+
+    def test_file_sha256(self):
+        """Test that files are hashed like the parser hashes PDF bytes."""
+        path = os.path.join(self.temp_dir.name, 'a.pdf')
+        with open(path, 'wb') as f:
+            f.write(b'%PDF-1.7' * 300000)
+
+        self.assertEqual(file_sha256(path), hashlib.sha256(b'%PDF-1.7' * 300000).hexdigest())
+
+    def test_record_and_look_up(self):
+        """Test lookups by content hash and by unchanged path, size and modification time."""
+        self.manifest.record('a' * 64, 'in/a.pdf', 100, 5, STATUS_DONE)
+        self.manifest.record('b' * 64, 'in/b.pdf', 200, 6, STATUS_FAILED)
+
+        self.assertEqual(self.manifest.status('a' * 64), STATUS_DONE)
+        self.assertEqual(self.manifest.status('b' * 64), STATUS_FAILED)
+        self.assertIsNone(self.manifest.status('c' * 64))
+        self.assertTrue(self.manifest.has_unchanged('in/a.pdf', 100, 5))
+        self.assertFalse(self.manifest.has_unchanged('in/a.pdf', 100, 7))
+
+    def test_record_replaces_same_path(self):
+        """Test that re-recording a path keeps one entry with the latest outcome and attempt count."""
+        self.manifest.record('a' * 64, 'in/a.pdf', 100, 5, STATUS_FAILED, error='No data extracted')
+        self.manifest.record('b' * 64, 'in/a.pdf', 120, 9, STATUS_DONE, records=7, duration=1.5, attempts=2)
+
+        self.assertIsNone(self.manifest.status('a' * 64))
+        self.assertFalse(self.manifest.has_unchanged('in/a.pdf', 100, 5))
+        path = os.path.abspath('in/a.pdf')
+        self.assertEqual(self.manifest.entries(), {path: {
+            'file_hash': 'b' * 64, 'size': 120, 'mtime_ns': 9, 'status': STATUS_DONE, 'records': 7,
+            'duration': 1.5, 'error': None, 'attempts': 2,
+            'processed_at': self.manifest.entries()[path]['processed_at']}})
+
+    def test_paths_are_normalized(self):
+        """Test that relative spellings of the same file share one entry."""
+        self.manifest.record('a' * 64, './in/a.pdf', 100, 5, STATUS_FAILED)
+        self.manifest.record('a' * 64, 'in/../in/a.pdf', 100, 5, STATUS_DONE)
+
+        self.assertEqual(list(self.manifest.entries()), [os.path.abspath('in/a.pdf')])
+        self.assertTrue(self.manifest.has_unchanged('in/a.pdf', 100, 5))
+        self.assertEqual(self.manifest.summarize(['in/a.pdf'])['successful'], 1)
+
+    def test_summarize(self):
+        """Test that a run summary counts outcomes of the given files only, missing ones as failed."""
+        self.manifest.record('a' * 64, 'in/a.pdf', 100, 5, STATUS_DONE, records=3, duration=0.5)
+        self.manifest.record('b' * 64, 'in/b.pdf', 100, 5, STATUS_FAILED, duration=0.25, error='boom')
+        self.manifest.record('c' * 64, 'other/c.pdf', 100, 5, STATUS_DONE, records=9)
+
+        summary = self.manifest.summarize(['in/a.pdf', 'in/b.pdf', 'in/new.pdf'])
+
+        self.assertEqual(summary, {'successful': 1, 'failed': 2, 'failed_files': ['in/b.pdf', 'in/new.pdf'],
+                                   'records': 3, 'seconds': 0.75})
+
+    def test_persists_and_pickles(self):
+        """Test that entries survive reopening and a pickled manifest opens its own connection."""
+        self.manifest.record('a' * 64, 'in/a.pdf', 100, 5, STATUS_DONE)
+
+        copy = pickle.loads(pickle.dumps(self.manifest))
+        reopened = FileManifest(self.db_path)
+        try:
+            self.assertEqual(copy.status('a' * 64), STATUS_DONE)
+            self.assertEqual(reopened.status('a' * 64), STATUS_DONE)
+        finally:
+            copy.close()
+            reopened.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
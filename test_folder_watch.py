@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test suite for new and changed file detection in folder_watch.py.
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+import time
+
+from folder_watch import FolderWatcher
+
+SETTLE_SECONDS = 0.2
+
+
+def poll_for(watcher, seconds):
+    """Poll watcher for about seconds, returning every path it reported."""
+    reported = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        reported += watcher.poll(0.02)
+    return reported
+
+
+class TestFolderWatcher(unittest.TestCase):
+    """Test cases for FolderWatcher, with inotify and with polling."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _write(self, name, data=b'%PDF-1.7 test'):
+        with open(self._path(name), 'wb') as f:
+            f.write(data)
+
+    def _modes(self):
+        modes = [False]
+        if sys.platform.startswith('linux'):
+            modes.append(True)
+        return modes
+
+    def test_existing_and_new_files(self):
+        """Test that existing PDFs and new ones are reported once each, other files never."""
+        for use_inotify in self._modes():
+            with self.subTest(use_inotify=use_inotify), tempfile.TemporaryDirectory() as directory:
+                self.directory = directory
+                self._write('old.pdf')
+                self._write('notes.txt')
+                with FolderWatcher(directory, SETTLE_SECONDS, use_inotify) as watcher:
+                    self.assertEqual(watcher.uses_inotify, use_inotify)
+                    self.assertEqual(poll_for(watcher, SETTLE_SECONDS * 2), [self._path('old.pdf')])
+                    self._write('new.PDF')
+                    self._write('.partial.pdf')
+                    self.assertEqual(poll_for(watcher, SETTLE_SECONDS * 2), [self._path('new.PDF')])
+                    self.assertEqual(poll_for(watcher, 0.05), [])
+
+    def test_waits_until_written_and_reports_changes(self):
+        """Test that a growing file is held back until it settles, and reported again after a change."""
+        for use_inotify in self._modes():
+            with self.subTest(use_inotify=use_inotify), tempfile.TemporaryDirectory() as directory:
+                self.directory = directory
+                with FolderWatcher(directory, SETTLE_SECONDS, use_inotify) as watcher:
+                    with open(self._path('upload.pdf'), 'wb') as f:
+                        f.write(b'%PDF-1.7 first half')
+                        f.flush()
+                        self.assertEqual(poll_for(watcher, SETTLE_SECONDS / 2), [])
+                        f.write(b' second half')
+                        f.flush()
+                        self.assertEqual(poll_for(watcher, SETTLE_SECONDS / 2), [])
+                    self.assertEqual(poll_for(watcher, SETTLE_SECONDS * 2), [self._path('upload.pdf')])
+
+                    self._write('upload.pdf', b'%PDF-1.7 replaced with a new version')
+                    self.assertEqual(poll_for(watcher, SETTLE_SECONDS * 2), [self._path('upload.pdf')])
+
+    def test_polling_fallback(self):
+        """Test that use_inotify=False polls the directory."""
+        with FolderWatcher(self.directory, 0, use_inotify=False) as watcher:
+            self.assertFalse(watcher.uses_inotify)
+            self._write('a.pdf')
+            self.assertEqual(watcher.poll(0.01), [self._path('a.pdf')])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -5,10 +5,80 @@ Tests the InvoiceParser class functionality and field extraction.
 """
 
 import unittest
+import io
+import re
 import tempfile
 import os
+import subprocess
+import sys
+import threading
+import time
 from unittest.mock import patch, MagicMock
-from invoice_parser import InvoiceParser
+import fitz
+import pdfplumber
+import invoice_parser
+from invoice_parser import InvoiceParser, DEFAULT_PLAN_NAMES, COMMON_TESSERACT_PATHS
+from invoice_records import to_records
+from extraction_cache import ExtractionCache
+from page_text_store import PageTextStore
+
+INVOICE_LINES = [
+    "INVOICE",
+    "Billed to",
+    "Acme Holdings, 1 Main St",
+    "Invoice Period: 04/01/2025-04/30/2025",
+    "Issue date: APR 30, 2025",
+    "Company Plan Qty Unit Price Amount",
+    "Widget Co Base Plan 1 $20.00 $20.00",
+    "Gadget Works Ultimate Plan 2 $50.00 $100.00",
+    "Subtotal $120.00",
+]
+
+OCR_PAGE_TEXT = """Company Plan Qty Unit Price Amount
+Scanned Corp Premium Plan 3 $10.00 $30.00
+Subtotal $30.00
+"""
+
+
+def ocr_data(text, conf, block=1):
+    """
+    Build pytesseract.image_to_data output (Output.DICT) for lines of text, all words at conf.
+    
+    Words are boxed as if set in a 10 px wide monospace font on 20 px lines.
+    """
+    data = {'block_num': [block], 'par_num': [0], 'line_num': [0], 'text': [''], 'conf': [-1],
+            'left': [0], 'top': [0], 'width': [0], 'height': [0]}
+    for line_num, line in enumerate(text.splitlines(), 1):
+        for match in re.finditer(r'\S+', line):
+            word = match.group()
+            for key, value in [('block_num', block), ('par_num', 1), ('line_num', line_num),
+                               ('text', word), ('conf', conf), ('left', match.start() * 10),
+                               ('top', line_num * 20), ('width', len(word) * 10), ('height', 12)]:
+                data[key].append(value)
+    return data
+
+
+def write_pdf(path, pages):
+    """Write a PDF with one page per list of lines; an empty list gives a page with no text layer."""
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page()
+        y = 72
+        for line in lines:
+            page.insert_text((72, y), line, fontsize=10)
+            y += 14
+    doc.save(path)
+    doc.close()
+
+
+def add_scanned_page(doc, rect=None):
+    """Append a page holding only an image, covering rect (default: the whole page)."""
+    page = doc.new_page()
+    pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 50, 50), 0)
+    pix.clear_with(255)
+    page.insert_image(rect or page.rect, pixmap=pix, keep_proportion=False)
+    return page
+
 
 class TestInvoiceParser(unittest.TestCase):
     """Test cases for the InvoiceParser class."""
@@ -224,10 +294,15 @@ class TestInvoiceParser(unittest.TestCase):
         mock_pdf = MagicMock()
         mock_page = MagicMock()
         mock_page.extract_text.return_value = self.sample_invoice_text
+        mock_page.extract_words.return_value = []
         mock_pdf.pages = [mock_page]
-        mock_pdfplumber.return_value.__enter__.return_value = mock_pdf
+        mock_pdfplumber.return_value = mock_pdf
+        doc = fitz.open()
+        doc.new_page()
+        pdf_bytes = doc.tobytes()
+        doc.close()
         
-        result = self.parser._parse_with_pdfplumber("test.pdf")
+        result = self.parser.parse_pdf(pdf_bytes)
         
         self.assertEqual(len(result), 3)  # Should extract 3 plan lines
         self.assertEqual(result[0]['Billed To'], "John Doe")
@@ -238,11 +313,13 @@ class TestInvoiceParser(unittest.TestCase):
         # Mock PyMuPDF response
         mock_doc = MagicMock()
         mock_page = MagicMock()
-        mock_page.get_text.return_value = self.sample_invoice_text
-        mock_doc.__iter__.return_value = [mock_page]
+        mock_page.get_text.side_effect = lambda *args: [] if args == ('words',) else self.sample_invoice_text
+        mock_doc.__len__.return_value = 1
+        mock_doc.__getitem__.return_value = mock_page
         mock_fitz.return_value = mock_doc
         
-        result = self.parser._parse_with_pymupdf("test.pdf")
+        # Not a PDF pdfplumber can read, so the page falls back to PyMuPDF
+        result = self.parser.parse_pdf(b'%PDF-test')
         
         self.assertEqual(len(result), 3)  # Should extract 3 plan lines
         self.assertEqual(result[0]['Billed To'], "John Doe")
@@ -323,6 +400,804 @@ class TestInvoiceParser(unittest.TestCase):
         # Should still extract fields even with uppercase labels
         self.assertIsInstance(result, list)
 
+class TestFieldExtraction(unittest.TestCase):
+    """Test cases for the single-pass field extraction engine."""
+    
+    def setUp(self):
+        self.parser = InvoiceParser()
+    
+    def test_header_fields_and_rows(self):
+        """Test header fields, wrapped company names, discounts and summary lines."""
+        text = """Billed to
+        Acme Holdings, 1 Main St
+        Invoice Period: 04/01/2025-04/30/2025
+        Issue date
+        APR 30, 2025
+        Company Plan Qty Unit Price Amount
+        Widget Co Base Plan 1 $20.00 $20.00
+        Northern Lights
+        Trading Company Premium Plan 2 $10.00 $20.00
+        20% off -$4.00
+        Subtotal $36.00
+        Late Co Base Plan 9 $9.00 $81.00"""
+        
+        result = self.parser._extract_fields_from_text(text)
+        
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[0]['Billed To'], 'Acme Holdings')
+        self.assertEqual(result[0]['Invoice Period'], '04/01/2025-04/30/2025')
+        self.assertEqual(result[0]['Invoice Issue Date'], 'APR 30, 2025')
+        self.assertEqual(result[1]['Company Name'], 'Northern Lights Trading Company')
+        self.assertEqual((result[1]['Qty'], result[1]['Unit Price'], result[1]['Amount']), ('2', '$10.00', '$20.00'))
+        self.assertEqual(result[2]['Company Name'], 'Northern Lights Trading Company')
+        self.assertEqual((result[2]['Plan'], result[2]['Amount']), ('20% off', '-$4.00'))
+    
+    def test_full_header_wins_over_earlier_partial_header(self):
+        """Test that rows start after the full table header even if a loose match comes first."""
+        text = """Amount due now
+        Early Co  Custom  1  $1.00  $1.00
+        Company Plan Qty Unit Price Amount
+        Widget Co Base Plan 1 $20.00 $20.00"""
+        
+        result = self.parser._extract_fields_from_text(text)
+        
+        self.assertEqual([r['Company Name'] for r in result], ['Widget Co'])
+    
+    def test_column_split_rows(self):
+        """Test rows without a known plan name split on wide gaps."""
+        text = """Company Plan Qty Unit Price Amount
+        Foo Ltd  Custom Plan X  2  $3.00  $6.00
+        Bar Ltd  Other  4.5"""
+        
+        result = self.parser._extract_fields_from_text(text)
+        
+        self.assertEqual([(r['Company Name'], r['Plan'], r['Qty'], r['Amount']) for r in result],
+                         [('Foo Ltd', 'Custom Plan X', '2', '$6.00'), ('Bar Ltd', 'Other', '4.5', '')])
+    
+    def test_plan_priority_follows_dictionary_order(self):
+        """Test that the first listed plan name wins when several occur in a row."""
+        parser = InvoiceParser(plan_names=['Pro Plan', 'Plan'])
+        text = """Company Plan Qty Unit Price Amount
+        Acme Plan Pro Plan 1 $5.00 $5.00"""
+        
+        result = parser._extract_fields_from_text(text)
+        
+        self.assertEqual((result[0]['Company Name'], result[0]['Plan']), ('Acme Plan', 'Pro Plan'))
+    
+    def test_custom_plan_names_change_rules_version(self):
+        """Test that a custom plan dictionary gets its own cache namespace."""
+        self.assertEqual(InvoiceParser().rules_version, InvoiceParser(plan_names=list(DEFAULT_PLAN_NAMES)).rules_version)
+        self.assertNotEqual(InvoiceParser().rules_version, InvoiceParser(plan_names=['Gold Plan']).rules_version)
+        self.assertEqual(InvoiceParser(plan_names=[])._extract_fields_from_text(
+            "Company Plan Qty Unit Price Amount\nAcme Base Plan 1"), [])
+    
+    def test_tab_separated_rows(self):
+        """Test that rows rebuilt by table_layout are read cell by cell, discounts under their company."""
+        text = "\n".join([
+            "Billed to",
+            "Acme Holdings",
+            "Company\tPlan\tQty\tUnit Price\tAmount",
+            "Acme Plan Co\tGold Tier\t2\t$5.00\t$10.00",
+            "\t20% off\t\t\t-$2.00",
+            "Subtotal $8.00",
+        ])
+        
+        result = self.parser._extract_fields_from_text(text)
+        
+        self.assertEqual([(r['Company Name'], r['Plan'], r['Qty'], r['Unit Price'], r['Amount']) for r in result],
+                         [('Acme Plan Co', 'Gold Tier', '2', '$5.00', '$10.00'),
+                          ('Acme Plan Co', '20% off', '', '', '-$2.00')])
+        self.assertEqual(result[0]['Billed To'], 'Acme Holdings')
+    
+    def test_tab_separated_summary_rows_end_the_table(self):
+        """Test that a Subtotal row with tab-separated cells is not read as a line item."""
+        text = "\n".join([
+            "Company\tPlan\tQty\tUnit Price\tAmount",
+            "Acme Plan Co\tGold Tier\t2\t$5.00\t$10.00",
+            "Subtotal\t\t\t\t$10.00",
+            "Acme Plan Co\tGold Tier\t1\t$5.00\t$5.00",
+        ])
+        
+        result = self.parser._extract_fields_from_text(text)
+        
+        self.assertEqual([(r['Company Name'], r['Amount']) for r in result], [('Acme Plan Co', '$10.00')])
+
+class TestHybridPipeline(unittest.TestCase):
+    """Test cases for the single-read, per-page engine selection in parse_pdf."""
+    
+    def setUp(self):
+        self.parser = InvoiceParser()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.temp_dir.name, 'invoice.pdf')
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_text_pdf_skips_ocr(self):
+        """Test that a digital PDF is parsed from its text layer without OCR."""
+        write_pdf(self.pdf_path, [INVOICE_LINES])
+        
+        with patch.object(InvoiceParser, '_recognize_page_image') as mock_ocr:
+            result = self.parser.parse_pdf(self.pdf_path)
+        
+        mock_ocr.assert_not_called()
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0]['Billed To'], 'Acme Holdings')
+        self.assertEqual(result[1]['Company Name'], 'Gadget Works')
+        self.assertEqual(result[1]['Amount'], '$100.00')
+    
+    def test_mixed_pdf_only_ocrs_scanned_pages(self):
+        """Test that only pages without a text layer go to OCR, in page order."""
+        write_pdf(self.pdf_path, [INVOICE_LINES, [], INVOICE_LINES])
+        
+        with open(self.pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+        
+        with patch.object(InvoiceParser, '_recognize_page_image', return_value=OCR_PAGE_TEXT) as mock_ocr:
+            page_texts = self.parser._extract_page_texts(pdf_bytes)
+            result = self.parser.parse_pdf(self.pdf_path)
+        
+        self.assertEqual([args[1] for args, _ in mock_ocr.call_args_list], [1, 1])
+        self.assertEqual([(num, engine) for num, engine, _ in page_texts],
+                         [(0, 'pdfplumber'), (1, 'ocr'), (2, 'pdfplumber')])
+        self.assertEqual([r['Company Name'] for r in result],
+                         ['Widget Co', 'Gadget Works', 'Scanned Corp', 'Widget Co', 'Gadget Works'])
+        self.assertEqual(result[2]['Billed To'], 'Acme Holdings')
+    
+    def test_positional_tables_in_parse_pdf(self):
+        """Test that table cells are found by position, even for plans missing from the dictionary."""
+        doc = fitz.open()
+        page = doc.new_page()
+        for y, cells in ((72, ["Company", "Plan", "Qty", "Unit Price", "Amount"]),
+                         (86, ["Blue Sky Ltd", "Gold Tier", "3", "$5.00", "$15.00"]),
+                         (100, ["Subtotal", "", "", "", "$15.00"])):
+            for x, cell in zip((72, 200, 320, 380, 470), cells):
+                page.insert_text((x, y), cell, fontsize=10)
+        doc.save(self.pdf_path)
+        doc.close()
+        
+        result = self.parser.parse_pdf(self.pdf_path)
+        flattened = InvoiceParser(positional_tables=False).parse_pdf(self.pdf_path)
+        
+        self.assertEqual([(r['Company Name'], r['Plan'], r['Qty'], r['Unit Price'], r['Amount']) for r in result],
+                         [('Blue Sky Ltd', 'Gold Tier', '3', '$5.00', '$15.00')])
+        self.assertNotEqual(flattened[0]['Company Name'], 'Blue Sky Ltd')
+        self.assertNotEqual(self.parser.rules_version, InvoiceParser(positional_tables=False).rules_version)
+    
+    def test_classified_pages_skip_pages_without_invoice_data(self):
+        """Test that the classifier sends only table pages to pdfplumber and scans to OCR, skipping the rest."""
+        write_pdf(self.pdf_path, [INVOICE_LINES[:5], INVOICE_LINES[5:], ["Terms and conditions",
+                                  "Payment is due within 30 days of receipt"], []])
+        doc = fitz.open(self.pdf_path)
+        add_scanned_page(doc)
+        pdf_bytes = doc.tobytes()
+        doc.close()
+        parser = InvoiceParser(classify_pages=True)
+        
+        with patch.object(InvoiceParser, '_recognize_page_image', return_value=OCR_PAGE_TEXT) as mock_ocr, \
+                patch.object(parser, '_pdfplumber_page_text', wraps=parser._pdfplumber_page_text) as plumber:
+            page_texts = parser._extract_page_texts(pdf_bytes)
+        
+        self.assertEqual([(num, engine) for num, engine, _ in page_texts],
+                         [(0, 'pymupdf'), (1, 'pdfplumber'), (4, 'ocr')])
+        self.assertEqual([args[1] for args, _ in plumber.call_args_list], [1])
+        self.assertEqual([args[1] for args, _ in mock_ocr.call_args_list], [4])
+        self.assertEqual(parser.metrics.counters['pages_skipped'], 2)
+        self.assertEqual([r['Company Name'] for r in parser.parse_page_texts(page_texts)],
+                         ['Widget Co', 'Gadget Works', 'Scanned Corp'])
+        self.assertNotEqual(parser.rules_version, self.parser.rules_version)
+    
+    def test_classify_page(self):
+        """Test page classes for a table split into cells, a header page, a scan and a page with only a logo."""
+        doc = fitz.open()
+        page = doc.new_page()
+        for x, cell in zip((72, 200, 320, 380, 470), ["Company", "Plan", "Qty", "Unit Price", "Amount"]):
+            page.insert_text((x, 72), cell, fontsize=10)
+        page.insert_text((72, 86), "Widget Co", fontsize=10)
+        page = doc.new_page()
+        page.insert_text((72, 72), "Billed to Acme Holdings, 1 Main St", fontsize=10)
+        add_scanned_page(doc)
+        add_scanned_page(doc, fitz.Rect(72, 72, 144, 144))
+        
+        classes = [self.parser._classify_page(page)[0] for page in doc]
+        doc.close()
+        
+        self.assertEqual(classes, ['line_items', 'header', 'ocr', 'skip'])
+    
+    def test_classified_continuation_page_without_strict_header(self):
+        """Test that a continuation page under a loose header keeps its rows with classification on."""
+        continuation = ["Company Amount", "Widget Co Base Plan 1 $20.00 $20.00",
+                        "Gadget Works Ultimate Plan 2 $50.00 $100.00"]
+        write_pdf(self.pdf_path, [INVOICE_LINES, continuation])
+        
+        expected = InvoiceParser().parse_pdf(self.pdf_path)
+        classified = InvoiceParser(classify_pages=True)
+        result = classified.parse_pdf(self.pdf_path)
+        
+        self.assertEqual(len(expected), 4)
+        self.assertEqual(result, expected)
+        self.assertNotIn('pages_skipped', classified.metrics.counters)
+    
+    def test_pdf_is_read_once(self):
+        """Test that pdfplumber and PyMuPDF open the same in-memory buffer, not the path."""
+        write_pdf(self.pdf_path, [INVOICE_LINES])
+        
+        with patch('invoice_parser.pdfplumber.open', wraps=pdfplumber.open) as mock_open:
+            self.parser.parse_pdf(self.pdf_path)
+        
+        mock_open.assert_called_once()
+        self.assertNotIsInstance(mock_open.call_args[0][0], str)
+    
+    def test_parse_bytes_and_stream(self):
+        """Test that a PDF can be parsed from bytes or a binary stream without a file on disk."""
+        write_pdf(self.pdf_path, [INVOICE_LINES])
+        with open(self.pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+        expected = self.parser.parse_pdf(self.pdf_path)
+        store = PageTextStore(os.path.join(self.temp_dir.name, 'pages.db'))
+        parser = InvoiceParser(text_store=store)
+        
+        from_bytes = parser.parse_pdf(pdf_bytes, source='upload.pdf')
+        from_stream = self.parser.parse_pdf(io.BytesIO(pdf_bytes))
+        documents = list(store.iter_documents())
+        store.close()
+        
+        self.assertEqual(len(expected), 2)
+        self.assertEqual(from_bytes, expected)
+        self.assertEqual(from_stream, expected)
+        self.assertEqual([source for _, source in documents], ['upload.pdf'])
+    
+    def test_iter_parse_matches_parse_pdf(self):
+        """Test that iter_parse yields the same records as parse_pdf."""
+        write_pdf(self.pdf_path, [INVOICE_LINES, [], INVOICE_LINES, []])
+        
+        with patch.object(InvoiceParser, '_recognize_page_image', return_value=OCR_PAGE_TEXT):
+            expected = self.parser.parse_pdf(self.pdf_path)
+            for workers in (1, 3):
+                streamed = list(InvoiceParser(ocr_workers=workers).iter_parse(self.pdf_path))
+                self.assertEqual(streamed, expected)
+        self.assertEqual(len(expected), 6)
+    
+    def test_iter_parse_is_lazy(self):
+        """Test that records from the first page arrive before later pages are read."""
+        write_pdf(self.pdf_path, [INVOICE_LINES] * 5)
+        
+        with patch.object(InvoiceParser, '_pdfplumber_page_text', autospec=True,
+                          side_effect=InvoiceParser._pdfplumber_page_text) as mock_page:
+            records = self.parser.iter_parse(self.pdf_path)
+            first = next(records)
+            pages_read = mock_page.call_count
+            rest = list(records)
+        
+        self.assertEqual(first['Company Name'], 'Widget Co')
+        self.assertEqual(pages_read, 1)
+        self.assertEqual(len(rest), 9)
+    
+    def test_iter_parse_fills_and_caches(self):
+        """Test that iter_parse fills the text store and the result cache like parse_pdf."""
+        write_pdf(self.pdf_path, [INVOICE_LINES])
+        store = PageTextStore(os.path.join(self.temp_dir.name, 'pages.db'))
+        cache = ExtractionCache(os.path.join(self.temp_dir.name, 'cache'))
+        parser = InvoiceParser(cache=cache, text_store=store)
+        
+        first = list(parser.iter_parse(self.pdf_path))
+        with patch.object(InvoiceParser, '_iter_page_texts') as mock_extract:
+            second = list(parser.iter_parse(self.pdf_path))
+        stored = store.load_document(next(store.iter_documents())[0])
+        store.close()
+        
+        mock_extract.assert_not_called()
+        self.assertEqual(second, first)
+        self.assertEqual(parser.metrics.counters['cache_hits'], 1)
+        self.assertEqual([(num, engine) for num, engine, _ in stored], [(0, 'pdfplumber')])
+    
+    def test_ocr_page_is_a_grayscale_view(self):
+        """Test that pages are rendered in gray and handed to tesseract without copies or PNG encoding."""
+        write_pdf(self.pdf_path, [INVOICE_LINES])
+        fake_pytesseract = MagicMock()
+        fake_pytesseract.image_to_string.return_value = 'text'
+        
+        with fitz.open(self.pdf_path) as doc:
+            pix = self.parser._render_page_for_ocr(doc[0])
+        image = invoice_parser._pixmap_array(pix)
+        with patch('invoice_parser._load_pytesseract', return_value=fake_pytesseract):
+            text = self.parser._recognize_page_image(pix, 0)
+        
+        self.assertEqual(pix.n, 1)
+        self.assertEqual(image.shape, (pix.height, pix.width))
+        self.assertFalse(image.flags.owndata)
+        self.assertEqual(text, 'text')
+        binary = fake_pytesseract.image_to_string.call_args[0][0]
+        self.assertEqual(binary.ndim, 2)
+        self.assertTrue(set(binary.ravel().tolist()) <= {0, 255})
+    
+    def test_ocr_cleanup_steps_are_optional(self):
+        """Test that closing and blur only run when their kernels are set."""
+        import numpy as np
+        image = np.full((20, 20), 255, dtype=np.uint8)
+        image[5:15, 9] = 0
+        
+        plain = self.parser._preprocess_image_for_ocr(image)
+        closed = InvoiceParser(ocr_close_kernel=3)._preprocess_image_for_ocr(image)
+        blurred = InvoiceParser(ocr_blur_kernel=2)._preprocess_image_for_ocr(image)
+        
+        self.assertTrue((plain == image).all())
+        self.assertTrue((closed == 255).all())
+        self.assertGreater(len(set(blurred.ravel().tolist())), 2)
+        self.assertEqual(self.parser._preprocess_image_for_ocr(np.dstack([image] * 3)).shape, (20, 20))
+    
+    def test_ocr_cleanup_kernels_change_cache_and_text_modes(self):
+        """Test that cached results and stored text are not shared across OCR clean-up settings."""
+        plain = InvoiceParser()
+        closed = InvoiceParser(ocr_close_kernel=3)
+        blurred = InvoiceParser(ocr_blur_kernel=2)
+        
+        versions = {parser.rules_version for parser in (plain, closed, blurred)}
+        modes = {parser.text_mode for parser in (plain, closed, blurred)}
+        
+        self.assertEqual((len(versions), len(modes)), (3, 3))
+        self.assertEqual(InvoiceParser(ocr_close_kernel=1).rules_version, plain.rules_version)
+        self.assertEqual(InvoiceParser(ocr_blur_kernel=3).text_mode, blurred.text_mode)
+    
+    def test_ocr_data_text(self):
+        """Test that image_to_data words are rebuilt into lines, with blocks separated and -1 confidences skipped."""
+        data = ocr_data("Company Plan Qty\nWidget Co Base Plan 1", 90)
+        second = ocr_data("Subtotal $20.00", 60, block=2)
+        for key in data:
+            data[key] += second[key]
+        
+        text, confidence, words = invoice_parser._ocr_data_text(data)
+        
+        self.assertEqual(text, "Company Plan Qty\nWidget Co Base Plan 1\n\nSubtotal $20.00")
+        self.assertEqual(words, 10)
+        self.assertAlmostEqual(confidence, (8 * 90 + 2 * 60) / 10)
+        self.assertEqual(invoice_parser._ocr_data_text(ocr_data('', 0)), ('', 0.0, 0))
+    
+    def test_adaptive_ocr_escalates_until_confident(self):
+        """Test that low-confidence pages are re-rendered at higher DPI and the first confident one is kept."""
+        write_pdf(self.pdf_path, [[], []])
+        # One worker, so the pages are recognized in order
+        parser = InvoiceParser(adaptive_ocr=True, ocr_min_confidence=80, ocr_workers=1)
+        fake_pytesseract = MagicMock()
+        widths = []
+        
+        def image_to_data(image, config, output_type):
+            widths.append(image.shape[1])
+            # Page 1 is legible at 100 dpi, page 2 only at the third resolution
+            conf = 40 if len(widths) in (2, 3) else 95
+            return ocr_data(OCR_PAGE_TEXT if conf > 50 else "Sc4nn3d C0rp", conf)
+        
+        fake_pytesseract.image_to_data.side_effect = image_to_data
+        with open(self.pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+        with patch('invoice_parser._load_pytesseract', return_value=fake_pytesseract):
+            texts = list(parser._iter_page_texts(pdf_bytes))
+        
+        self.assertEqual(texts, [(0, 'ocr', OCR_PAGE_TEXT.strip()), (1, 'ocr', OCR_PAGE_TEXT.strip())])
+        # 100 dpi, then 100, 200 and 300 dpi
+        self.assertEqual(widths[0], widths[1])
+        self.assertAlmostEqual(widths[2] / widths[1], 2, places=2)
+        self.assertAlmostEqual(widths[3] / widths[1], 3, places=2)
+        self.assertEqual(parser.metrics.counters['ocr_pages_100dpi'], 1)
+        self.assertEqual(parser.metrics.counters['ocr_pages_300dpi'], 1)
+        self.assertEqual(parser.metrics.counters['ocr_rerenders'], 2)
+    
+    def test_adaptive_ocr_keeps_best_attempt_and_skips_blank_pages(self):
+        """Test that the most confident attempt wins when none is confident, and blank pages render once."""
+        write_pdf(self.pdf_path, [[]])
+        parser = InvoiceParser(adaptive_ocr=True)
+        fake_pytesseract = MagicMock()
+        fake_pytesseract.image_to_data.side_effect = [
+            ocr_data("low", 30), ocr_data("best", 70), ocr_data("worse", 50), ocr_data('', 0)
+        ]
+        
+        with open(self.pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+        with patch('invoice_parser._load_pytesseract', return_value=fake_pytesseract):
+            noisy = list(parser._iter_page_texts(pdf_bytes))
+            blank = list(parser._iter_page_texts(pdf_bytes))
+        
+        self.assertEqual(noisy, [(0, 'ocr', 'best')])
+        self.assertEqual(blank, [])
+        self.assertEqual(parser.metrics.counters['pages_empty'], 1)
+        self.assertEqual(fake_pytesseract.image_to_data.call_count, 4)
+        self.assertEqual(parser.metrics.counters['ocr_pages_200dpi'], 1)
+        self.assertEqual(parser.metrics.counters['ocr_pages_100dpi'], 1)
+    
+    def test_adaptive_ocr_in_parse_pdf(self):
+        """Test that parse_pdf uses adaptive OCR for pages without a text layer, under its own cache version."""
+        write_pdf(self.pdf_path, [INVOICE_LINES, []])
+        parser = InvoiceParser(adaptive_ocr=True)
+        fake_pytesseract = MagicMock()
+        fake_pytesseract.image_to_data.return_value = ocr_data(OCR_PAGE_TEXT, 90)
+        
+        with patch('invoice_parser._load_pytesseract', return_value=fake_pytesseract):
+            result = parser.parse_pdf(self.pdf_path)
+        
+        self.assertEqual([r['Company Name'] for r in result], ['Widget Co', 'Gadget Works', 'Scanned Corp'])
+        self.assertEqual(parser.metrics.counters['pages_ocr'], 1)
+        self.assertNotEqual(parser.rules_version, InvoiceParser().rules_version)
+    
+    def test_roi_ocr_reads_text_regions(self):
+        """Test that ROI OCR sends tesseract a crop of the text, and the full page when the crop has no text."""
+        write_pdf(self.pdf_path, [INVOICE_LINES])
+        parser = InvoiceParser(roi_ocr=True)
+        fake_pytesseract = MagicMock()
+        fake_pytesseract.image_to_string.side_effect = [OCR_PAGE_TEXT, 'Sc4nn3d', OCR_PAGE_TEXT]
+        
+        with patch('invoice_parser._load_pytesseract', return_value=fake_pytesseract):
+            with fitz.open(self.pdf_path) as doc:
+                pix = parser._render_page_for_ocr(doc[0])
+            cropped = parser._recognize_page_image(pix, 0)
+            fallback = parser._recognize_page_image(pix, 0)
+        
+        sizes = [call[0][0].size for call in fake_pytesseract.image_to_string.call_args_list]
+        self.assertEqual((cropped, fallback), (OCR_PAGE_TEXT, OCR_PAGE_TEXT))
+        self.assertLess(sizes[0] * 3, pix.width * pix.height)
+        self.assertEqual(sizes[1:], [sizes[0], pix.width * pix.height])
+        self.assertEqual(parser.metrics.counters['ocr_roi_fallbacks'], 1)
+        self.assertEqual(parser.metrics.counters['ocr_pixels'], sum(sizes))
+        self.assertNotEqual(parser.rules_version, InvoiceParser().rules_version)
+    
+    def test_roi_ocr_reads_pages_without_line_items_once(self):
+        """Test that a legible crop without line items is not read again in full, in fixed and adaptive OCR."""
+        terms = ["Terms and conditions", "Payment is due within thirty days of receipt."]
+        with fitz.open() as text_doc, fitz.open() as doc:
+            text_page = text_doc.new_page()
+            for line_num, line in enumerate(terms):
+                text_page.insert_text((72, 72 + 14 * line_num), line, fontsize=10)
+            scan = text_page.get_pixmap(dpi=150, colorspace=fitz.csGRAY)
+            for _ in range(2):
+                page = doc.new_page()
+                page.insert_image(page.rect, pixmap=scan)
+            doc.save(self.pdf_path)
+        fake_pytesseract = MagicMock()
+        fake_pytesseract.image_to_string.return_value = '\n'.join(terms)
+        fake_pytesseract.image_to_data.return_value = ocr_data('\n'.join(terms), 95)
+        
+        for adaptive_ocr in (False, True):
+            with self.subTest(adaptive_ocr=adaptive_ocr):
+                parser = InvoiceParser(roi_ocr=True, adaptive_ocr=adaptive_ocr)
+                with patch('invoice_parser._load_pytesseract', return_value=fake_pytesseract):
+                    parser.parse_pdf(self.pdf_path)
+                
+                self.assertEqual(parser.metrics.counters['pages_ocr'], 2)
+                self.assertNotIn('ocr_roi_fallbacks', parser.metrics.counters)
+        self.assertEqual(fake_pytesseract.image_to_string.call_count, 2)
+        self.assertEqual(fake_pytesseract.image_to_data.call_count, 2)
+    
+    def test_parallel_ocr_keeps_page_order(self):
+        """Test that concurrently OCR'd pages are reassembled in page order."""
+        write_pdf(self.pdf_path, [[]] * 6)
+        parser = InvoiceParser(ocr_workers=3)
+        threads = set()
+        
+        def fake_recognize(img_data, page_num):
+            threads.add(threading.get_ident())
+            # Finish later pages first
+            time.sleep(0.01 * (6 - page_num))
+            return f"page {page_num}"
+        
+        with open(self.pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+        with patch.object(parser, '_recognize_page_image', side_effect=fake_recognize):
+            texts = list(parser._iter_page_texts(pdf_bytes))
+        
+        self.assertEqual(texts, [(page_num, 'ocr', f"page {page_num}") for page_num in range(6)])
+        self.assertGreater(len(threads), 1)
+    
+    def test_ocr_workers_default_is_bounded(self):
+        """Test that ocr_workers defaults to a small positive number."""
+        self.assertGreaterEqual(InvoiceParser().ocr_workers, 1)
+        self.assertLessEqual(InvoiceParser().ocr_workers, 4)
+        self.assertEqual(InvoiceParser(ocr_workers=0).ocr_workers, 1)
+    
+    def test_cached_results_skip_extraction(self):
+        """Test that a second parse of the same bytes is served from the cache."""
+        write_pdf(self.pdf_path, [INVOICE_LINES])
+        copy_path = os.path.join(self.temp_dir.name, 'reupload.pdf')
+        with open(self.pdf_path, 'rb') as src, open(copy_path, 'wb') as dst:
+            dst.write(src.read())
+        parser = InvoiceParser(cache=ExtractionCache(os.path.join(self.temp_dir.name, 'cache')))
+        
+        first = parser.parse_pdf(self.pdf_path)
+        with patch.object(InvoiceParser, '_extract_page_texts') as mock_extract:
+            second = parser.parse_pdf(copy_path)
+            mock_extract.assert_not_called()
+            bypassed = parser.parse_pdf(copy_path, use_cache=False)
+            mock_extract.assert_called_once()
+        
+        self.assertEqual(len(first), 2)
+        self.assertEqual(second, first)
+        self.assertEqual(bypassed, [])
+    
+    def test_text_store_is_reused(self):
+        """Test that stored page text replaces extraction on the next parse."""
+        write_pdf(self.pdf_path, [INVOICE_LINES])
+        store = PageTextStore(os.path.join(self.temp_dir.name, 'pages.db'))
+        parser = InvoiceParser(text_store=store)
+        
+        first = parser.parse_pdf(self.pdf_path)
+        with patch.object(InvoiceParser, '_extract_page_texts') as mock_extract:
+            second = parser.parse_pdf(self.pdf_path)
+        store.close()
+        
+        mock_extract.assert_not_called()
+        self.assertEqual(len(first), 2)
+        self.assertEqual(second, first)
+    
+    def test_text_store_is_not_reused_across_text_modes(self):
+        """Test that page text stored in one table or OCR mode is extracted again in another."""
+        write_pdf(self.pdf_path, [INVOICE_LINES])
+        store = PageTextStore(os.path.join(self.temp_dir.name, 'pages.db'))
+        InvoiceParser(text_store=store).parse_pdf(self.pdf_path)
+        
+        with patch.object(InvoiceParser, '_extract_page_texts', autospec=True,
+                          side_effect=InvoiceParser._extract_page_texts) as mock_extract:
+            InvoiceParser(text_store=store, positional_tables=False).parse_pdf(self.pdf_path)
+            InvoiceParser(text_store=store, positional_tables=False).parse_pdf(self.pdf_path)
+            InvoiceParser(text_store=store, plan_names=['Base Plan']).parse_pdf(self.pdf_path)
+        store.close()
+        
+        # Once for the switch to text tables, once more for the switch back; plans don't matter
+        self.assertEqual(mock_extract.call_count, 2)
+        self.assertNotEqual(InvoiceParser().text_mode, InvoiceParser(ocr_backend='batch').text_mode)
+    
+    def test_parse_page_texts(self):
+        """Test field extraction from (page, engine, text) tuples without a PDF."""
+        page_texts = [(0, 'pdfplumber', '\n'.join(INVOICE_LINES)), (1, 'ocr', OCR_PAGE_TEXT)]
+        
+        result = self.parser.parse_page_texts(page_texts)
+        
+        self.assertEqual([r['Company Name'] for r in result], ['Widget Co', 'Gadget Works', 'Scanned Corp'])
+        self.assertEqual(result[2]['Invoice Period'], '04/01/2025-04/30/2025')
+    
+    def test_parse_page_items_share_filled_header(self):
+        """Test that line items of a page share one header, filled from earlier pages."""
+        page_texts = [(0, 'pdfplumber', '\n'.join(INVOICE_LINES)), (1, 'ocr', OCR_PAGE_TEXT)]
+        
+        items = self.parser.parse_page_items(page_texts)
+        
+        self.assertIs(items[0].header, items[1].header)
+        self.assertEqual(items[2].header.invoice_period, '04/01/2025-04/30/2025')
+        self.assertEqual(to_records(items), self.parser.parse_page_texts(page_texts))
+    
+    def test_metrics_record_stages_and_pages(self):
+        """Test per-engine page counts, fallbacks and stage timings for a mixed PDF."""
+        write_pdf(self.pdf_path, [INVOICE_LINES, [], INVOICE_LINES])
+        
+        with patch.object(InvoiceParser, '_recognize_page_image', return_value=OCR_PAGE_TEXT):
+            result = self.parser.parse_pdf(self.pdf_path)
+        
+        counters = self.parser.metrics.counters
+        self.assertEqual(counters['documents'], 1)
+        self.assertEqual(counters['pages_pdfplumber'], 2)
+        self.assertEqual(counters['pages_ocr'], 1)
+        self.assertEqual(counters['fallbacks_pymupdf'], 1)
+        self.assertEqual(counters['fallbacks_ocr'], 1)
+        self.assertEqual(counters['rows_extracted'], len(result))
+        for stage in ('read', 'pdfplumber', 'pymupdf', 'ocr', 'field_extraction', 'post_process'):
+            self.assertIn(stage, self.parser.metrics.stage_seconds)
+    
+    def test_missing_file_returns_empty(self):
+        """Test that an unreadable path is handled gracefully."""
+        self.assertEqual(self.parser.parse_pdf(os.path.join(self.temp_dir.name, 'missing.pdf')), [])
+
+# Modules only the OCR and DataFrame code paths need
+HEAVY_MODULES = ('pandas', 'cv2', 'numpy', 'pytesseract', 'PIL', 'openpyxl', 'pyarrow')
+
+# Import budget for main.py, which imports the parser and writers (best of three runs)
+IMPORT_BUDGET_SECONDS = 0.5
+
+IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(','.join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+class TestLazyImports(unittest.TestCase):
+    """Test that start-up doesn't load OCR or DataFrame dependencies."""
+    
+    def _import(self, module):
+        repo_dir = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as cwd:
+            output = subprocess.run(
+                [sys.executable, '-c', f"import sys; sys.path.insert(0, {repo_dir!r})" +
+                 IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                cwd=cwd, capture_output=True, text=True, check=True
+            ).stdout.splitlines()
+        return float(output[0]), [name for name in output[1].split(',') if name]
+    
+    def test_imports_skip_heavy_modules(self):
+        """Test that importing the parser, CLI and web app loads none of the heavy modules."""
+        for module in ('invoice_parser', 'main', 'app'):
+            with self.subTest(module=module):
+                self.assertEqual(self._import(module)[1], [])
+    
+    def test_import_time_budget(self):
+        """Test that main.py imports within the budget."""
+        seconds = min(self._import('main')[0] for _ in range(3))
+        self.assertLess(seconds, IMPORT_BUDGET_SECONDS)
+    
+    def test_tesseract_configured_once(self):
+        """Test that install locations are probed on first OCR use only, and the command is never switched."""
+        pytesseract = invoice_parser._load_pytesseract()
+        default_cmd = pytesseract.pytesseract.tesseract_cmd
+        self.addCleanup(setattr, pytesseract.pytesseract, 'tesseract_cmd', default_cmd)
+        
+        with patch.object(invoice_parser, '_tesseract_configured', False), \
+                patch('invoice_parser.os.path.exists', return_value=False) as mock_exists:
+            InvoiceParser()
+            mock_exists.assert_not_called()
+            invoice_parser._load_pytesseract()
+            invoice_parser._load_pytesseract()
+        self.assertEqual(mock_exists.call_count, len(COMMON_TESSERACT_PATHS))
+        
+        with patch.object(invoice_parser, '_tesseract_configured', False):
+            invoice_parser._load_pytesseract('/opt/tesseract/bin/tesseract')
+            with self.assertLogs('invoice_parser', level='WARNING'):
+                invoice_parser._load_pytesseract('/usr/local/bin/tesseract')
+        self.assertEqual(pytesseract.pytesseract.tesseract_cmd, '/opt/tesseract/bin/tesseract')
+
+
+class TestSharedParser(unittest.TestCase):
+    """Test that one parser instance can serve concurrent callers."""
+    
+    def test_concurrent_parses_match_sequential(self):
+        """Test that threads sharing a parser get the same records as sequential calls."""
+        documents = []
+        for n in range(8):
+            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+                path = f.name
+            self.addCleanup(os.remove, path)
+            write_pdf(path, [INVOICE_LINES[:6] + [f"Company {n} Base Plan {n + 1} $20.00 $40.00", "Subtotal"]])
+            with open(path, 'rb') as f:
+                documents.append(f.read())
+        parser = InvoiceParser(ocr_workers=1)
+        expected = [parser.parse_pdf(pdf_bytes) for pdf_bytes in documents]
+        results = [None] * len(documents)
+        
+        def parse(index):
+            results[index] = parser.parse_pdf(documents[index])
+        
+        threads = [threading.Thread(target=parse, args=(index,)) for index in range(len(documents))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(results, expected)
+        self.assertEqual(parser.metrics.counters['documents'], 2 * len(documents))
+        self.assertFalse(hasattr(parser, 'extracted_data'))
+    
+    def test_warm_up_leaves_metrics_untouched(self):
+        """Test that warming up parses nothing into the parser's metrics and never raises."""
+        parser = InvoiceParser()
+        
+        with patch.object(InvoiceParser, '_extract_items_from_text', autospec=True,
+                          side_effect=InvoiceParser._extract_items_from_text) as mock_extract:
+            seconds = parser.warm_up(ocr=False)
+        
+        self.assertGreater(seconds, 0)
+        self.assertEqual(mock_extract.call_count, 1)
+        self.assertEqual(parser.metrics.counters, {})
+        with patch('invoice_parser.fitz.open', side_effect=RuntimeError('boom')):
+            parser.warm_up(ocr=False)
+
+
+class TestOcrBackends(unittest.TestCase):
+    """Test cases for the pytesseract and batch OCR backends."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.temp_dir.name, 'invoice.pdf')
+        self.fake_pytesseract = MagicMock()
+        self.fake_pytesseract.pytesseract.tesseract_cmd = '/usr/bin/tesseract'
+        patcher = patch('invoice_parser._load_pytesseract', return_value=self.fake_pytesseract)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.runs = []
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def fake_tesseract(self, output):
+        """Stand in for subprocess.run of tesseract, recording each run's arguments and image count."""
+        def run(args, capture_output):
+            with open(args[1], encoding='utf-8') as f:
+                images = [path for path in f.read().splitlines() if path]
+            self.assertTrue(all(os.path.exists(path) for path in images))
+            self.runs.append((args, len(images)))
+            stdout = output(len(images)) if callable(output) else output
+            return subprocess.CompletedProcess(args, 0, stdout=stdout.encode('utf-8'), stderr=b'')
+        
+        return run
+    
+    def test_unknown_backend_is_rejected(self):
+        """Test that an unknown backend name raises, and backend objects are used as given."""
+        backend = invoice_parser.TesseractBatchBackend()
+        
+        with self.assertRaises(ValueError):
+            InvoiceParser(ocr_backend='tesserocr')
+        self.assertIs(InvoiceParser(ocr_backend=backend).ocr_backend, backend)
+        self.assertIsInstance(InvoiceParser().ocr_backend, invoice_parser.PytesseractBackend)
+    
+    def test_batch_backend_reads_all_images_in_one_run(self):
+        """Test that image_to_string runs tesseract once over a list file and splits the pages."""
+        import numpy as np
+        images = [np.full((10, 10), 255, dtype=np.uint8)] * 3
+        backend = invoice_parser.TesseractBatchBackend()
+        
+        with patch('invoice_parser.subprocess.run', side_effect=self.fake_tesseract("one\n\fTWO\n\f\f")):
+            texts = backend.image_to_string(images, '--psm 6')
+        
+        self.assertEqual(texts, ['one\n', 'TWO\n', ''])
+        args, image_count = self.runs[0]
+        self.assertEqual(image_count, 3)
+        self.assertEqual(args[0], '/usr/bin/tesseract')
+        self.assertEqual(args[2:], ['stdout', '--psm', '6'])
+    
+    def test_batch_backend_splits_tsv_by_page(self):
+        """Test that image_to_data output is split per image, shaped like pytesseract's Output.DICT."""
+        import numpy as np
+        tsv = "\n".join([
+            "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext",
+            "1\t1\t0\t0\t0\t0\t0\t0\t10\t10\t-1\t",
+            "5\t1\t1\t1\t1\t1\t0\t0\t5\t5\t96.5\tWidget",
+            "1\t2\t0\t0\t0\t0\t0\t0\t10\t10\t-1",
+        ])
+        backend = invoice_parser.TesseractBatchBackend()
+        
+        with patch('invoice_parser.subprocess.run', side_effect=self.fake_tesseract(tsv)):
+            first, second = backend.image_to_data([np.zeros((10, 10), dtype=np.uint8)] * 2, '--psm 6')
+        
+        self.assertEqual(self.runs[0][0][-1], 'tsv')
+        self.assertEqual(first['text'], ['', 'Widget'])
+        self.assertEqual(first['conf'], [-1, 96])
+        self.assertEqual(second['text'], [''])
+        self.assertEqual(invoice_parser._ocr_data_text(first), ('Widget', 96.0, 1))
+    
+    def test_parse_pdf_batches_consecutive_scanned_pages(self):
+        """Test that runs of scanned pages are OCR'd per batch, in page order, around text pages."""
+        write_pdf(self.pdf_path, [[], [], INVOICE_LINES, [], [], []])
+        run = self.fake_tesseract(lambda pages: f"{OCR_PAGE_TEXT}\f" * pages)
+        
+        for workers in (1, 2):
+            self.runs = []
+            parser = InvoiceParser(ocr_backend='batch', ocr_batch_pages=2, ocr_workers=workers)
+            with patch('invoice_parser.subprocess.run', side_effect=run):
+                result = parser.parse_pdf(self.pdf_path, use_cache=False)
+            
+            self.assertEqual([r['Company Name'] for r in result],
+                             ['Scanned Corp'] * 2 + ['Widget Co', 'Gadget Works'] + ['Scanned Corp'] * 3)
+            self.assertEqual(sorted(image_count for _, image_count in self.runs), [1, 2, 2])
+            self.assertEqual(parser.metrics.counters['pages_ocr'], 5)
+            self.fake_pytesseract.image_to_string.assert_not_called()
+    
+    def test_batch_failure_empties_its_pages(self):
+        """Test that a failed tesseract run leaves its pages without text, and the text pages still parse."""
+        write_pdf(self.pdf_path, [[], [], INVOICE_LINES])
+        parser = InvoiceParser(ocr_backend='batch', ocr_workers=1)
+        failed = subprocess.CompletedProcess([], 1, stdout=b'', stderr=b'Error opening data file')
+        
+        with open(self.pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+        
+        with patch('invoice_parser.subprocess.run', return_value=failed) as mock_run:
+            with self.assertLogs('invoice_parser', level='ERROR') as logs:
+                texts = list(parser._iter_page_texts(pdf_bytes))
+                result = parser.parse_pdf(pdf_bytes, use_cache=False)
+        
+        self.assertEqual([(page_num, engine) for page_num, engine, _ in texts], [(2, 'pdfplumber')])
+        self.assertEqual([r['Company Name'] for r in result], ['Widget Co', 'Gadget Works'])
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertEqual(parser.metrics.counters['pages_empty'], 4)
+        self.assertIn('Error opening data file', logs.output[0])
+
+
 if __name__ == '__main__':
     # Run the tests
     unittest.main(verbosity=2) 
\ No newline at end of file
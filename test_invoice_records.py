@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test suite for the compact record model in invoice_records.py.
+"""
+
+import unittest
+import sys
+
+from invoice_records import RECORD_FIELDS, InvoiceHeader, LineItem, from_records, to_records
+from test_extraction_cache import RECORDS
+
+
+class TestInvoiceRecords(unittest.TestCase):
+    """Test cases for InvoiceHeader and LineItem."""
+
+    def test_round_trip(self):
+        """Test that records survive conversion to line items and back, in column order."""
+        records = RECORDS + [dict(RECORDS[0], **{'Company Name': 'Gadget Works', 'Amount': '$40.00'})]
+
+        items = from_records(records)
+
+        self.assertEqual(to_records(items), records)
+        self.assertEqual(list(items[0].to_dict()), list(RECORD_FIELDS))
+        self.assertIs(items[0].header, items[1].header)
+
+    def test_missing_columns_become_empty(self):
+        """Test that missing or None values are normalized to empty strings."""
+        record = from_records([{'Company Name': 'Widget Co', 'Plan': 'Base Plan', 'Qty': None}])[0].to_dict()
+
+        self.assertEqual(record['Billed To'], '')
+        self.assertEqual(record['Qty'], '')
+
+    def test_filled_header(self):
+        """Test that only empty header values are filled, and a full header is reused."""
+        defaults = {'billed_to': 'Acme', 'invoice_period': '04/01/2025-04/30/2025', 'invoice_issue_date': 'APR 30, 2025'}
+        header = InvoiceHeader('Beta Corp', '', '')
+
+        filled = header.filled(defaults)
+
+        self.assertEqual(filled.billed_to, 'Beta Corp')
+        self.assertEqual(filled.invoice_period, '04/01/2025-04/30/2025')
+        self.assertEqual(header.invoice_period, '')
+        self.assertIs(filled.filled(defaults), filled)
+
+    def test_line_item_is_smaller_than_a_record(self):
+        """Test that a line item has no per-instance dict and is smaller than the record it replaces."""
+        item = from_records(RECORDS)[0]
+
+        self.assertFalse(hasattr(item, '__dict__'))
+        self.assertLess(sys.getsizeof(item), sys.getsizeof(item.to_dict()))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Test suite for the command line batch processing in main.py.
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+from unittest.mock import patch
+
+import fitz
+import openpyxl
+import pyarrow.parquet as pq
+
+import main
+from extraction_cache import ExtractionCache
+from file_manifest import DEFAULT_RUN_MANIFEST, FileManifest, file_sha256
+from page_text_store import PageTextStore
+from parse_metrics import ParseMetrics
+
+INVOICE_LINES = [
+    "INVOICE",
+    "Billed to",
+    "Acme Holdings, 1 Main St",
+    "Invoice Period: 04/01/2025-04/30/2025",
+    "Issue date: APR 30, 2025",
+    "Company Plan Qty Unit Price Amount",
+    "Widget Co Base Plan 1 $20.00 $20.00",
+    "Gadget Works Ultimate Plan 2 $50.00 $100.00",
+    "Subtotal $120.00",
+]
+
+
+def write_invoice_pdf(path, lines=INVOICE_LINES):
+    """Write a one-page text PDF with the given lines."""
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 72
+    for line in lines:
+        page.insert_text((72, y), line, fontsize=10)
+        y += 14
+    doc.save(path)
+    doc.close()
+
+
+def _crash_or_succeed(pdf_path, output_format='csv', output_filename=None, parser_options=None):
+    """Stand-in for process_single_pdf that kills its worker on 'crash' files."""
+    if 'crash' in os.path.basename(pdf_path):
+        os._exit(1)
+    return True
+
+
+def _crash_or_parse(pdf_path, parser_options=None):
+    """Stand-in for _parse_pdf_task that kills its worker on 'crash' files."""
+    if 'crash' in os.path.basename(pdf_path):
+        os._exit(1)
+    return [{'Company Name': os.path.basename(pdf_path), 'Plan': 'Base Plan'}], {}
+
+
+class TestProcessDirectory(unittest.TestCase):
+    """Test cases for process_directory."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = self.temp_dir.name
+        self.cwd = os.getcwd()
+        os.chdir(self.input_dir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.input_dir, name)
+
+    def test_sequential_summary(self):
+        """Test that the in-line path reports successes and failures."""
+        write_invoice_pdf(self._path('a_good.pdf'))
+        with open(self._path('b_bad.pdf'), 'wb') as f:
+            f.write(b'not a pdf')
+
+        results = main.process_directory(self.input_dir, 'csv')
+
+        self.assertEqual(results['total_files'], 2)
+        self.assertEqual(results['successful'], 1)
+        self.assertEqual(results['failed'], 1)
+        self.assertEqual(results['failed_files'], [self._path('b_bad.pdf')])
+        self.assertTrue(os.path.exists('a_good_extracted.csv'))
+
+    def test_parallel_matches_sequential(self):
+        """Test that --jobs produces the same summary in the same order."""
+        for name in ['c_good.pdf', 'a_good.pdf']:
+            write_invoice_pdf(self._path(name))
+        for name in ['d_bad.pdf', 'b_bad.pdf']:
+            with open(self._path(name), 'wb') as f:
+                f.write(b'not a pdf')
+
+        sequential = main.process_directory(self.input_dir, 'csv', jobs=1)
+        parallel = main.process_directory(self.input_dir, 'csv', jobs=2)
+
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(parallel['failed_files'], [self._path('b_bad.pdf'), self._path('d_bad.pdf')])
+
+    def test_worker_crash_is_isolated(self):
+        """Test that a crashing worker only fails its own file."""
+        for name in ['a.pdf', 'b_crash.pdf', 'c.pdf', 'd.pdf']:
+            with open(self._path(name), 'wb') as f:
+                f.write(b'%PDF-1.4')
+
+        with patch('main.process_single_pdf', _crash_or_succeed):
+            results = main.process_directory(self.input_dir, 'csv', jobs=2)
+
+        self.assertEqual(results['total_files'], 4)
+        self.assertEqual(results['successful'], 3)
+        self.assertEqual(results['failed_files'], [self._path('b_crash.pdf')])
+
+    def test_manifest_records_outcomes(self):
+        """Test that the manifest gets each file's hash, status, records, duration and error."""
+        write_invoice_pdf(self._path('a_good.pdf'))
+        with open(self._path('b_bad.pdf'), 'wb') as f:
+            f.write(b'not a pdf')
+
+        results = main.process_directory(self.input_dir, 'csv', manifest_path='run.db')
+
+        manifest = FileManifest('run.db')
+        good, bad = manifest.entries()[self._path('a_good.pdf')], manifest.entries()[self._path('b_bad.pdf')]
+        manifest.close()
+        self.assertEqual((good['status'], good['records'], good['error'], good['attempts']), ('done', 2, None, 1))
+        self.assertEqual(good['file_hash'], file_sha256(self._path('a_good.pdf')))
+        self.assertGreater(good['duration'], 0)
+        self.assertEqual((bad['status'], bad['records']), ('failed', 0))
+        self.assertTrue(bad['error'])
+        self.assertEqual((results['successful'], results['failed_files']), (1, [self._path('b_bad.pdf')]))
+        self.assertEqual((results['records'], results['skipped']), (2, 0))
+
+    def test_resume_skips_done_and_retries_failed(self):
+        """Test that resuming skips done files, retries failed ones up to the limit and picks up fixed ones."""
+        write_invoice_pdf(self._path('a_good.pdf'))
+        with open(self._path('b_bad.pdf'), 'wb') as f:
+            f.write(b'not a pdf')
+        main.process_directory(self.input_dir, 'csv', manifest_path='run.db')
+
+        with patch('main.process_single_pdf', return_value=False) as mock_process:
+            second = main.process_directory(self.input_dir, 'csv', manifest_path='run.db', resume=True,
+                                            max_attempts=2)
+            third = main.process_directory(self.input_dir, 'csv', manifest_path='run.db', resume=True,
+                                           max_attempts=2)
+
+        self.assertEqual([call.args[0] for call in mock_process.call_args_list], [self._path('b_bad.pdf')])
+        for results in (second, third):
+            self.assertEqual((results['total_files'], results['successful'], results['skipped']), (2, 1, 1))
+            self.assertEqual(results['failed_files'], [self._path('b_bad.pdf')])
+            self.assertEqual(results['records'], 2)
+
+        write_invoice_pdf(self._path('b_bad.pdf'))
+        fixed = main.process_directory(self.input_dir, 'csv', manifest_path='run.db', resume=True,
+                                       max_attempts=2)
+
+        manifest = FileManifest('run.db')
+        entry = manifest.entries()[self._path('b_bad.pdf')]
+        manifest.close()
+        self.assertEqual((fixed['successful'], fixed['failed'], fixed['records']), (2, 0, 4))
+        self.assertEqual((entry['status'], entry['attempts']), ('done', 1))
+
+    def test_manifest_counts_cached_records(self):
+        """Test that records served from the result cache are counted in the manifest too."""
+        write_invoice_pdf(self._path('a_good.pdf'))
+        cache = ExtractionCache(os.path.join(self.input_dir, 'cache'))
+        parser_options = {'cache': cache, 'metrics': ParseMetrics()}
+
+        first = main.process_directory(self.input_dir, 'csv', parser_options=parser_options, manifest_path='run.db')
+        second = main.process_directory(self.input_dir, 'csv', parser_options=parser_options, manifest_path='run.db')
+
+        manifest = FileManifest('run.db')
+        entry = manifest.entries()[self._path('a_good.pdf')]
+        manifest.close()
+        self.assertEqual(parser_options['metrics'].counters['cache_hits'], 1)
+        self.assertEqual((first['records'], second['records'], entry['records']), (2, 2, 2))
+
+    def test_cli_writes_a_manifest_only_when_asked(self):
+        """Test that a plain directory run leaves no manifest behind, and --resume uses the default one."""
+        write_invoice_pdf(self._path('a_good.pdf'))
+
+        for argv, created in ((['--no-cache'], False), (['--no-cache', '--resume'], True)):
+            with patch('sys.argv', ['main.py', '--directory', self.input_dir] + argv), \
+                    self.assertRaises(SystemExit):
+                main.main()
+            self.assertEqual(os.path.exists(DEFAULT_RUN_MANIFEST), created)
+
+
+class TestMergeDirectory(unittest.TestCase):
+    """Test cases for streaming a directory into one CSV with merge_directory."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = self.temp_dir.name
+        self.output_path = os.path.join(self.input_dir, 'merged.csv')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.input_dir, name)
+
+    def _read_output(self):
+        with open(self.output_path, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_merge_streams_all_records(self):
+        """Test that records of every good file land in one CSV, in file order."""
+        write_invoice_pdf(self._path('a_good.pdf'))
+        write_invoice_pdf(self._path('c_good.pdf'), INVOICE_LINES[:6] + ["Other Co Base Plan 3 $20.00 $60.00"])
+        with open(self._path('b_bad.pdf'), 'wb') as f:
+            f.write(b'not a pdf')
+
+        results = main.merge_directory(self.input_dir, self.output_path)
+
+        self.assertEqual(results['successful'], 2)
+        self.assertEqual(results['failed_files'], [self._path('b_bad.pdf')])
+        self.assertEqual(results['records'], 3)
+        lines = self._read_output()
+        self.assertEqual(lines[0], 'Billed To,Invoice Period,Invoice Issue Date,Company Name,Plan,Qty,Unit Price,Amount')
+        self.assertEqual([line.split(',')[4] for line in lines[1:]], ['Widget Co', 'Gadget Works', 'Other Co'])
+
+    def test_merge_to_excel(self):
+        """Test that an .xlsx merge output gets one sheet per Billed To value."""
+        write_invoice_pdf(self._path('a.pdf'))
+        write_invoice_pdf(self._path('b.pdf'), ['Billed to', 'Beta Corp, 2 Side St'] + INVOICE_LINES[3:])
+        output_path = os.path.join(self.input_dir, 'merged.xlsx')
+
+        results = main.merge_directory(self.input_dir, output_path, sheet_per_billed_to=True)
+
+        self.assertEqual(results['records'], 4)
+        workbook = openpyxl.load_workbook(output_path)
+        self.assertEqual(workbook.sheetnames, ['Acme Holdings', 'Beta Corp'])
+        self.assertEqual(workbook['Beta Corp']['H3'].value, 100)
+
+    def test_merge_to_parquet(self):
+        """Test that a .parquet merge output has typed columns."""
+        write_invoice_pdf(self._path('a.pdf'))
+        output_path = os.path.join(self.input_dir, 'merged.parquet')
+
+        results = main.merge_directory(self.input_dir, output_path)
+
+        self.assertEqual(results['records'], 2)
+        table = pq.read_table(output_path)
+        self.assertEqual(table.column('amount_cents').to_pylist(), [2000, 10000])
+        self.assertEqual(table.column('qty').to_pylist(), [1, 2])
+
+    def test_parallel_merge_matches_sequential(self):
+        """Test that --jobs writes the same rows in the same order."""
+        for name in ['a.pdf', 'b.pdf', 'c.pdf']:
+            write_invoice_pdf(self._path(name))
+
+        sequential = main.merge_directory(self.input_dir, self.output_path, jobs=1)
+        expected = self._read_output()
+        parallel = main.merge_directory(self.input_dir, self.output_path, jobs=2)
+
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(self._read_output(), expected)
+
+    def test_worker_crash_is_isolated(self):
+        """Test that a crashing worker only fails its own file."""
+        for name in ['a.pdf', 'b_crash.pdf', 'c.pdf', 'd.pdf']:
+            with open(self._path(name), 'wb') as f:
+                f.write(b'%PDF-1.4')
+
+        with patch('main._parse_pdf_task', _crash_or_parse):
+            results = main.merge_directory(self.input_dir, self.output_path, jobs=2)
+
+        self.assertEqual(results['failed_files'], [self._path('b_crash.pdf')])
+        self.assertEqual(self._read_output()[1:], ['a.pdf,Base Plan', 'c.pdf,Base Plan', 'd.pdf,Base Plan'])
+
+
+class TestReplay(unittest.TestCase):
+    """Test cases for replaying a page text store."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def test_replay_reproduces_outputs_without_pdfs(self):
+        """Test that replay writes the same output from stored text alone."""
+        write_invoice_pdf('april.pdf')
+        parser_options = {'text_store': PageTextStore('pages.db')}
+        self.assertTrue(main.process_single_pdf('april.pdf', 'csv', None, parser_options))
+        parser_options['text_store'].close()
+        with open('april_extracted.csv') as f:
+            expected = f.read()
+        os.remove('april.pdf')
+        os.remove('april_extracted.csv')
+
+        with patch('invoice_parser.InvoiceParser._extract_page_texts') as mock_extract:
+            results = main.replay_text_store('pages.db', 'csv')
+
+        mock_extract.assert_not_called()
+        self.assertEqual(results['total_files'], 1)
+        self.assertEqual(results['successful'], 1)
+        with open('april_extracted.csv') as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_missing_store(self):
+        """Test that a missing store reports nothing processed."""
+        self.assertEqual(main.replay_text_store('missing.db')['total_files'], 0)
+
+
+
+def stop_after(*steps):
+    """Build a watch_directory stop callable that runs one step per poll and stops after the last."""
+    steps = list(steps)
+
+    def stop():
+        if not steps:
+            return True
+        steps.pop(0)()
+        return False
+    return stop
+
+
+class TestWatchDirectory(unittest.TestCase):
+    """Test cases for watch_directory."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        os.mkdir('incoming')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def _watch(self, *steps, use_inotify=True):
+        return main.watch_directory('incoming', 'csv', manifest_path='watch.db', settle_seconds=0,
+                                    poll_interval=0.05, use_inotify=use_inotify, stop=stop_after(*steps))
+
+    def test_processes_arrivals_once(self):
+        """Test that existing and new PDFs are processed, and copies of processed content skipped."""
+        for use_inotify in (True, False):
+            with self.subTest(use_inotify=use_inotify):
+                shutil.rmtree('incoming')
+                os.mkdir('incoming')
+                if os.path.exists('watch.db'):
+                    os.remove('watch.db')
+                write_invoice_pdf(os.path.join('incoming', 'a.pdf'))
+
+                results = self._watch(
+                    lambda: None,
+                    lambda: shutil.copy(os.path.join('incoming', 'a.pdf'), os.path.join('incoming', 'b.pdf')),
+                    lambda: write_invoice_pdf(os.path.join('incoming', 'c.pdf'), INVOICE_LINES[:-2]),
+                    lambda: None, lambda: None, use_inotify=use_inotify)
+
+                self.assertEqual((results['total_files'], results['successful'], results['skipped']), (2, 2, 1))
+                self.assertTrue(os.path.exists('a_extracted.csv'))
+                self.assertTrue(os.path.exists('c_extracted.csv'))
+                self.assertFalse(os.path.exists('b_extracted.csv'))
+
+    def test_restart_skips_processed_files(self):
+        """Test that the manifest keeps a restarted watch from parsing files again, failed ones included."""
+        write_invoice_pdf(os.path.join('incoming', 'a.pdf'))
+        with open(os.path.join('incoming', 'bad.pdf'), 'wb') as f:
+            f.write(b'not a pdf')
+        first = self._watch(lambda: None, lambda: None)
+
+        with patch('main.process_single_pdf') as mock_process, patch('main.file_sha256') as mock_hash:
+            second = self._watch(lambda: None, lambda: None)
+
+        self.assertEqual((first['successful'], first['failed_files']), (1, [os.path.join('incoming', 'bad.pdf')]))
+        mock_process.assert_not_called()
+        mock_hash.assert_not_called()
+        self.assertEqual((second['total_files'], second['skipped']), (0, 2))
+
+    def test_missing_directory(self):
+        """Test that watching a missing directory returns right away."""
+        results = main.watch_directory('missing', manifest_path='watch.db', stop=lambda: False)
+
+        self.assertEqual(results['total_files'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
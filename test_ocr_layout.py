@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test suite for the OCR layout pass in ocr_layout.py.
+"""
+
+import unittest
+
+import cv2
+import numpy as np
+
+from ocr_layout import crop_to_text, find_text_lines
+
+
+def draw_page(lines, logo=False, rules=False, size=(1100, 850), top=300, left=80):
+    """Draw a binarized page with one text line per entry of lines, optionally a filled logo and table rules."""
+    page = np.full(size, 255, dtype=np.uint8)
+    y = top
+    for line in lines:
+        cv2.putText(page, line, (left, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 0, 2)
+        if rules:
+            cv2.line(page, (70, y + 8), (780, y + 8), 0, 1)
+        y += 30
+    if logo:
+        cv2.rectangle(page, (600, 60), (780, 200), 0, -1)
+    return page
+
+
+class TestOcrLayout(unittest.TestCase):
+    """Test cases for find_text_lines and crop_to_text."""
+
+    LINES = ['INVOICE', 'Billed to', 'Acme Holdings, 100 King St W', 'Company Plan Qty Unit Price Amount',
+             'Widget Co Base Plan 1 $20.00 $20.00', 'Subtotal $20.00']
+
+    def test_finds_one_box_per_line(self):
+        """Test that each text line is one box, even with table rules between rows."""
+        boxes = find_text_lines(draw_page(self.LINES, rules=True))
+
+        self.assertEqual(len(boxes), len(self.LINES))
+        self.assertEqual([y for _, y, _, _ in boxes], sorted(y for _, y, _, _ in boxes))
+
+    def test_crop_keeps_text_and_drops_white_space_and_logo(self):
+        """Test that the crop holds all text ink in far fewer pixels than the page, without the logo."""
+        page = draw_page(self.LINES, logo=True)
+        text_ink = int((draw_page(self.LINES) < 128).sum())
+
+        cropped = crop_to_text(page)
+
+        self.assertIsNotNone(cropped)
+        self.assertLess(cropped.size * 3, page.size)
+        self.assertEqual(int((cropped < 128).sum()), text_ink)
+
+    def test_blank_or_full_pages_are_not_cropped(self):
+        """Test that crop_to_text gives up on blank pages and pages where cropping saves little."""
+        full = draw_page(['Line %d of a page full of text' % n for n in range(10)], size=(300, 320), top=20, left=10)
+
+        self.assertIsNone(crop_to_text(np.full((1100, 850), 255, dtype=np.uint8)))
+        self.assertIsNone(crop_to_text(full))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
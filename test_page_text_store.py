@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test suite for the persisted per-page text store.
+"""
+
+import unittest
+import tempfile
+import os
+import pickle
+import sqlite3
+
+from page_text_store import PageTextStore
+
+PAGES = [
+    (0, 'pdfplumber', 'Billed to\nAcme Holdings\n' * 50),
+    (2, 'ocr', 'Company Plan Qty Unit Price Amount\nScanned Corp Premium Plan 3 $10.00 $30.00'),
+]
+
+
+class TestPageTextStore(unittest.TestCase):
+    """Test cases for PageTextStore."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'pages.db')
+        self.store = PageTextStore(self.db_path)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Test that pages come back in order with their engines."""
+        self.store.save_document('a' * 64, list(reversed(PAGES)), source='invoices/april.pdf')
+
+        self.assertTrue(self.store.has_document('a' * 64))
+        self.assertFalse(self.store.has_document('b' * 64))
+        self.assertEqual(self.store.load_document('a' * 64), PAGES)
+        self.assertEqual(list(self.store.iter_documents()), [('a' * 64, 'invoices/april.pdf')])
+
+    def test_save_replaces_previous_pages(self):
+        """Test that saving a document again drops its old pages."""
+        self.store.save_document('a' * 64, PAGES)
+        self.store.save_document('a' * 64, PAGES[:1])
+
+        self.assertEqual(self.store.load_document('a' * 64), PAGES[:1])
+
+    def test_text_mode_mismatch_is_a_miss(self):
+        """Test that a document only counts as stored for the text mode it was saved in."""
+        self.store.save_document('a' * 64, PAGES, text_mode='positional+ocr-pytesseract')
+
+        self.assertTrue(self.store.has_document('a' * 64, 'positional+ocr-pytesseract'))
+        self.assertFalse(self.store.has_document('a' * 64, 'text-tables+ocr-pytesseract'))
+        self.assertTrue(self.store.has_document('a' * 64))
+
+    def test_stores_without_text_modes_are_upgraded(self):
+        """Test that a store created before text modes opens, with its documents in no mode."""
+        self.store.close()
+        os.remove(self.db_path)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('CREATE TABLE documents (doc_hash TEXT PRIMARY KEY, source TEXT, created_at TEXT NOT NULL)')
+            conn.execute("INSERT INTO documents VALUES (?, 'april.pdf', '2025-04-30T00:00:00')", ('a' * 64,))
+        conn.close()
+        self.store = PageTextStore(self.db_path)
+
+        self.assertTrue(self.store.has_document('a' * 64))
+        self.assertFalse(self.store.has_document('a' * 64, 'positional+ocr-pytesseract'))
+
+    def test_text_is_compressed(self):
+        """Test that page text is not stored as plain text."""
+        self.store.save_document('a' * 64, PAGES)
+
+        with sqlite3.connect(self.db_path) as conn:
+            blob = conn.execute('SELECT text FROM pages WHERE page_num = 0').fetchone()[0]
+        self.assertLess(len(blob), len(PAGES[0][2]))
+
+    def test_picklable(self):
+        """Test that the store can be handed to worker processes."""
+        clone = pickle.loads(pickle.dumps(self.store))
+        clone.save_document('a' * 64, PAGES)
+        clone.close()
+
+        self.assertEqual(self.store.load_document('a' * 64), PAGES)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
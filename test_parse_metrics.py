@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test suite for per-stage parse metrics.
+"""
+
+import unittest
+import pickle
+
+from parse_metrics import ParseMetrics
+
+
+class TestParseMetrics(unittest.TestCase):
+    """Test cases for ParseMetrics."""
+
+    def setUp(self):
+        self.metrics = ParseMetrics()
+
+    def test_time_and_increment(self):
+        """Test that stages accumulate time and calls, counters accumulate values."""
+        with self.metrics.time('pdfplumber'):
+            pass
+        self.metrics.observe('pdfplumber', 0.5)
+        self.metrics.increment('pages_ocr', 3)
+        self.metrics.increment('pages_ocr')
+
+        self.assertEqual(self.metrics.stage_calls['pdfplumber'], 2)
+        self.assertGreaterEqual(self.metrics.stage_seconds['pdfplumber'], 0.5)
+        self.assertEqual(self.metrics.counters['pages_ocr'], 4)
+
+    def test_hooks(self):
+        """Test that hooks see every observation."""
+        events = []
+        self.metrics.add_hook(lambda kind, name, value: events.append((kind, name, value)))
+
+        self.metrics.observe('ocr', 1.25)
+        self.metrics.increment('rows_extracted', 7)
+
+        self.assertEqual(events, [('stage', 'ocr', 1.25), ('counter', 'rows_extracted', 7)])
+
+    def test_merge_snapshots_across_pickling(self):
+        """Test that worker snapshots merge into the parent totals."""
+        worker = pickle.loads(pickle.dumps(self.metrics))
+        worker.observe('ocr', 2.0)
+        worker.increment('pages_ocr', 2)
+        self.metrics.observe('ocr', 1.0)
+
+        self.metrics.merge(worker.snapshot())
+
+        self.assertEqual(self.metrics.stage_seconds['ocr'], 3.0)
+        self.assertEqual(self.metrics.stage_calls['ocr'], 2)
+        self.assertEqual(self.metrics.counters['pages_ocr'], 2)
+
+    def test_prometheus_format(self):
+        """Test the Prometheus text exposition output."""
+        self.metrics.observe('ocr', 1.5)
+        self.metrics.increment('pages_ocr', 2)
+
+        text = self.metrics.to_prometheus()
+
+        self.assertIn('# TYPE invoice_parser_stage_seconds_total counter', text)
+        self.assertIn('invoice_parser_stage_seconds_total{stage="ocr"} 1.500000', text)
+        self.assertIn('invoice_parser_stage_calls_total{stage="ocr"} 1', text)
+        self.assertIn('invoice_parser_pages_ocr_total 2', text)
+        self.assertIn('invoice_parser_rows_extracted_total 0', text)
+        self.assertTrue(text.endswith('\n'))
+
+    def test_prometheus_constant_labels(self):
+        """Test constant labels are added to stage and counter samples."""
+        self.metrics.observe('ocr', 1.5)
+        self.metrics.increment('pages_ocr', 2)
+
+        text = self.metrics.to_prometheus(labels={'worker': '42'})
+
+        self.assertIn('invoice_parser_stage_seconds_total{stage="ocr",worker="42"} 1.500000', text)
+        self.assertIn('invoice_parser_stage_calls_total{stage="ocr",worker="42"} 1', text)
+        self.assertIn('invoice_parser_pages_ocr_total{worker="42"} 2', text)
+        self.assertIn('# TYPE invoice_parser_pages_ocr_total counter', text)
+
+    def test_summary_lines(self):
+        """Test the CLI summary lists stages before counters."""
+        self.metrics.increment('documents')
+        self.metrics.observe('field_extraction', 0.25)
+
+        lines = self.metrics.summary_lines()
+
+        self.assertEqual(lines[0], 'Stage timings:')
+        self.assertIn('field_extraction', lines[1])
+        self.assertEqual(lines[2], 'Counters:')
+        self.assertIn('documents', lines[3])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
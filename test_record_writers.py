@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test suite for the streaming record writers.
+"""
+
+import unittest
+import tempfile
+import os
+
+import datetime
+
+import openpyxl
+import pandas as pd
+import pyarrow.parquet as pq
+from pyarrow import ipc
+
+from record_writers import CsvRecordWriter, XlsxRecordWriter, ParquetRecordWriter, parse_number, typed_frame
+from test_extraction_cache import RECORDS
+
+
+class TestCsvRecordWriter(unittest.TestCase):
+    """Test cases for CsvRecordWriter."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.temp_dir.name, 'out.csv')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _read(self):
+        with open(self.output_path, encoding='utf-8') as f:
+            return f.read()
+
+    def test_matches_pandas_output(self):
+        """Test that streamed rows are byte-identical to DataFrame.to_csv."""
+        records = RECORDS + [dict(RECORDS[0], **{'Company Name': 'Quote "Co", Ltd'})]
+        expected_path = os.path.join(self.temp_dir.name, 'expected.csv')
+        pd.DataFrame(records).to_csv(expected_path, index=False)
+
+        with CsvRecordWriter(self.output_path) as writer:
+            self.assertEqual(writer.write_many(iter(records)), 2)
+
+        with open(expected_path, encoding='utf-8') as f:
+            self.assertEqual(self._read(), f.read())
+
+    def test_fieldnames_and_rows_written(self):
+        """Test explicit columns, ignored extra keys and the row count."""
+        with CsvRecordWriter(self.output_path, ['Plan', 'Qty']) as writer:
+            writer.write({'Plan': 'Base Plan', 'Qty': '1', 'Extra': 'x'})
+            writer.write({'Plan': 'Premium Plan'})
+
+        self.assertEqual(writer.rows_written, 2)
+        self.assertEqual(self._read(), 'Plan,Qty\nBase Plan,1\nPremium Plan,\n')
+
+    def test_empty_export(self):
+        """Test that an empty export has only the header when columns are known."""
+        with CsvRecordWriter(self.output_path, ['Plan', 'Qty']):
+            pass
+
+        self.assertEqual(self._read(), 'Plan,Qty\n')
+
+
+class TestXlsxRecordWriter(unittest.TestCase):
+    """Test cases for XlsxRecordWriter."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.temp_dir.name, 'out.xlsx')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _rows(self, sheet):
+        return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+    def test_parse_number(self):
+        """Test parsing of quantities and money amounts."""
+        self.assertEqual(parse_number('3'), 3)
+        self.assertEqual(parse_number('$1,234.50'), 1234.5)
+        self.assertEqual(parse_number('-$4.00'), -4.0)
+        self.assertIsNone(parse_number('twenty'))
+        self.assertIsNone(parse_number(''))
+
+    def test_numeric_cells(self):
+        """Test that Qty, Unit Price and Amount are written as numbers with formats."""
+        with XlsxRecordWriter(self.output_path) as writer:
+            writer.write_many(iter(RECORDS + [dict(RECORDS[0], Qty='n/a', Amount='-$4.00')]))
+
+        sheet = openpyxl.load_workbook(self.output_path)['Sheet1']
+        rows = self._rows(sheet)
+        self.assertEqual(rows[0], list(RECORDS[0]))
+        self.assertEqual(rows[1][5:], [1, 20, 20])
+        self.assertEqual(rows[2][5:], ['n/a', 20, -4])
+        self.assertEqual(sheet['H2'].number_format, '$#,##0.00')
+        self.assertTrue(sheet['A1'].font.bold)
+
+    def test_text_cells_and_pandas_compatibility(self):
+        """Test that numeric=False keeps every value as text, readable by pandas."""
+        with XlsxRecordWriter(self.output_path, numeric=False) as writer:
+            writer.write_many(RECORDS)
+
+        frame = pd.read_excel(self.output_path, dtype=str)
+        self.assertEqual(frame.to_dict('records'), RECORDS)
+
+    def test_sheet_per_billed_to(self):
+        """Test one sheet per Billed To value, with safe, unique titles."""
+        records = [dict(RECORDS[0], **{'Billed To': name})
+                   for name in ['Acme', 'Beta: West/East', 'Acme', '', 'ACME']]
+
+        with XlsxRecordWriter(self.output_path, sheet_per_billed_to=True) as writer:
+            writer.write_many(records)
+
+        workbook = openpyxl.load_workbook(self.output_path)
+        self.assertEqual(workbook.sheetnames, ['Acme', 'Beta  West East', 'No Billed To', 'ACME (2)'])
+        self.assertEqual(len(self._rows(workbook['Acme'])), 3)
+
+    def test_empty_export(self):
+        """Test that an empty export is a valid workbook with the header."""
+        with XlsxRecordWriter(self.output_path, ['Plan', 'Qty']):
+            pass
+
+        self.assertEqual(self._rows(openpyxl.load_workbook(self.output_path)['Sheet1']), [['Plan', 'Qty']])
+
+
+class TestParquetRecordWriter(unittest.TestCase):
+    """Test cases for typed_frame and ParquetRecordWriter."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.temp_dir.name, 'out.parquet')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_typed_frame(self):
+        """Test that amounts become cents, Qty an integer and the dates real dates."""
+        records = RECORDS + [dict(RECORDS[0], **{'Invoice Period': '', 'Invoice Issue Date': 'June 1, 2025',
+                                                  'Qty': 'n/a', 'Unit Price': '$1,234.56', 'Amount': '-$4.00'})]
+
+        frame = typed_frame(records)
+
+        self.assertEqual(frame.loc[0, 'invoice_period_start'], pd.Timestamp('2025-04-01'))
+        self.assertEqual(frame.loc[0, 'invoice_period_end'], pd.Timestamp('2025-04-30'))
+        self.assertEqual(frame.loc[0, 'invoice_issue_date'], pd.Timestamp('2025-04-30'))
+        self.assertEqual(frame.loc[1, 'invoice_issue_date'], pd.Timestamp('2025-06-01'))
+        self.assertTrue(pd.isna(frame.loc[1, 'invoice_period_start']))
+        self.assertEqual(frame['qty'].tolist(), [1, pd.NA])
+        self.assertEqual(frame['unit_price_cents'].tolist(), [2000, 123456])
+        self.assertEqual(frame['amount_cents'].tolist(), [2000, -400])
+
+    def test_parquet_round_trip(self):
+        """Test that the Parquet file has the typed schema and one row group per batch."""
+        with ParquetRecordWriter(self.output_path, batch_rows=2) as writer:
+            writer.write_many(iter(RECORDS * 5))
+
+        parquet_file = pq.ParquetFile(self.output_path)
+        self.assertEqual(parquet_file.metadata.num_rows, 5)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+        self.assertEqual(str(parquet_file.schema_arrow.field('invoice_issue_date').type), 'date32[day]')
+        row = parquet_file.read().to_pylist()[0]
+        self.assertEqual(row['invoice_period_start'], datetime.date(2025, 4, 1))
+        self.assertEqual(row['qty'], 1)
+        self.assertEqual(row['amount_cents'], 2000)
+        self.assertEqual(row['company_name'], 'Widget Co')
+
+    def test_arrow_ipc_file(self):
+        """Test that an .arrow path is written as an Arrow IPC file."""
+        output_path = os.path.join(self.temp_dir.name, 'out.arrow')
+        with ParquetRecordWriter(output_path) as writer:
+            writer.write_many(RECORDS * 3)
+
+        with ipc.open_file(output_path) as reader:
+            table = reader.read_all()
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column('unit_price_cents').to_pylist(), [2000] * 3)
+
+    def test_empty_export(self):
+        """Test that an empty export is a valid Parquet file with the schema."""
+        with ParquetRecordWriter(self.output_path):
+            pass
+
+        table = pq.read_table(self.output_path)
+        self.assertEqual(table.num_rows, 0)
+        self.assertIn('amount_cents', table.column_names)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
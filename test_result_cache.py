@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test suite for the web app's result cache and on-demand exports.
+"""
+
+import unittest
+import tempfile
+import os
+import time
+from unittest.mock import Mock
+
+from result_cache import ResultCache
+from test_extraction_cache import RECORDS
+
+
+def write_csv(records, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(','.join(record['Company Name'] for record in records))
+    return True
+
+
+class TestResultCache(unittest.TestCase):
+    """Test cases for ResultCache."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        """Test that stored records round-trip and unknown keys return None."""
+        self.cache.put('abc123', RECORDS)
+
+        self.assertEqual(self.cache.get('abc123'), RECORDS)
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertIsNone(self.cache.get('../abc123'))
+
+    def test_export_is_rendered_once(self):
+        """Test that an export is rendered on first use and served from disk afterwards."""
+        self.cache.put('abc123', RECORDS)
+        render = Mock(side_effect=write_csv)
+
+        first = self.cache.export('abc123', 'invoice.csv', render)
+        second = self.cache.export('abc123', 'invoice.csv', render)
+
+        render.assert_called_once()
+        self.assertEqual(first, second)
+        with open(first, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'Widget Co')
+        self.assertEqual(sorted(os.listdir(os.path.dirname(first))), ['invoice.csv', 'records.json'])
+
+    def test_export_failures(self):
+        """Test that unknown keys, unsafe names and failed renders return None without leftovers."""
+        self.cache.put('abc123', RECORDS)
+
+        self.assertIsNone(self.cache.export('missing', 'invoice.csv', write_csv))
+        self.assertIsNone(self.cache.export('abc123', '../invoice.csv', write_csv))
+        self.assertIsNone(self.cache.export('abc123', 'invoice.csv', lambda records, path: False))
+        self.assertEqual(os.listdir(os.path.join(self.temp_dir.name, 'abc123')), ['records.json'])
+
+    def test_delete_and_prune(self):
+        """Test that entries can be deleted and expired entries are pruned."""
+        self.cache.put('abc123', RECORDS)
+        self.cache.put('def456', RECORDS)
+
+        self.assertTrue(self.cache.delete('abc123'))
+        self.assertFalse(self.cache.delete('abc123'))
+
+        old = time.time() - 2 * 24 * 60 * 60
+        os.utime(os.path.join(self.temp_dir.name, 'def456'), (old, old))
+        self.cache._last_prune = 0.0
+        self.cache.prune()
+        self.assertIsNone(self.cache.get('def456'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
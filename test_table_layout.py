@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test suite for positional table reconstruction in table_layout.py.
+"""
+
+import os
+import tempfile
+import unittest
+
+import fitz
+import pdfplumber
+
+from table_layout import group_lines, layout_text, words_from_ocr_data, words_from_pdfplumber, words_from_pymupdf
+
+# Left edge of each column, as on a typical invoice
+COLUMN_X = (50, 200, 330, 380, 470)
+
+
+def line_words(y, cells, char_width=6):
+    """Word boxes for one printed line, cells starting at COLUMN_X and words set in a monospace font."""
+    words = []
+    for x, cell in zip(COLUMN_X, cells):
+        for word in cell.split():
+            words.append((x, y, x + len(word) * char_width, y + 10, word))
+            x += (len(word) + 1) * char_width
+    return words
+
+
+def page_words(rows):
+    """Word boxes for lines of cells, 14 units apart."""
+    words = []
+    for index, cells in enumerate(rows):
+        words.extend(line_words(100 + index * 14, cells))
+    return words
+
+
+HEADER = ["Company", "Plan", "Qty", "Unit Price", "Amount"]
+
+
+class TestTableLayout(unittest.TestCase):
+    """Test cases for group_lines and layout_text."""
+
+    def test_group_lines_tolerates_baseline_jitter(self):
+        """Test that words a little off their line's baseline stay on it, in reading order."""
+        words = [(100, 51, 130, 61, 'b'), (10, 50, 40, 60, 'a'), (10, 64, 40, 74, 'c')]
+
+        lines = group_lines(words)
+
+        self.assertEqual([[word[4] for word in line] for line in lines], [['a', 'b'], ['c']])
+
+    def test_rows_wrapped_names_and_discounts(self):
+        """Test that cells follow their header columns, wrapped names join their row and discounts keep no company."""
+        words = page_words([
+            ["Billed to"],
+            ["Acme Holdings"],
+            HEADER,
+            ["Blue Sky Plan Co", "Gold Tier", "3", "$5.00", "$15.00"],
+            ["Northern Lights"],
+            ["Trading Company", "Base Plan", "12", "$20.00", "$240.00"],
+            ["", "20% off", "", "", "-$48.00"],
+            ["Subtotal", "", "", "", "$207.00"],
+        ])
+
+        text = layout_text(words)
+
+        self.assertEqual(text.splitlines(), [
+            "Billed to",
+            "Acme Holdings",
+            "Company\tPlan\tQty\tUnit Price\tAmount",
+            "Blue Sky Plan Co\tGold Tier\t3\t$5.00\t$15.00",
+            "Northern Lights Trading Company\tBase Plan\t12\t$20.00\t$240.00",
+            "\t20% off\t\t\t-$48.00",
+            "Subtotal $207.00",
+        ])
+
+    def test_pages_without_a_clean_table_are_left_to_the_engine(self):
+        """Test that layout_text gives up without a header, without rows, or on misaligned numbers."""
+        misaligned = page_words([HEADER, ["Acme Co", "Base Plan", "", "", ""]])
+        misaligned += line_words(128, ["Acme Co", "Base Plan", "one", "", "$5.00"])
+
+        self.assertIsNone(layout_text(page_words([["Terms and conditions"], ["Payment is due in 30 days"]])))
+        self.assertIsNone(layout_text(page_words([HEADER, ["Subtotal", "", "", "", "$0.00"]])))
+        self.assertIsNone(layout_text(misaligned))
+        self.assertIsNone(layout_text([]))
+
+    def test_ocr_words_skip_empty_entries(self):
+        """Test that image_to_data block/line entries and empty words are dropped."""
+        data = {'left': [0, 10, 60], 'top': [0, 5, 5], 'width': [0, 40, 30], 'height': [0, 12, 12],
+                'text': ['', 'Acme', ' '], 'conf': [-1, 91.5, 95]}
+
+        self.assertEqual(words_from_ocr_data(data), [(10, 5, 50, 17, 'Acme')])
+
+    def test_pdfplumber_and_pymupdf_words_give_the_same_text(self):
+        """Test that both text engines' word boxes rebuild the same table from a real PDF."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'invoice.pdf')
+            doc = fitz.open()
+            page = doc.new_page()
+            for y, cells in ((72, HEADER), (86, ["Blue Sky Ltd", "Gold Tier", "3", "$5.00", "$15.00"])):
+                for x, cell in zip(COLUMN_X, cells):
+                    page.insert_text((x, y), cell, fontsize=10)
+            doc.save(path)
+            doc.close()
+
+            with pdfplumber.open(path) as pdf:
+                plumber_text = layout_text(words_from_pdfplumber(pdf.pages[0]))
+            with fitz.open(path) as doc:
+                pymupdf_text = layout_text(words_from_pymupdf(doc[0]))
+
+        self.assertEqual(plumber_text, "Company\tPlan\tQty\tUnit Price\tAmount\n"
+                                       "Blue Sky Ltd\tGold Tier\t3\t$5.00\t$15.00")
+        self.assertEqual(pymupdf_text, plumber_text)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)